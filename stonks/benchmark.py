@@ -0,0 +1,130 @@
+"""
+Analytical queries latency benchmark.
+"""
+
+from database import checkout
+from database import get_values
+from sql_queries import BENCHMARK_QUERIES, FETCH_TABLE_KIND
+
+import argparse
+import json
+import statistics
+import time
+import typing
+
+
+# benchmarked queries parameters
+PARAMETERS = {
+    'symbol': 'aapl',
+    'etf': 'spy',
+    'source': 'USD',
+    'start': '2010-01-01',
+    'end': '2010-12-31',
+}
+
+
+def run(repeat: int = 5,
+        output: typing.Optional[str] = None,
+        baseline: typing.Optional[str] = None,
+        parameters: typing.Optional[typing.Dict[str, str]] = None
+        ) -> typing.Dict[str, float]:
+    """
+    Time typical analytical queries against loaded tables.
+
+    Run once against plain tables and once against partitioned tables,
+    saving the first results and passing them as baseline of the second
+    run, to compare both layouts.
+
+    Args:
+        repeat: timed executions of every query, after a warm up one
+        output: path to JSON file results are saved to
+        baseline: path to JSON file of previous results to compare to
+        parameters: queries parameters, overriding default ones
+
+    Returns:
+        median latency in milliseconds, by query name.
+    """
+    parameters = {**PARAMETERS, **(parameters or {})}
+    print(f'\n⏱️ Benchmarking {get_layout()} layout, '
+          f'median of {repeat} runs...\n')
+
+    # time every query
+    results = {}
+    for name, query in BENCHMARK_QUERIES.items():
+        results[name] = time_query(query.format(**parameters), repeat)
+
+    # report latencies, compared to baseline ones when given
+    previous = {}
+    if baseline is not None:
+        with open(baseline, 'r') as input_file:
+            previous = json.load(input_file)
+
+    print(f'{"query":<28}{"latency":>13}'
+          + (f'{"baseline":>13}  {"speedup":>7}' if previous else ''))
+    for name, latency in results.items():
+        line = f'{name:<28}{latency:>10.1f} ms'
+        if previous.get(name):
+            line += f'{previous[name]:>10.1f} ms  ' \
+                    f'{previous[name] / latency:>6.1f}x'
+        print(line)
+
+    # save results to compare later runs to
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    return results
+
+
+def get_layout() -> str:
+    """
+    Get layout of loaded prices fact tables.
+
+    Returns:
+        'partitioned' or 'plain'.
+    """
+    [(kind,)] = get_values(
+        FETCH_TABLE_KIND.format(table='currencies.fact_stock_price')
+    )
+
+    return 'partitioned' if kind == 'p' else 'plain'
+
+
+def time_query(query: str, repeat: int) -> float:
+    """
+    Time query executions over a single connection.
+
+    Args:
+        query: query to be timed
+        repeat: timed executions, after a warm up one
+
+    Returns:
+        median latency in milliseconds.
+    """
+    latencies = []
+
+    # get database connection and cursor
+    with checkout() as (cursor, _):
+
+        # warm up caches, then time executions
+        for execution in range(repeat + 1):
+            started = time.perf_counter()
+            cursor.execute(query)
+            cursor.fetchall()
+            if execution:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(latencies)
+
+
+if __name__ == '__main__':
+
+    # parse benchmark options
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='save results to JSON file')
+    parser.add_argument('--baseline', help='compare to saved JSON results')
+    arguments = parser.parse_args()
+
+    # execute benchmark
+    run(arguments.repeat, arguments.output, arguments.baseline)
@@ -3,60 +3,340 @@ Loaded data sanity checks.
 """
 
 from database import get_values
+from sql_queries import CHECK_DUPLICATE_KEYS, CHECK_MINIMUM_ROWS
+from sql_queries import CHECK_NULL_RATIO, CHECK_ORPHANED_KEYS
+from sql_queries import CHECK_ROWS_NUMBER, MEASURE_CHECKS
+from sql_queries import ESTIMATE_DUPLICATE_KEYS, ESTIMATE_NULL_RATIO
+from sql_queries import ESTIMATE_ROWS, SAMPLE_ORPHANED_KEYS
 
-import tqdm
+import math
+import operator
 import typing
 
 
-def check_for_minimum_rows(query: str,
-                           min_rows: int,
-                           tables: typing.List[str]) -> None:
+# rows sampled by approximate checks, whatever the table size
+SAMPLE_ROWS = 100000
+
+# comparisons of measured values against expected ones, by symbol
+COMPARISONS = {
+    '=': operator.eq,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+
+class Check(typing.NamedTuple):
+    """
+    Data quality assertion, measured by a single value query.
+
+    Approximate checks query an array of estimated value and error bound
+    instead.
+    """
+    name: str
+    table: str
+    query: str
+    comparison: str
+    expected: float
+
+
+class CheckResult(typing.NamedTuple):
+    """
+    Outcome of data quality assertion.
+    """
+    name: str
+    table: str
+    measured: float
+    comparison: str
+    expected: float
+    passed: bool
+    error: float = 0.0
+
+
+def minimum_rows(table: str, min_rows: int) -> Check:
+    """
+    Assert table holds a minimum amount of rows, counting no further.
+
+    Args:
+        table: checked table
+        min_rows: minimum amount of rows
+
+    Returns:
+        check.
+    """
+    return Check(
+        'minimum rows',
+        table,
+        CHECK_MINIMUM_ROWS.format(table=table, min=min_rows),
+        '>=',
+        min_rows
+    )
+
+
+def rows_number(table: str, rows: int) -> Check:
     """
-    Check whether query returns minimum amount of rows.
+    Assert table holds an exact amount of rows, as static files do.
 
     Args:
-        query:    query to be executed
-        min_rows: minimum amount of rows returned
-        tables:   tables to have integrity checked
+        table: checked table
+        rows: expected amount of rows
 
     Returns:
-        nothing.
+        check.
     """
-    print('\n😱 Checking tables integrity... \n')
+    return Check(
+        'rows number',
+        table,
+        CHECK_ROWS_NUMBER.format(table=table),
+        '=',
+        rows
+    )
+
+
+def null_ratio(table: str,
+               column: str,
+               max_ratio: float,
+               approximate: bool = False) -> Check:
+    """
+    Assert share of missing values in column stays under a ceiling.
+
+    Approximate checks read the null fraction of the random rows sample
+    collected by ANALYZE from planner statistics, in constant time, within
+    three standard errors of that sample.
 
-    # check tables integrity
-    for table in tqdm.tqdm(tables):
+    Args:
+        table: checked table
+        column: checked column
+        max_ratio: maximum share of null values, between 0 and 1
+        approximate: whether share is estimated from planner statistics,
+                     refreshed by analyzing table beforehand
 
-        # execute query
-        results = get_values(query.format(table=table, min=min_rows))
+    Returns:
+        check.
+    """
+    if approximate:
+        return Check(
+            f'null ratio of {column} (estimated)',
+            table,
+            ESTIMATE_NULL_RATIO.format(
+                table=table,
+                column=column,
+                rows=ESTIMATE_ROWS.format(table=table).strip()
+            ),
+            '<=',
+            max_ratio
+        )
 
-        # minimim result number not reached: fail
-        if len(results) < min_rows:
-            raise AssertionError(f"😔 Minimum row values not met for {table}")
+    return Check(
+        f'null ratio of {column}',
+        table,
+        CHECK_NULL_RATIO.format(table=table, column=column),
+        '<=',
+        max_ratio
+    )
 
 
-def check_static_file_is_fully_loaded(query: str,
-                                      rows_number: int,
-                                      tables: typing.List[str]) -> None:
+def duplicate_keys(table: str,
+                   keys: typing.List[str],
+                   approximate: bool = False) -> Check:
     """
-    Check whether static source files were fully loaded.
+    Assert no natural key is loaded twice.
+
+    Approximate checks measure the share of rows beyond one per key. A
+    valid unique index over the not null key columns, or some of them,
+    rules duplicates out in constant time, and tables up to 'SAMPLE_ROWS'
+    rows are grouped exactly. Larger tables sample about 'SAMPLE_ROWS'
+    rows by table blocks, then count the copies of every sampled key
+    through its index. Each sampled row beyond one per key weighs one
+    minus the inverse of its key copies, so their mean is the share
+    estimate, within three standard errors of its value between sampled
+    blocks.
+
+    Args:
+        table: checked table
+        keys: natural key columns
+        approximate: whether duplicates are estimated from catalog and
+                     samples
+
+    Returns:
+        check.
+    """
+    if approximate:
+        return Check(
+            'duplicate keys share (estimated)',
+            table,
+            ESTIMATE_DUPLICATE_KEYS.format(
+                table=table,
+                keys=', '.join(keys),
+                names=', '.join(f"'{key}'" for key in keys),
+                matches=' AND '.join(
+                    f'copy.{key} = sampled_keys.{key}' for key in keys
+                ),
+                rows=ESTIMATE_ROWS.format(table=table).strip(),
+                sample_rows=SAMPLE_ROWS
+            ),
+            '=',
+            0
+        )
+
+    return Check(
+        'duplicate keys',
+        table,
+        CHECK_DUPLICATE_KEYS.format(table=table, keys=', '.join(keys)),
+        '=',
+        0
+    )
+
+
+def orphaned_keys(table: str,
+                  column: str,
+                  dimension: str,
+                  key: str,
+                  approximate: bool = False) -> Check:
+    """
+    Assert every distinct fact key matches a dimension row.
+
+    Approximate checks only look up keys of a sample of table blocks, about
+    'SAMPLE_ROWS' rows: orphaned keys found are certain, while keys outside
+    the sample may go unnoticed.
+
+    Args:
+        table: checked fact table
+        column: fact column referencing dimension
+        dimension: referenced dimension table
+        key: dimension key column
+        approximate: whether only keys of sampled rows are looked up
+
+    Returns:
+        check.
+    """
+    if approximate:
+        return Check(
+            f'orphaned {column} (sampled)',
+            table,
+            SAMPLE_ORPHANED_KEYS.format(
+                table=table,
+                column=column,
+                dimension=dimension,
+                key=key,
+                sample_rows=SAMPLE_ROWS,
+                rows=ESTIMATE_ROWS.format(table=table).strip()
+            ),
+            '=',
+            0
+        )
+
+    return Check(
+        f'orphaned {column}',
+        table,
+        CHECK_ORPHANED_KEYS.format(
+            table=table,
+            column=column,
+            dimension=dimension,
+            key=key
+        ),
+        '=',
+        0
+    )
+
+
+def run_checks(checks: typing.List[Check],
+               strict: bool = True) -> typing.List[CheckResult]:
+    """
+    Measure every check within a single query and report outcomes.
+
+    Checks are pushed down to the database as scalar subqueries of a single
+    statement, so nothing but measured values goes over the wire and every
+    check runs in one round trip, on one connection.
+
+    Args:
+        checks: data quality checks
+        strict: whether failed checks raise once reported
+
+    Returns:
+        outcome of every check.
+    """
+    print('\n😱 Checking tables data quality... \n')
+
+    # nothing to check: skip round trip
+    if not checks:
+        return []
+
+    # measure every check at once
+    [measures] = get_values(
+        MEASURE_CHECKS.format(
+            measures=',\n    '.join(
+                f'({check.query.strip()}) AS check_{index}'
+                for index, check in enumerate(checks)
+            )
+        )
+    )
+
+    # compare measures against expected values
+    results = []
+    for check, measured in zip(checks, measures):
+        results.append(compare_measure(check, measured))
+
+    # report every outcome
+    for result in results:
+        error = f' ± {result.error:.2g}' if result.error else ''
+        print(f'{"✅" if result.passed else "❌"} '
+              f'{result.table:<36}{result.name:<40}'
+              f'{result.measured:>12g}{error} '
+              f'{result.comparison} {result.expected:g}')
+
+    # some check failed: fail
+    failed = [result for result in results if not result.passed]
+    if strict and failed:
+        raise AssertionError(
+            '😔 Data quality checks failed: ' + ', '.join(
+                f'{result.name} of {result.table}' for result in failed
+            )
+        )
+
+    return results
+
+
+def compare_measure(check: Check, measured: typing.Any) -> CheckResult:
+    """
+    Compare measured value against check expected value.
+
+    Estimates pass when any value within their error bound meets the
+    expected one, and fail when nothing could be measured, as with tables
+    lacking statistics.
 
     Args:
-        query:       check query
-        rows_number: expected returned rows number
-        tables:      tables to have row number checked
+        check: measured check
+        measured: measured value, or estimated value and error bound
 
     Returns:
-        nothing.
+        outcome of check.
     """
-    print('\n😱 Checking static files were loaded... \n')
+    # estimate: split value and error bound
+    error = 0.0
+    if isinstance(measured, (list, tuple)):
+        measured, error = measured
 
-    # check tables integrity
-    for table in tqdm.tqdm(tables):
+    # nothing measured: fail
+    if measured is None:
+        return CheckResult(
+            check.name,
+            check.table,
+            math.nan,
+            check.comparison,
+            check.expected,
+            False
+        )
 
-        # execute query
-        results = get_values(query.format(table=table))
+    # closest value to expected one within error bound
+    measured, error = float(measured), float(error or 0)
+    closest = min(max(check.expected, measured - error), measured + error)
 
-        # rows number does not match: fail
-        if len(results) != rows_number:
-            raise AssertionError(f"😔 Minimum row values not met for {table}")
+    return CheckResult(
+        check.name,
+        check.table,
+        measured,
+        check.comparison,
+        check.expected,
+        COMPARISONS[check.comparison](closest, check.expected),
+        error
+    )
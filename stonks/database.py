@@ -2,32 +2,206 @@
 Database interaction layer.
 """
 
+from instrumentation import count
+from instrumentation import counted
+from instrumentation import instrumented
+
+import contextlib
 import os
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
+import re
 import typing
 
 
-def get_cursor() -> tuple:
+# connection pool shared by database helpers, when opened
+POOL = None
+
+
+class CountedConnection(psycopg2.extensions.connection):
     """
-    Create connection to PostgreSQL database and provides query cursor.
+    Connection counted as opened by metrics recorder.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        """
+        Open connection and count it.
+
+        Args:
+            args: connection arguments
+            kwargs: connection keyword arguments
+
+        Returns:
+            nothing.
+        """
+        super().__init__(*args, **kwargs)
+        count('connections')
+
+
+def get_connection_string() -> str:
+    """
+    Build PostgreSQL connection string from environment variables.
 
     Returns:
-        connection and cursor to PostgreSQL database instance.
+        libpq connection string.
     """
     # get connection parameters
     database = os.environ.get('DATABASE_NAME')
     user = os.environ.get('POSTGRE_USER')
     password = os.environ.get('POSTGRE_PASSWORD')
 
+    return f'host=127.0.0.1 dbname={database} user={user} password={password}'
+
+
+def get_cursor() -> tuple:
+    """
+    Create connection to PostgreSQL database and provides query cursor.
+
+    Returns:
+        connection and cursor to PostgreSQL database instance.
+    """
     # open connection to PostgreSQL
-    connection = psycopg2.connect(
-        f'host=127.0.0.1 dbname={database} user={user} password={password}'
-    )
+    connection = psycopg2.connect(get_connection_string())
     connection.set_session(autocommit=True)
+    count('connections')
 
     return connection.cursor(), connection
 
 
+@contextlib.contextmanager
+def connection_pool(min_size: int = 1,
+                    max_size: int = 4) -> typing.Iterator[typing.Any]:
+    """
+    Open a pool of reusable connections shared by every database helper.
+
+    While the pool is open, 'checkout' borrows connections from it instead
+    of connecting to PostgreSQL on every call. The pool does not block when
+    exhausted, so 'max_size' must cover the number of concurrent users.
+
+    Args:
+        min_size: connections opened upfront and kept alive
+        max_size: maximum number of simultaneous connections
+
+    Returns:
+        opened connection pool.
+    """
+    global POOL
+
+    # pool already opened by outer caller: reuse it
+    if POOL is not None:
+        yield POOL
+        return
+
+    # open connection pool
+    POOL = psycopg2.pool.ThreadedConnectionPool(
+        min_size,
+        max_size,
+        get_connection_string(),
+        connection_factory=CountedConnection
+    )
+
+    # share pool until caller is done, then close every connection
+    try:
+        yield POOL
+    finally:
+        POOL.closeall()
+        POOL = None
+
+
+def is_healthy(connection: typing.Any) -> bool:
+    """
+    Check whether pooled connection is still usable.
+
+    Args:
+        connection: connection to be checked
+
+    Returns:
+        whether connection answers a trivial query.
+    """
+    # connection closed by client: unusable
+    if connection.closed:
+        return False
+
+    # ask server for a trivial answer
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except psycopg2.Error:
+        return False
+
+    return True
+
+
+@contextlib.contextmanager
+def checkout(autocommit: bool = True) -> typing.Iterator[tuple]:
+    """
+    Provide cursor and connection, pooled when a pool is opened.
+
+    Without autocommit, the transaction is committed when the block exits
+    normally and rolled back when it raises.
+
+    Args:
+        autocommit: whether statements are committed as they run
+
+    Returns:
+        cursor and connection to PostgreSQL database instance.
+    """
+    # no pool opened: use a dedicated connection
+    if POOL is None:
+        cursor, connection = get_cursor()
+        try:
+            connection.autocommit = autocommit
+            yield from transaction(cursor, connection)
+        finally:
+            connection.close()
+        return
+
+    # borrow healthy connection from pool, discarding broken ones
+    connection = POOL.getconn()
+    connection.autocommit = True
+    while not is_healthy(connection):
+        POOL.putconn(connection, close=True)
+        connection = POOL.getconn()
+        connection.autocommit = True
+
+    # give connection back to pool once done
+    try:
+        connection.autocommit = autocommit
+        yield from transaction(connection.cursor(), connection)
+    finally:
+        POOL.putconn(connection)
+
+
+def transaction(cursor: typing.Any,
+                connection: typing.Any) -> typing.Iterator[tuple]:
+    """
+    Yield cursor and connection, closing pending transaction afterwards.
+
+    Args:
+        cursor: database cursor
+        connection: database connection owning cursor
+
+    Returns:
+        cursor and connection to PostgreSQL database instance.
+    """
+    try:
+        yield cursor, connection
+
+    # failure inside transaction: discard its changes
+    except Exception:
+        if not connection.autocommit:
+            connection.rollback()
+        raise
+
+    # success: persist transaction changes
+    if not connection.autocommit:
+        connection.commit()
+    cursor.close()
+
+
+@instrumented
 def run_queries(queries: typing.List[str]) -> None:
     """
     Synchronously execute list of queries on PostgreSQL.
@@ -39,16 +213,15 @@ def run_queries(queries: typing.List[str]) -> None:
         nothing.
     """
     # get database connection and cursor
-    cursor, connection = get_cursor()
+    with checkout() as (cursor, _):
 
-    # execute queries
-    for query in queries:
-        cursor.execute(query)
-
-    # close database connection
-    connection.close()
+        # execute queries
+        for query in queries:
+            cursor.execute(query)
+            count('queries')
 
 
+@instrumented
 def get_values(query: str) -> typing.List[typing.Any]:
     """
     Execute query and return result.
@@ -60,20 +233,42 @@ def get_values(query: str) -> typing.List[typing.Any]:
         list of result values.
     """
     # get database connection and cursor
-    cursor, connection = get_cursor()
+    with checkout() as (cursor, _):
 
-    # execute query
-    cursor.execute(query)
+        # execute query
+        cursor.execute(query)
+        count('queries')
 
-    # fetch query result
-    result = cursor.fetchall()
+        # fetch query result
+        return cursor.fetchall()
 
-    # close database connection
-    connection.close()
 
-    return result
+@instrumented
+def run_values(query: str, values: typing.List[tuple]) -> None:
+    """
+    Execute query once over many rows of values, in pages.
 
+    Args:
+        query: query with a single '%s' placeholder for rows of values
+        values: rows of values
 
+    Returns:
+        nothing.
+    """
+    # nothing to send: skip round trip
+    if not values:
+        return
+
+    # get database connection and cursor
+    with checkout() as (cursor, _):
+
+        # execute query for pages of values
+        psycopg2.extras.execute_values(cursor, query, values)
+        count('queries')
+        count('rows', len(values))
+
+
+@instrumented
 def load_data(file: str, table: str, columns: typing.List[str]) -> None:
     """
     Loads CSV files in batches to PostgreSQL table.
@@ -87,10 +282,149 @@ def load_data(file: str, table: str, columns: typing.List[str]) -> None:
         nothing.
     """
     # get database connection and cursor
-    cursor, connection = get_cursor()
+    with checkout() as (cursor, _):
+
+        # copy data into table
+        cursor.copy_from(
+            counted(file),
+            table,
+            columns=columns,
+            sep=',',
+            null=""
+        )
+        count('rows', max(cursor.rowcount, 0))
+
 
-    # copy data into table
-    cursor.copy_from(file, table, columns=columns, sep=',', null="")
+@instrumented
+def load_csv(file: typing.Any, table: str, columns: typing.List[str]) -> int:
+    """
+    Loads CSV formatted stream to PostgreSQL table, quoted values included.
+
+    Args:
+        file: file-like object serving CSV data
+        table: name of destination table
+        columns: list of columns to be derived in order from source data
+
+    Returns:
+        number of loaded rows.
+    """
+    # get database connection and cursor
+    with checkout() as (cursor, _):
+
+        # copy data into table, unquoted empty values as nulls
+        cursor.copy_expert(
+            f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+            counted(file)
+        )
+        count('rows', max(cursor.rowcount, 0))
+
+        return max(cursor.rowcount, 0)
+
+
+@instrumented
+def load_files(paths: typing.Iterable[str],
+               table: str,
+               columns: typing.List[str],
+               progress: typing.Optional[typing.Any] = None) -> int:
+    """
+    Loads many CSV files to PostgreSQL table over a single connection.
+
+    Args:
+        paths: paths to source CSV files
+        table: name of destination table
+        columns: list of columns to be derived in order from source files
+        progress: progress bar updated once per loaded file
+
+    Returns:
+        number of loaded rows.
+    """
+    rows = 0
+
+    # get database connection and cursor
+    with checkout() as (cursor, _):
+
+        # copy every file into table
+        for path in paths:
+            with open(path, 'r') as input_file:
+                cursor.copy_from(
+                    counted(input_file),
+                    table,
+                    columns=columns,
+                    sep=',',
+                    null=""
+                )
+            rows += max(cursor.rowcount, 0)
+            count('rows', max(cursor.rowcount, 0))
+
+            # file done: advance progress
+            if progress is not None:
+                progress.update(1)
+
+    return rows
+
+
+@instrumented
+def load_batches(streams: typing.Iterable[typing.Any],
+                 table: str,
+                 columns: typing.List[str]) -> int:
+    """
+    Loads coalesced streams to PostgreSQL table, one transaction each.
+
+    Every stream is sent as a single COPY command and committed on its own,
+    so a failure only discards the batch being loaded.
+
+    Args:
+        streams: coalesced streams of CSV lines
+        table: name of destination table
+        columns: list of columns to be derived in order from source lines
+
+    Returns:
+        number of loaded rows.
+    """
+    rows = 0
+
+    # get database connection and cursor
+    with checkout(autocommit=False) as (cursor, connection):
+
+        # copy and commit every stream
+        for stream in streams:
+            try:
+                cursor.copy_from(
+                    counted(stream),
+                    table,
+                    columns=columns,
+                    sep=',',
+                    null=""
+                )
+
+            # bad row: log source it came from and abort
+            except psycopg2.Error as e:
+                line = get_copy_error_line(e)
+                if line is not None:
+                    source, source_line = stream.source_of(line)
+                    print(e, f'\n\nFailed loading {source}, '
+                             f'line {source_line} ⚠️')
+                raise
+
+            connection.commit()
+            rows += stream.rows
+            count('rows', stream.rows)
+
+    return rows
+
+
+def get_copy_error_line(error: psycopg2.Error) -> typing.Optional[int]:
+    """
+    Extract offending input line number from failed COPY error.
+
+    Args:
+        error: error raised by COPY command
+
+    Returns:
+        one-based input line number, None when unknown.
+    """
+    # error context looks like 'COPY table, line 42, column ...'
+    context = getattr(error.diag, 'context', None) or ''
+    match = re.search(r'COPY [^,]+, line (\d+)', context)
 
-    # close database connection
-    connection.close()
+    return int(match.group(1)) if match else None
@@ -0,0 +1,178 @@
+"""
+Columnar export of warehouse tables.
+"""
+
+from database import checkout
+from sql_queries import EXPORT_TABLE
+
+import os
+import pyarrow
+import pyarrow.dataset
+import shutil
+import tqdm
+import typing
+
+
+# rows fetched from server side cursors at a time
+EXPORT_BATCH_ROWS = 100000
+
+# rows per exported Parquet row group
+EXPORT_GROUP_ROWS = 1000000
+
+# date column exported tables are partitioned by year of, by table, None for
+# tables already holding a year column
+EXPORT_PARTITIONS = {
+    'currencies.fact_exchange_rate': 'currency_date',
+    'currencies.fact_stock_price': 'price_date',
+    'currencies.fact_etf_price': 'price_date',
+    'currencies.fact_commodities_stats': None,
+}
+
+# compact Arrow types, by PostgreSQL type identifier
+ARROW_TYPES = {
+    16: 'bool_',
+    20: 'int64',
+    21: 'int16',
+    23: 'int32',
+    700: 'float32',
+    701: 'float64',
+    1082: 'date32',
+}
+
+# text types, dictionary encoded as they mostly hold repeated values
+TEXT_TYPES = {25, 1043}
+
+
+def export_tables(tables: typing.List[str],
+                  destination: str,
+                  batch_rows: int = EXPORT_BATCH_ROWS) -> None:
+    """
+    Export tables to Parquet files, partitioned by year where dated.
+
+    Every table is streamed out of a server side cursor, batch by batch,
+    and written to '<destination>/<table>/year=<year>/' Parquet files as
+    it goes, so memory usage does not depend on tables size.
+
+    Args:
+        tables: tables to be exported
+        destination: path to exported files folder
+        batch_rows: rows fetched at a time
+
+    Returns:
+        nothing.
+    """
+    print('\n\n🗃️ Exporting tables to Parquet...\n')
+
+    for table in tqdm.tqdm(tables):
+        export_table(table, destination, batch_rows)
+
+
+def export_table(table: str, destination: str, batch_rows: int) -> int:
+    """
+    Export table to Parquet files, replacing previously exported ones.
+
+    Args:
+        table: table to be exported
+        destination: path to exported files folder
+        batch_rows: rows fetched at a time
+
+    Returns:
+        number of exported rows.
+    """
+    # get table partitioning year expression
+    partitioned = table in EXPORT_PARTITIONS
+    year = ''
+    if EXPORT_PARTITIONS.get(table) is not None:
+        year = f', EXTRACT(YEAR FROM {EXPORT_PARTITIONS[table]})::INT AS year'
+
+    # drop previous export
+    path = os.path.join(destination, table.split('.')[1])
+    shutil.rmtree(path, ignore_errors=True)
+
+    # server side cursors only live within transactions
+    with checkout(autocommit=False) as (_, connection):
+        with connection.cursor(name=f'export_{table.split(".")[1]}') as cursor:
+            cursor.itersize = batch_rows
+            cursor.execute(EXPORT_TABLE.format(table=table, year=year))
+
+            # first batch: fetched to get result columns
+            rows = cursor.fetchmany(batch_rows)
+            schema = get_arrow_schema(cursor.description)
+            batches = stream_record_batches(cursor, rows, schema, batch_rows)
+
+            pyarrow.dataset.write_dataset(
+                batches,
+                path,
+                schema=schema,
+                format='parquet',
+                partitioning=['year'] if partitioned else None,
+                partitioning_flavor='hive' if partitioned else None,
+                max_rows_per_group=EXPORT_GROUP_ROWS,
+                existing_data_behavior='overwrite_or_ignore'
+            )
+
+            return cursor.rownumber
+
+
+def get_arrow_schema(description: typing.Sequence[typing.Any]) -> typing.Any:
+    """
+    Build compact Arrow schema from query result columns.
+
+    Args:
+        description: query cursor columns description
+
+    Returns:
+        Arrow schema.
+    """
+    fields = []
+    for column in description:
+
+        # text: dictionary encoded strings
+        if column.type_code in TEXT_TYPES:
+            kind = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+        # known type: matching compact type, otherwise plain string
+        elif column.type_code in ARROW_TYPES:
+            kind = getattr(pyarrow, ARROW_TYPES[column.type_code])()
+        else:
+            kind = pyarrow.string()
+
+        fields.append(pyarrow.field(column.name, kind))
+
+    return pyarrow.schema(fields)
+
+
+def stream_record_batches(cursor: typing.Any,
+                          rows: typing.List[tuple],
+                          schema: typing.Any,
+                          batch_rows: int) -> typing.Iterator[typing.Any]:
+    """
+    Lazily convert fetched rows into Arrow record batches.
+
+    Args:
+        cursor: server side cursor to keep fetching rows from
+        rows: already fetched first batch of rows
+        schema: Arrow schema of rows
+        batch_rows: rows fetched at a time
+
+    Returns:
+        Arrow record batches.
+    """
+    while rows:
+
+        # rows to columns, converted to their compact types
+        columns = []
+        for field, values in zip(schema, zip(*rows)):
+            if pyarrow.types.is_dictionary(field.type):
+                array = pyarrow.array(values, pyarrow.string())
+                columns.append(array.dictionary_encode())
+            elif pyarrow.types.is_string(field.type):
+                values = [None if value is None else str(value)
+                          for value in values]
+                columns.append(pyarrow.array(values, field.type))
+            else:
+                columns.append(pyarrow.array(values, field.type))
+
+        yield pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+        rows = cursor.fetchmany(batch_rows)
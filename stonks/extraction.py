@@ -3,11 +3,28 @@ Staging data loader.
 """
 
 from datetime import datetime
+from datetime import timedelta
+from instrumentation import count
+from instrumentation import instrumented
+from instrumentation import write_atomically
+from requests.exceptions import ConnectionError
 from requests.exceptions import HTTPError
+from requests.exceptions import Timeout
 
+import concurrent.futures
+import contextvars
 import csv
+import glob
+import gzip
 import json
+import numpy as np
+import os
+import pandas as pd
+import pyarrow
+import pyarrow.ipc
 import requests
+import requests.adapters
+import time
 import typing
 
 
@@ -18,14 +35,76 @@ CURRENCIES = sorted([
     "CNY", "NOK", "NZD", "ZAR", "USD", "MXN", "ILS", "GBP", "KRW", "MYR", "EUR"
 ])
 
+# base currency fetched when deriving cross rates
+CROSS_RATES_BASE = 'EUR'
 
-def fetch_yearly_exchange_rates(base: str, year: int) -> typing.Optional[str]:
+
+class RatesTable(typing.NamedTuple):
+    """
+    Exchange rates laid out as columnar arrays.
+    """
+    base: str
+    dates: np.ndarray
+    rates: np.ndarray
+
+
+# HTTP status codes worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def create_session(concurrency: int = 1) -> requests.Session:
+    """
+    Create HTTP session keeping connections alive between requests.
+
+    Args:
+        concurrency: number of connections kept alive
+
+    Returns:
+        HTTP session.
+    """
+    # keep up to one connection per concurrent request
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=concurrency
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+@instrumented
+def fetch_yearly_exchange_rates(base: str,
+                                year: int,
+                                session: typing.Optional[requests.Session] = None,
+                                timeout: float = 30.0,
+                                retries: int = 3,
+                                backoff: float = 1.0,
+                                since: typing.Optional[str] = None,
+                                cache: typing.Optional[str] = None,
+                                columnar: bool = False
+                                ) -> typing.Optional[str]:
     """
     Fetches the yearly exchanges rates for a given base currency.
 
+    Timeouts, connection errors and transient server errors are retried,
+    waiting 'backoff' seconds doubled on every attempt. With a cache, rates
+    are requested one year at a time, see 'fetch_cached_exchange_rates'.
+
     Args:
         base: base currency abbreviation (e.g. EUR, USD, BRL)
         year: year of currency exchanges to be fetched
+        session: HTTP session to reuse connections from
+        timeout: seconds to wait for server on each request
+        retries: attempts after first failed request
+        backoff: seconds waited before first retry
+        since: first date to be fetched, overriding year, when only
+               missing rates are fetched
+        cache: path to responses cache folder, replayed instead of
+               requesting the API when fresh
+        columnar: whether rates are parsed straight into a 'RatesTable'
 
     Returns:
         nothing.
@@ -33,37 +112,541 @@ def fetch_yearly_exchange_rates(base: str, year: int) -> typing.Optional[str]:
     # get todays date as string
     today = datetime.today().strftime('%Y-%m-%d')
 
-    # set currency data is fetched flag
-    fetched = False
+    # nothing missing since given date: skip request
+    if since is not None and since > today:
+        return get_empty_rates(base, columnar)
+
+    # cached: request closed years and open current year tail apart
+    if cache is not None:
+        return fetch_cached_exchange_rates(
+            base,
+            since or f'{year}-01-01',
+            today,
+            session,
+            timeout,
+            retries,
+            backoff,
+            cache,
+            columnar
+        )
+
+    # get currency data, skipping years without currencies exchange
+    while True:
+        start = since or f'{year}-01-01'
+        status, content = request_exchange_rates(
+            base,
+            start,
+            today,
+            session,
+            timeout,
+            retries,
+            backoff
+        )
+
+        # no currencies exchange since given date: nothing missing
+        if status == 400 and since is not None:
+            return get_empty_rates(base, columnar)
+
+        # no currencies exchange for given year, try next
+        if status == 400:
+            year += 1
+            continue
+
+        break
+
+    # return fetched data
+    if columnar:
+        return parse_exchange_rates(content)
+
+    return json.loads(content.decode('utf-8'))
+
+
+def fetch_cached_exchange_rates(base: str,
+                                start: str,
+                                end: str,
+                                session: typing.Optional[requests.Session] = None,
+                                timeout: float = 30.0,
+                                retries: int = 3,
+                                backoff: float = 1.0,
+                                cache: typing.Optional[str] = None,
+                                columnar: bool = False
+                                ) -> typing.Union[dict, RatesTable]:
+    """
+    Fetches exchange rates one cached range at a time.
+
+    Every closed past year is requested and cached on its own, under a key
+    that does not depend on the current day, so it is replayed for good.
+    Only the current year tail, still getting rates, is requested again
+    once its cached response expires on the next day.
+
+    Args:
+        base: base currency abbreviation
+        start: first date to be fetched
+        end: last date to be fetched, usually today
+        session: HTTP session to reuse connections from
+        timeout: seconds to wait for server on each request
+        retries: attempts after first failed request
+        backoff: seconds waited before first retry
+        cache: path to responses cache folder
+        columnar: whether rates are parsed straight into a 'RatesTable'
+
+    Returns:
+        exchange rates of every range with currencies exchange.
+    """
+    # request every range, skipping those without currencies exchange
+    contents = []
+    for range_start, range_end in get_cached_ranges(start, end):
+        status, content = request_exchange_rates(
+            base,
+            range_start,
+            range_end,
+            session,
+            timeout,
+            retries,
+            backoff,
+            cache
+        )
+        if status == 200:
+            contents.append(content)
+
+    # no currencies exchange on any range: nothing fetched
+    if not contents:
+        return get_empty_rates(base, columnar)
+
+    # columnar: ranges are disjoint and ordered, stack their rows
+    if columnar:
+        tables = [parse_exchange_rates(content) for content in contents]
+        return RatesTable(
+            base,
+            np.concatenate([table.dates for table in tables]),
+            np.vstack([table.rates for table in tables])
+        )
+
+    # merge rates of every range into first payload
+    payload = json.loads(contents[0].decode('utf-8'))
+    for content in contents[1:]:
+        payload['rates'].update(json.loads(content.decode('utf-8'))['rates'])
+
+    return payload
+
+
+def get_cached_ranges(start: str,
+                      end: str) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Split dates range into closed years and open last year tail.
+
+    Args:
+        start: first date of range
+        end: last date of range
+
+    Returns:
+        first and last date of every yearly range, in order.
+    """
+    ranges = []
+
+    # closed years end on their last day
+    for year in range(int(start[:4]), int(end[:4])):
+        ranges.append((max(start, f'{year}-01-01'), f'{year}-12-31'))
+
+    # last year ends on given end
+    ranges.append((max(start, f'{end[:4]}-01-01'), end))
+
+    return ranges
+
+
+def request_exchange_rates(base: str,
+                           start: str,
+                           end: str,
+                           session: typing.Optional[requests.Session] = None,
+                           timeout: float = 30.0,
+                           retries: int = 3,
+                           backoff: float = 1.0,
+                           cache: typing.Optional[str] = None
+                           ) -> typing.Tuple[int, bytes]:
+    """
+    Requests exchange rates of dates range, replaying cache when fresh.
+
+    Timeouts, connection errors and transient server errors are retried,
+    waiting 'backoff' seconds doubled on every attempt. Rejected ranges,
+    without any currencies exchange, are answered and cached as well.
 
-    # get currency data
-    while not fetched:
+    Args:
+        base: base currency abbreviation
+        start: first date of range
+        end: last date of range
+        session: HTTP session to reuse connections from
+        timeout: seconds to wait for server on each request
+        retries: attempts after first failed request
+        backoff: seconds waited before first retry
+        cache: path to responses cache folder
+
+    Returns:
+        response HTTP status code, 200 or 400, and body.
+    """
+    # fresh cached response: replay it
+    if cache is not None:
+        cached = read_cached_response(cache, base, start, end)
+        if cached is not None:
+            return cached
+
+    attempt = 0
+
+    while True:
 
         # make request to exchanges rates API
         try:
-            response = requests.get(
+            count('http_calls')
+            response = (session or requests).get(
                 f'{CURRENCY_API_URL}/'
-                f'history?start_at={year}-01-01&end_at={today}&base={base}'
+                f'history?start_at={start}&end_at={end}&base={base}',
+                timeout=timeout
             )
+            count('bytes', len(response.content))
             response.raise_for_status()
-            fetched = True
+            status, content = 200, response.content
+            break
 
         # error on request: log and re-raise
         except HTTPError as e:
 
-            # no currencies exchange for given year, try next
+            # rejected range: no currencies exchange on it
             if e.response.status_code == 400:
-                year += 1
+                status, content = 400, e.response.content
+                break
+
+            # transient error: retry while attempts are left
+            if e.response.status_code in RETRY_STATUS_CODES \
+                    and attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+                attempt += 1
+                continue
 
             # unknown error: log and abort
-            else:
-                print(e, f'\n\nFailed fetching data for year {year} ⚠️')
+            print(e, f'\n\nFailed fetching data for {base} from {start} ⚠️')
+            raise
+
+        # connection failed or timed out: retry while attempts are left
+        except (ConnectionError, Timeout) as e:
+            if attempt >= retries:
+                print(e, f'\n\nFailed fetching data for {base} ⚠️')
                 raise
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
+
+    # answered: cache it, rejected ranges included
+    if cache is not None:
+        write_cached_response(cache, base, start, end, status, content)
+
+    return status, content
+
+
+def get_empty_rates(base: str,
+                    columnar: bool = False) -> typing.Union[dict, RatesTable]:
+    """
+    Get exchange rates without any rate.
+
+    Args:
+        base: base currency abbreviation
+        columnar: whether rates are laid out as a 'RatesTable'
+
+    Returns:
+        empty exchange rates.
+    """
+    if columnar:
+        return RatesTable(
+            base,
+            np.array([], dtype='<U10'),
+            np.empty((0, len(CURRENCIES)))
+        )
+
+    return {'base': base, 'rates': {}}
+
+
+@instrumented
+def parse_exchange_rates(content: bytes) -> RatesTable:
+    """
+    Parse exchange rates response body straight into columnar arrays.
+
+    Quotes of every date are decoded as they are, then every currency column
+    is filled at once, instead of filling rates one by one. Dates without
+    any quote get a row of missing rates.
+
+    Args:
+        content: exchange rates API response body
+
+    Returns:
+        exchange rates sorted by date, one column per currency in
+        'CURRENCIES' order, missing rates as NaN.
+    """
+    payload = json.loads(content)
+    base, quotes = payload['base'], payload['rates']
+
+    # no rates on response: empty table
+    if not quotes:
+        return get_empty_rates(base, columnar=True)
+
+    # fill columns by currency, unknown currencies left out and missing
+    # quotes left missing
+    dates = np.array(list(quotes))
+    rates = pd.DataFrame(
+        list(quotes.values()),
+        columns=CURRENCIES,
+        dtype='float64'
+    ).to_numpy()
+
+    # sort by date, base currency exchanging to itself at par
+    order = np.argsort(dates)
+    dates, rates = dates[order], rates[order]
+    rates[:, CURRENCIES.index(base)] = 1.0
+
+    return RatesTable(base, dates, rates)
+
+
+def get_cached_response_path(cache: str,
+                             base: str,
+                             start: str,
+                             end: str,
+                             status: int) -> str:
+    """
+    Get path of cached exchange rates API response.
+
+    Args:
+        cache: path to responses cache folder
+        base: requested base currency
+        start: requested first date
+        end: requested last date
+        status: response HTTP status code
+
+    Returns:
+        path to compressed cached response body.
+    """
+    return os.path.join(cache, f'{base}_{start}_{end}.{status}.json.gz')
+
+
+def is_cached_response_fresh(path: str, end: str) -> bool:
+    """
+    Check whether cached response can still be replayed.
+
+    Ranges closed before the response was cached never expire, since
+    historical rates do not change. Ranges reaching the caching day may
+    still get rates, so they expire on the next day.
+
+    Args:
+        path: path to cached response
+        end: requested last date
+
+    Returns:
+        whether cached response is fresh.
+    """
+    cached_on = datetime.fromtimestamp(os.path.getmtime(path))
+    cached_on = cached_on.strftime('%Y-%m-%d')
+
+    return end < cached_on or cached_on == datetime.today().strftime('%Y-%m-%d')
+
+
+@instrumented
+def read_cached_response(cache: str,
+                         base: str,
+                         start: str,
+                         end: str) -> typing.Optional[typing.Tuple[int, bytes]]:
+    """
+    Read fresh cached exchange rates API response.
+
+    Args:
+        cache: path to responses cache folder
+        base: requested base currency
+        start: requested first date
+        end: requested last date
+
+    Returns:
+        response HTTP status code and body, None when not freshly cached.
+    """
+    for status in (200, 400):
+        path = get_cached_response_path(cache, base, start, end, status)
+        if os.path.exists(path) and is_cached_response_fresh(path, end):
+            with gzip.open(path, 'rb') as input_file:
+                return status, input_file.read()
+
+    return None
+
+
+@instrumented
+def write_cached_response(cache: str,
+                          base: str,
+                          start: str,
+                          end: str,
+                          status: int,
+                          content: bytes) -> None:
+    """
+    Write compressed exchange rates API response into cache.
+
+    Args:
+        cache: path to responses cache folder
+        base: requested base currency
+        start: requested first date
+        end: requested last date
+        status: response HTTP status code
+        content: response body
+
+    Returns:
+        nothing.
+    """
+    os.makedirs(cache, exist_ok=True)
+    path = get_cached_response_path(cache, base, start, end, status)
+
+    write_atomically(path, gzip.compress(content))
+
+
+@instrumented
+def evict_cached_responses(cache: str) -> int:
+    """
+    Remove expired responses from cache.
+
+    Args:
+        cache: path to responses cache folder
+
+    Returns:
+        number of evicted responses.
+    """
+    evicted = 0
+
+    for path in glob.glob(os.path.join(cache, '*.json.gz')):
+        end = os.path.basename(path).split('.')[0].split('_')[-1]
+        if not is_cached_response_fresh(path, end):
+            os.remove(path)
+            evicted += 1
+
+    return evicted
+
+
+def fetch_exchange_rates(bases: typing.List[str],
+                         year: int,
+                         concurrency: int = 8,
+                         timeout: float = 30.0,
+                         retries: int = 3,
+                         backoff: float = 1.0,
+                         watermarks: typing.Optional[typing.Dict[str, str]] = None,
+                         cache: typing.Optional[str] = None,
+                         columnar: bool = False
+                         ) -> typing.Iterator[dict]:
+    """
+    Concurrently fetches exchanges rates for many base currencies.
 
-    # request successful: return fetched data
-    return json.loads(response.content.decode('utf-8'))
+    Requests share a single HTTP session, so connections are kept alive
+    and reused across base currencies. Base currencies with a watermark
+    only have rates after their last loaded date fetched.
 
+    Args:
+        bases: base currencies abbreviations
+        year: first year of currency exchanges to be fetched
+        concurrency: maximum number of simultaneous requests
+        timeout: seconds to wait for server on each request
+        retries: attempts after each first failed request
+        backoff: seconds waited before first retry
+        watermarks: last loaded date of each base currency
+        cache: path to responses cache folder
+        columnar: whether rates are parsed straight into 'RatesTable's
+
+    Returns:
+        fetched exchange rates payloads, as they complete.
+    """
+    watermarks = watermarks or {}
+
+    with create_session(concurrency) as session, \
+            concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+
+        # request every base currency, counted within caller metrics phase
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                fetch_yearly_exchange_rates,
+                base,
+                year,
+                session,
+                timeout,
+                retries,
+                backoff,
+                get_next_day(watermarks.get(base)),
+                cache,
+                columnar
+            )
+            for base in bases
+        ]
+
+        # hand over payloads as soon as they arrive
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def get_next_day(date: typing.Optional[str]) -> typing.Optional[str]:
+    """
+    Get day following given date.
+
+    Args:
+        date: ISO formatted date
+
+    Returns:
+        ISO formatted next day, None when no date is given.
+    """
+    if date is None:
+        return None
+
+    day = datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)
+
+    return day.strftime('%Y-%m-%d')
+
+
+@instrumented
+def load_watermarks(path: str) -> typing.Dict[str, str]:
+    """
+    Load last loaded date of each base currency from cache file.
+
+    Args:
+        path: path to watermarks cache file
+
+    Returns:
+        last loaded date by base currency, empty when never cached.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as input_file:
+        return json.load(input_file)
+
+
+@instrumented
+def save_watermarks(path: str, watermarks: typing.Dict[str, str]) -> None:
+    """
+    Save last loaded date of each base currency into cache file.
+
+    Args:
+        path: path to watermarks cache file
+        watermarks: last loaded date by base currency
+
+    Returns:
+        nothing.
+    """
+    write_atomically(path, json.dumps(watermarks, indent=2, sort_keys=True))
+
+
+def get_payload_watermark(payload: typing.Union[dict, RatesTable]
+                          ) -> typing.Optional[str]:
+    """
+    Get last date with rates on exchange rates payload.
 
+    Args:
+        payload: exchange rates data payload or table
+
+    Returns:
+        last date with rates, None when payload has no rates.
+    """
+    if isinstance(payload, RatesTable):
+        return str(payload.dates[-1]) if len(payload.dates) else None
+
+    return max(payload['rates'], default=None)
+
+
+@instrumented
 def unload_exchange_rates(destination: str, payload: dict) -> None:
     """
     Unload exchange rate data into CSV file.
@@ -88,3 +671,278 @@ def unload_exchange_rates(destination: str, payload: dict) -> None:
     with open(f'{destination}currencies-{base}.csv', 'w', newline='') as out:
         writer = csv.writer(out)
         writer.writerows(rows)
+
+    # count written rows and bytes
+    count('rows', len(rows))
+    count('bytes', os.path.getsize(f'{destination}currencies-{base}.csv'))
+
+
+@instrumented
+def unload_rates_table(destination: str,
+                       table: RatesTable,
+                       staging: str = 'csv') -> None:
+    """
+    Unload columnar exchange rates into CSV file, in bulk.
+
+    Files are laid out as 'unload_exchange_rates' does, missing rates left
+    empty.
+
+    Args:
+        destination: destination path to CSV file
+        table: exchange rates table
+        staging: destination file format, 'csv' or 'arrow'
+
+    Returns:
+        nothing.
+    """
+    write_rates(
+        f'{destination}currencies-{table.base}.{staging}',
+        table.base,
+        table.dates,
+        table.rates,
+        staging
+    )
+
+
+@instrumented
+def write_rates(path: str,
+                base: str,
+                dates: np.ndarray,
+                rates: np.ndarray,
+                staging: str = 'csv') -> None:
+    """
+    Write base, date and rates rows into CSV file, in bulk.
+
+    With Arrow staging, rows are written as a typed Arrow IPC stream
+    instead: dictionary encoded base, dates and single precision rates,
+    missing rates as nulls.
+
+    Args:
+        path: path to destination CSV file
+        base: base currency abbreviation
+        dates: rows dates
+        rates: dates by currencies rates matrix
+        staging: destination file format, 'csv' or 'arrow'
+
+    Returns:
+        nothing.
+    """
+    # Arrow staging: typed columns, written as a single record batch
+    if staging == 'arrow':
+        rates = np.asarray(rates, dtype='float32').reshape(-1, len(CURRENCIES))
+        batch = pyarrow.RecordBatch.from_arrays(
+            [
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(np.zeros(len(rates), dtype='int32')),
+                    pyarrow.array([base])
+                ),
+                pyarrow.array(np.asarray(dates, dtype='datetime64[D]')),
+                *(pyarrow.array(rates[:, index], from_pandas=True)
+                  for index in range(len(CURRENCIES)))
+            ],
+            names=['base', 'date', *CURRENCIES]
+        )
+        with pyarrow.ipc.new_stream(path, batch.schema) as writer:
+            writer.write_batch(batch)
+
+    else:
+        rows = pd.DataFrame(rates, columns=CURRENCIES, copy=False)
+        rows.insert(0, 'date', dates)
+        rows.insert(0, 'base', base)
+
+        rows.to_csv(path, index=False, header=False, na_rep='')
+
+    # count written rows and bytes
+    count('rows', len(dates))
+    count('bytes', os.path.getsize(path))
+
+
+def stream_long_rates(path: str) -> typing.Iterator[str]:
+    """
+    Lazily unpivot exchange rates CSV file into one line per known rate.
+
+    Args:
+        path: path to exchange rates CSV file, as written by 'write_rates'
+
+    Returns:
+        base currency, target currency, date and rate CSV lines.
+    """
+    with open(path, 'r') as input_file:
+        for line in input_file:
+            base, date, *rates = line.rstrip('\n').split(',')
+
+            # one line per target currency, skipping unknown rates
+            for currency, rate in zip(CURRENCIES, rates):
+                if rate:
+                    yield f'{base},{currency},{date},{rate}\n'
+
+
+def unpivot_rates_batch(batch: typing.Any) -> typing.Any:
+    """
+    Unpivot Arrow exchange rates into one row per known rate.
+
+    Args:
+        batch: exchange rates record batch, as written by 'write_rates'
+
+    Returns:
+        Arrow record batch of base currency, target currency, date and rate.
+    """
+    # known rates of every target currency, base decoded to plain strings
+    # so that concatenated columns share a single type
+    columns = {'base': [], 'currency': [], 'date': [], 'rate': []}
+    for currency in CURRENCIES:
+        known = batch.column(currency).is_valid()
+        rates = batch.column(currency).filter(known)
+        columns['base'].append(
+            batch.column('base').filter(known).dictionary_decode()
+        )
+        columns['currency'].append(pyarrow.repeat(currency, len(rates)))
+        columns['date'].append(batch.column('date').filter(known))
+        columns['rate'].append(rates)
+
+    # single batch, written to CSV at once
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.concat_arrays(arrays) for arrays in columns.values()],
+        names=list(columns)
+    )
+
+
+@instrumented
+def build_rates_matrix(payload: typing.Union[dict, RatesTable]
+                       ) -> typing.Tuple[typing.List[str], np.ndarray]:
+    """
+    Structure exchange rates payload as a dates by currencies matrix.
+
+    Args:
+        payload: exchange rates data payload or table
+
+    Returns:
+        sorted dates and matrix of rates, one column per currency in
+        'CURRENCIES' order, missing rates as NaN.
+    """
+    # already laid out as columns: nothing to structure
+    if isinstance(payload, RatesTable):
+        return list(payload.dates), payload.rates
+
+    # lay rates out by date and currency
+    rates = pd.DataFrame.from_dict(payload['rates'], orient='index', dtype=float)
+    rates = rates.sort_index().reindex(columns=CURRENCIES)
+
+    # base currency exchanges to itself at par
+    rates[payload['base']] = 1.0
+
+    return list(rates.index), rates.to_numpy(dtype=float)
+
+
+@instrumented
+def derive_cross_rates(matrix: np.ndarray, base: str) -> np.ndarray:
+    """
+    Derive exchange rates from one base currency out of another base rates.
+
+    Rate from A to B is the rate from the fetched base to B divided by the
+    rate from the fetched base to A.
+
+    Args:
+        matrix: dates by currencies rates matrix from fetched base
+        base: base currency to derive rates from
+
+    Returns:
+        dates by currencies rates matrix from derived base.
+    """
+    index = CURRENCIES.index(base)
+
+    return matrix / matrix[:, [index]]
+
+
+@instrumented
+def unload_cross_rates(destination: str,
+                       dates: typing.List[str],
+                       matrix: np.ndarray,
+                       watermarks: typing.Optional[typing.Dict[str, str]] = None,
+                       staging: str = 'csv') -> typing.Dict[str, str]:
+    """
+    Unload exchange rates from every base currency into CSV files.
+
+    Files are laid out as 'unload_exchange_rates' does, one per base
+    currency, skipping dates on which the base currency had no rate and
+    dates up to the base currency watermark.
+
+    Args:
+        destination: destination path to CSV files
+        dates: sorted dates of rates matrix rows
+        matrix: dates by currencies rates matrix from any base
+        watermarks: last loaded date of each base currency
+        staging: destination files format, 'csv' or 'arrow'
+
+    Returns:
+        last unloaded date by base currency, for those with unloaded rates.
+    """
+    dates = np.array(dates)
+    watermarks = watermarks or {}
+    unloaded = {}
+
+    for base in CURRENCIES:
+        cross = derive_cross_rates(matrix, base)
+
+        # keep dates after watermark on which base currency was quoted
+        quoted = ~np.isnan(cross[:, CURRENCIES.index(base)])
+        if base in watermarks:
+            quoted &= dates > watermarks[base]
+        if quoted.any():
+            unloaded[base] = str(dates[quoted][-1])
+
+        # unload exchange rates data
+        write_rates(
+            f'{destination}currencies-{base}.{staging}',
+            base,
+            dates[quoted],
+            cross[quoted],
+            staging
+        )
+
+    return unloaded
+
+
+@instrumented
+def check_cross_rates(dates: typing.List[str],
+                      matrix: np.ndarray,
+                      payload: typing.Union[dict, RatesTable],
+                      tolerance: float = 1e-3) -> float:
+    """
+    Check derived cross rates against directly fetched base rates.
+
+    Args:
+        dates: sorted dates of rates matrix rows
+        matrix: dates by currencies rates matrix from fetched base
+        payload: directly fetched exchange rates payload or table of
+                 another base
+        tolerance: maximum accepted relative difference
+
+    Returns:
+        maximum relative difference found.
+    """
+    base = payload.base if isinstance(payload, RatesTable) \
+        else payload['base']
+    direct_dates, direct = build_rates_matrix(payload)
+
+    # align derived and direct rates on common dates
+    common, derived_rows, direct_rows = np.intersect1d(
+        dates,
+        direct_dates,
+        return_indices=True
+    )
+    derived = derive_cross_rates(matrix, base)[derived_rows]
+    direct = direct[direct_rows]
+
+    # compare rates quoted on both sides
+    difference = np.abs(derived - direct) / np.abs(direct)
+    difference = np.nanmax(difference) if np.any(~np.isnan(difference)) \
+        else 0.0
+
+    # difference above tolerance: fail
+    if difference > tolerance:
+        raise AssertionError(
+            f"😔 Cross rates from {base} differ by {difference:.2%}"
+        )
+
+    return float(difference)
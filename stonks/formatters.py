@@ -2,9 +2,61 @@
 Data ETL pipeline utilities.
 """
 
+from instrumentation import get_peak_rss
+
 import glob
+import os
 import pandas as pd
+import pyarrow
+import pyarrow.ipc
 import tqdm
+import typing
+
+
+PRICES_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+COMMODITIES_FACT_PATH = './data/commodities/commodities-fact.csv'
+COMMODITIES_DIM_PATH = './data/commodities/commodities-dim.csv'
+
+# compact types for source columns, matching destination columns types
+PRICES_DTYPES = {
+    'Date': str,
+    'Open': 'float32',
+    'High': 'float32',
+    'Low': 'float32',
+    'Close': 'float32',
+    'Volume': 'int64',
+}
+COMMODITIES_DTYPES = {
+    'country_or_area': 'category',
+    'year': 'int32',
+    'comm_code': str,
+    'flow': 'category',
+    'commodity': 'category',
+    'trade_usd': 'float32',
+    'weight_kg': 'float32',
+    'quantity_name': 'category',
+    'quantity': 'float32',
+    'category': 'category',
+}
+
+# rows sampled when estimating source data memory usage
+SAMPLE_ROWS = 10000
+
+# formatting copies of a chunk held in memory at once
+CHUNK_MEMORY_FACTOR = 3
+
+
+def get_price_symbol(path: str) -> str:
+    """
+    Get stock symbol from prices source file path.
+
+    Args:
+        path: path to prices source file
+
+    Returns:
+        stock symbol.
+    """
+    return path.split('/')[-1].split('.')[0]
 
 
 def format_prices_source(path: str) -> None:
@@ -17,19 +69,21 @@ def format_prices_source(path: str) -> None:
     Returns:
         nothing.
     """
-    # open data as pandas dataframe
+    # open data as pandas dataframe, without useless columns
     try:
-        prices = pd.read_csv(path, index_col=None)
+        prices = pd.read_csv(
+            path,
+            index_col=None,
+            usecols=PRICES_COLUMNS,
+            dtype=PRICES_DTYPES
+        )
 
     # data for stock symbol is empty: ignore
     except pd.errors.EmptyDataError:
         return
 
-    # remove useless columns
-    prices.drop(['OpenInt'], axis=1, inplace=True)
-
     # add stock symbol as column
-    prices['Stock Symbol'] = path.split('/')[-1].split('.')[0]
+    prices['Stock Symbol'] = get_price_symbol(path)
 
     # unload data
     prices.to_csv(
@@ -50,6 +104,39 @@ def format_prices_source(path: str) -> None:
     )
 
 
+def stream_prices_source(path: str) -> typing.Iterator[str]:
+    """
+    Lazily format raw stock or ETF prices source file, line by line.
+
+    Produces the same rows 'format_prices_source' writes, without loading
+    the whole file or rewriting it on disk.
+
+    Args:
+        path: path to raw prices source file
+
+    Returns:
+        formatted CSV lines.
+    """
+    symbol = get_price_symbol(path)
+
+    with open(path, 'r') as input_file:
+
+        # locate kept columns from header, ignore empty files
+        header = input_file.readline().strip()
+        if not header:
+            return
+        names = header.split(',')
+        positions = [names.index(column) for column in PRICES_COLUMNS]
+
+        # prepend symbol to kept columns of every row
+        for line in input_file:
+            values = line.rstrip('\n').split(',')
+            if len(values) < len(names):
+                continue
+            kept = ','.join(values[position] for position in positions)
+            yield f'{symbol},{kept}\n'
+
+
 def format_prices_data(path: str) -> None:
     """
     Formats source files of stocks and ETF data.
@@ -65,31 +152,135 @@ def format_prices_data(path: str) -> None:
     # load stocks prices table
     stock_files = glob.glob(f'{path}/*.txt')
 
+    # report compact types savings on first non empty file
+    for stock_file in stock_files:
+        try:
+            report_memory(stock_file, PRICES_DTYPES, usecols=PRICES_COLUMNS)
+            break
+        except pd.errors.EmptyDataError:
+            continue
+
     # format source files on path
     for stock_file in tqdm.tqdm(stock_files):
         format_prices_source(stock_file)
 
 
-def format_commodities_data(path: str) -> None:
+def format_commodities_data(path: str,
+                            chunksize: typing.Optional[int] = None,
+                            max_memory: typing.Optional[int] = None,
+                            staging: str = 'csv') -> None:
     """
     Formats source file of commodities data.
 
+    When 'chunksize' or 'max_memory' is given, the source file is formatted
+    in chunks: facts are written incrementally and dimensions are
+    deduplicated across chunks, bounding memory usage.
+
     Args:
         path: path to source data file
+        chunksize: rows formatted at a time
+        max_memory: memory ceiling in bytes, used to derive chunk size
+        staging: formatted files format, 'csv' or 'arrow'
 
     Returns:
         nothing.
     """
     print(f'\n📇 Formatting commodities data...\n')
 
-    # load commodities data
-    stats = pd.read_csv(path, low_memory=False)
+    # report compact types savings
+    report_memory(path, COMMODITIES_DTYPES)
+
+    # no chunking requested: format whole file at once
+    if chunksize is None and max_memory is None:
+        stats = pd.read_csv(path, dtype=COMMODITIES_DTYPES, low_memory=False)
+        facts, dimensions = split_commodities_data(stats)
+        unload_commodities_data(
+            facts,
+            get_staging_path(COMMODITIES_FACT_PATH, staging),
+            staging
+        )
+        unload_commodities_data(
+            dimensions,
+            get_staging_path(COMMODITIES_DIM_PATH, staging),
+            staging
+        )
+
+    # chunking requested: format chunk by chunk
+    else:
+        if chunksize is None:
+            chunksize = estimate_chunksize(path, max_memory)
+        format_commodities_chunks(path, chunksize, staging)
+
+    print(f'📈 Peak memory: {get_peak_rss() / 2 ** 20:,.0f} MiB')
+
+
+def format_commodities_chunks(path: str,
+                              chunksize: int,
+                              staging: str = 'csv') -> None:
+    """
+    Formats source file of commodities data in chunks.
+
+    Args:
+        path: path to source data file
+        chunksize: rows formatted at a time
+        staging: formatted files format, 'csv' or 'arrow'
+
+    Returns:
+        nothing.
+    """
+    # commodity codes already seen and their first dimensions rows
+    seen = set()
+    dimensions = []
+
+    # open facts file chunks are appended to
+    facts_path = get_staging_path(COMMODITIES_FACT_PATH, staging)
+    if staging == 'arrow':
+        facts_file = ArrowStagingFile(facts_path)
+    else:
+        facts_file = open(facts_path, 'w', newline='')
+
+    with facts_file:
+
+        # read source file chunk by chunk
+        chunks = pd.read_csv(
+            path,
+            dtype=COMMODITIES_DTYPES,
+            chunksize=chunksize
+        )
+
+        for chunk in tqdm.tqdm(chunks):
+            facts, chunk_dimensions = split_commodities_data(chunk)
+
+            # append chunk facts
+            unload_commodities_data(facts, facts_file, staging)
+
+            # keep dimensions of codes not seen on previous chunks
+            new = chunk_dimensions[~chunk_dimensions['comm_code'].isin(seen)]
+            seen.update(new['comm_code'])
+            dimensions.append(new)
+
+    # unload deduplicated dimensions
+    unload_commodities_data(
+        pd.concat(dimensions),
+        get_staging_path(COMMODITIES_DIM_PATH, staging),
+        staging
+    )
+
+
+def split_commodities_data(stats: pd.DataFrame) -> typing.Tuple[pd.DataFrame,
+                                                                pd.DataFrame]:
+    """
+    Splits commodities data into fact and dimensions data.
+
+    Args:
+        stats: commodities source data
 
+    Returns:
+        facts and commodity code deduplicated dimensions data.
+    """
     # remove commas from string columns
-    stats['country_or_area'] = \
-        stats['country_or_area'].str.replace(',', '-')
-    stats['commodity'] = \
-        stats['commodity'].str.replace(',', '-')
+    stats['country_or_area'] = replace_text(stats['country_or_area'], ',', '-')
+    stats['commodity'] = replace_text(stats['commodity'], ',', '-')
 
     # split fact and dimensions data
     facts = stats[[
@@ -108,16 +299,57 @@ def format_commodities_data(path: str) -> None:
         'category'
     ]].drop_duplicates(subset=['comm_code'])
 
-    # unload data
-    facts.to_csv(
-        './data/commodities/commodities-fact.csv',
-        index=False,
-        sep=',',
-        na_rep='',
-        header=False
-    )
-    dimensions.to_csv(
-        './data/commodities/commodities-dim.csv',
+    return facts, dimensions
+
+
+def replace_text(column: pd.Series, old: str, new: str) -> pd.Series:
+    """
+    Replaces text on string column, keeping categorical columns compact.
+
+    Args:
+        column: string or categorical column
+        old: text to be replaced
+        new: replacement text
+
+    Returns:
+        column with replaced text.
+    """
+    # categorical column: replace on categories instead of every row
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = column.cat.categories.str.replace(old, new, regex=False)
+        if categories.is_unique:
+            return column.cat.rename_categories(categories)
+
+    return column.str.replace(old, new, regex=False)
+
+
+def unload_commodities_data(data: pd.DataFrame,
+                            destination: typing.Union[str,
+                                                      typing.TextIO,
+                                                      'ArrowStagingFile'],
+                            staging: str = 'csv') -> None:
+    """
+    Unloads formatted commodities data as headless CSV or Arrow stream.
+
+    Args:
+        data: formatted data
+        destination: path or open file to write to
+        staging: destination format, 'csv' or 'arrow'
+
+    Returns:
+        nothing.
+    """
+    # Arrow staging: append typed record batches to open or new file
+    if staging == 'arrow':
+        if isinstance(destination, str):
+            with ArrowStagingFile(destination) as output_file:
+                output_file.write(data)
+        else:
+            destination.write(data)
+        return
+
+    data.to_csv(
+        destination,
         index=False,
         sep=',',
         na_rep='',
@@ -125,5 +357,181 @@ def format_commodities_data(path: str) -> None:
     )
 
 
+def get_staging_path(path: str, staging: str) -> str:
+    """
+    Get path to formatted file in staging format, named after its format.
+
+    Args:
+        path: path to formatted CSV file
+        staging: formatted file format, 'csv' or 'arrow'
+
+    Returns:
+        path to formatted file.
+    """
+    return f'{os.path.splitext(path)[0]}.{staging}'
+
+
+def to_arrow_table(data: pd.DataFrame) -> typing.Any:
+    """
+    Convert data frame into Arrow table of stable column types.
+
+    Categorical columns become dictionaries of 32 bits indices over string
+    values and text columns become strings, whatever their contents, so
+    every chunk of a source file shares the same schema.
+
+    Args:
+        data: data frame to be converted
+
+    Returns:
+        Arrow table.
+    """
+    columns = []
+    for column in data.columns:
+        values = data[column]
+
+        # categories: dictionary encoded, missing values masked out
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            array = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(
+                    values.cat.codes.to_numpy(dtype='int32'),
+                    mask=values.isna().to_numpy()
+                ),
+                pyarrow.array(
+                    values.cat.categories.astype(str),
+                    pyarrow.string()
+                )
+            )
+
+        # numbers: same compact types
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            array = pyarrow.array(values, from_pandas=True)
+
+        # anything else: strings
+        else:
+            array = pyarrow.array(values, pyarrow.string(), from_pandas=True)
+
+        columns.append(array)
+
+    return pyarrow.Table.from_arrays(columns, names=list(data.columns))
+
+
+class ArrowStagingFile:
+    """
+    Arrow IPC stream file written one data frame at a time.
+
+    The stream is opened on the first written data frame, taking its
+    schema. Stream files, unlike Arrow random access files, allow every
+    record batch to carry its own dictionaries.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Create staging file, opened once written to.
+
+        Args:
+            path: path to destination file
+
+        Returns:
+            nothing.
+        """
+        self.path = path
+        self.writer = None
+
+    def __enter__(self) -> 'ArrowStagingFile':
+        """
+        Use staging file as a context manager, closed on exit.
+
+        Returns:
+            staging file.
+        """
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        """
+        Close staging file.
+
+        Args:
+            args: exception details, if any
+
+        Returns:
+            nothing.
+        """
+        self.close()
+
+    def write(self, data: pd.DataFrame) -> None:
+        """
+        Append data frame to file as record batches.
+
+        Args:
+            data: data frame to be appended
+
+        Returns:
+            nothing.
+        """
+        table = to_arrow_table(data)
+
+        # first data frame: open stream with its schema
+        if self.writer is None:
+            self.writer = pyarrow.ipc.new_stream(self.path, table.schema)
+
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        """
+        Close stream, if opened.
+
+        Returns:
+            nothing.
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+
+def estimate_chunksize(path: str, max_memory: int) -> int:
+    """
+    Estimates rows per chunk keeping formatting under memory ceiling.
+
+    Args:
+        path: path to source data file
+        max_memory: memory ceiling in bytes
+
+    Returns:
+        number of rows per chunk.
+    """
+    # measure memory taken by a sample of rows
+    sample = pd.read_csv(path, dtype=COMMODITIES_DTYPES, nrows=SAMPLE_ROWS)
+    row_size = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+
+    # each chunk is copied while split and replaced: keep room for copies
+    return max(1, int(max_memory / (row_size * CHUNK_MEMORY_FACTOR)))
+
+
+def report_memory(path: str,
+                  dtypes: typing.Dict[str, typing.Any],
+                  **kwargs: typing.Any) -> typing.Tuple[int, int]:
+    """
+    Reports memory taken by a sample of rows with inferred and compact types.
+
+    Args:
+        path: path to source data file
+        dtypes: compact columns types
+        kwargs: extra arguments to pandas CSV reader
+
+    Returns:
+        sample memory in bytes with inferred and compact types.
+    """
+    # read same sample with inferred and compact types
+    inferred = pd.read_csv(path, nrows=SAMPLE_ROWS, **kwargs)
+    compact = pd.read_csv(path, nrows=SAMPLE_ROWS, dtype=dtypes, **kwargs)
+
+    before = int(inferred.memory_usage(deep=True).sum())
+    after = int(compact.memory_usage(deep=True).sum())
+
+    print(f'🧮 Memory for {len(compact)} rows: {before / 2 ** 10:,.0f} KiB '
+          f'inferred, {after / 2 ** 10:,.0f} KiB compact')
+
+    return before, after
+
+
 if __name__ == '__main__':
     format_commodities_data('./data/commodities/commodity_trade_statistics.csv')
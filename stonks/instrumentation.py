@@ -0,0 +1,564 @@
+"""
+Instrumentation layer measuring pipeline phases and helpers.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import typing
+
+
+# counters reported in order, ahead of any other counter
+COUNTERS = ['rows', 'bytes', 'queries', 'connections', 'http_calls']
+
+# Prometheus metrics name suffixes and descriptions
+UNITS = {
+    'wall': 'wall_seconds',
+    'cpu': 'cpu_seconds',
+    'peak_rss': 'peak_rss_bytes'
+}
+DESCRIPTIONS = {
+    'wall': 'elapsed wall clock seconds',
+    'cpu': 'CPU seconds',
+    'peak_rss': 'peak resident memory bytes',
+    'calls': 'number of calls',
+    'rows': 'rows moved',
+    'bytes': 'bytes moved',
+    'queries': 'queries run',
+    'connections': 'database connections opened',
+    'http_calls': 'HTTP requests sent'
+}
+
+# phase of counts made outside of every phase
+UNATTRIBUTED = 'other'
+
+# phase and helper counts are attributed to in current context
+PHASE = contextvars.ContextVar('phase', default=UNATTRIBUTED)
+HELPER = contextvars.ContextVar('helper', default=None)
+
+# metrics recorder counting pipeline activity, when recording
+RECORDER = None
+
+
+def get_peak_rss() -> int:
+    """
+    Get peak resident set size of current process.
+
+    Returns:
+        peak resident memory in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # macOS reports bytes, Linux reports kilobytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def write_atomically(path: str, data: typing.Union[str, bytes]) -> None:
+    """
+    Write file aside and swap it in place, never leaving it half written.
+
+    Args:
+        path: path to written file
+        data: whole file content, as text or bytes
+
+    Returns:
+        nothing.
+    """
+    with open(f'{path}.tmp', 'wb' if isinstance(data, bytes) else 'w') \
+            as output_file:
+        output_file.write(data)
+    os.replace(f'{path}.tmp', path)
+
+
+class Recorder:
+    """
+    Metrics of pipeline phases and helpers, counted from any thread.
+
+    Counts go to the phase and helper entered in the current context, so
+    threads started within a phase must run in a copy of its context, see
+    'contextvars.copy_context', to have their counts attributed to it.
+    Phases CPU time is the whole process CPU time, shared by phases running
+    at the same time, while helpers CPU time is their own thread CPU time.
+    Peak memory is the process peak reached by the end of each phase.
+    """
+
+    def __init__(self, path: typing.Optional[str] = None) -> None:
+        """
+        Create recorder of a single pipeline run.
+
+        Args:
+            path: path to JSON lines file every record is appended to
+
+        Returns:
+            nothing.
+        """
+        self.path = path
+        self.run = datetime.datetime.now().isoformat(timespec='seconds')
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+        # metrics by phase and by helper name, in first entered order
+        self.phases = {}
+        self.helpers = {}
+
+        # shared by every counting thread
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """
+        Measure pipeline phase, recorded once it ends.
+
+        Args:
+            name: pipeline phase name
+
+        Returns:
+            nothing.
+        """
+        token = PHASE.set(name)
+        with self.lock:
+            metrics = self.phases.setdefault(name, {})
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+        status = 'failed'
+
+        try:
+            yield
+            status = 'done'
+
+        # record phase, even failed, along with counts made during it
+        finally:
+            PHASE.reset(token)
+            with self.lock:
+                metrics['status'] = status
+                metrics['wall'] = time.perf_counter() - started
+                metrics['cpu'] = time.process_time() - started_cpu
+                metrics['peak_rss'] = get_peak_rss()
+            self.write('phase', name, metrics)
+
+    @contextlib.contextmanager
+    def helper(self, name: str) -> typing.Iterator[None]:
+        """
+        Measure a single helper call, added up over every call.
+
+        Args:
+            name: helper name
+
+        Returns:
+            nothing.
+        """
+        token = HELPER.set(name)
+        started = time.perf_counter()
+        started_cpu = time.thread_time()
+
+        try:
+            yield
+
+        finally:
+            HELPER.reset(token)
+            with self.lock:
+                metrics = self.helpers.setdefault(name, {})
+                add(metrics, 'calls', 1)
+                add(metrics, 'wall', time.perf_counter() - started)
+                add(metrics, 'cpu', time.thread_time() - started_cpu)
+
+    def count(self, metric: str, amount: typing.Union[int, float] = 1) -> None:
+        """
+        Add amount to metric of current phase and helper.
+
+        Args:
+            metric: counter name, such as 'rows' or 'bytes'
+            amount: amount added to counter
+
+        Returns:
+            nothing.
+        """
+        phase = PHASE.get()
+        helper = HELPER.get()
+
+        with self.lock:
+            add(self.phases.setdefault(phase, {}), metric, amount)
+            if helper is not None:
+                add(self.helpers.setdefault(helper, {}), metric, amount)
+
+    def total(self) -> typing.Dict[str, typing.Any]:
+        """
+        Sum up metrics of whole run so far.
+
+        Returns:
+            run elapsed and CPU seconds, peak memory and every counter.
+        """
+        metrics = {
+            'wall': time.perf_counter() - self.started,
+            'cpu': time.process_time() - self.started_cpu,
+            'peak_rss': get_peak_rss()
+        }
+
+        # counters are summed over phases, helpers counts being among them
+        with self.lock:
+            for phase in self.phases.values():
+                for metric, value in phase.items():
+                    if metric not in ('status', 'wall', 'cpu', 'peak_rss'):
+                        add(metrics, metric, value)
+
+        return metrics
+
+    def finish(self) -> typing.Dict[str, typing.Any]:
+        """
+        Record counts made outside of phases, helpers and run total.
+
+        Returns:
+            whole run metrics.
+        """
+        total = self.total()
+
+        if UNATTRIBUTED in self.phases:
+            self.write('phase', UNATTRIBUTED, self.phases[UNATTRIBUTED])
+        for name, metrics in self.helpers.items():
+            self.write('helper', name, metrics)
+        self.write('run', 'total', total)
+
+        return total
+
+    def write(self,
+              kind: str,
+              name: str,
+              metrics: typing.Dict[str, typing.Any]) -> None:
+        """
+        Append record as a JSON line, when a path is given.
+
+        Args:
+            kind: recorded item, 'phase', 'helper' or 'run'
+            name: phase or helper name
+            metrics: recorded metrics
+
+        Returns:
+            nothing.
+        """
+        if self.path is None:
+            return
+
+        with self.lock:
+            record = {
+                'run': self.run,
+                'kind': kind,
+                'name': name,
+                **metrics,
+                'rows_per_second': get_throughput(metrics)
+            }
+            with open(self.path, 'a') as output_file:
+                output_file.write(json.dumps(record) + '\n')
+
+    def report(self) -> None:
+        """
+        Print summary table of phases, helpers and run total.
+
+        Returns:
+            nothing.
+        """
+        total = self.total()
+
+        print_table(
+            '⏱️ Phases metrics',
+            {**self.phases, 'total': total},
+            ['peak_rss', *get_counters([total])]
+        )
+        if self.helpers:
+            print_table(
+                '🔧 Helpers metrics',
+                self.helpers,
+                get_counters(self.helpers.values(), ['calls'])
+            )
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Write metrics in Prometheus text format, for textfile collectors.
+
+        Metrics of the latest run replace previous ones, the file being
+        written aside and swapped so collectors never read it half written.
+
+        Args:
+            path: path to '.prom' destination file
+
+        Returns:
+            nothing.
+        """
+        total = self.total()
+        lines = []
+
+        def add_metric(name: str,
+                       description: str,
+                       samples: typing.List[typing.Tuple[str, float]]) -> None:
+            lines.append(f'# HELP stonks_{name} {description}')
+            lines.append(f'# TYPE stonks_{name} gauge')
+            lines.extend(
+                f'stonks_{name}{labels} {value}'
+                for labels, value in samples
+            )
+
+        # whole run metrics
+        add_metric(
+            'run_timestamp_seconds',
+            'Unix time the pipeline run ended at.',
+            [('', time.time())]
+        )
+        for metric, value in total.items():
+            add_metric(
+                f'run_{UNITS.get(metric, metric)}',
+                f'Pipeline run {DESCRIPTIONS.get(metric, metric)}.',
+                [('', value)]
+            )
+
+        # phases and helpers metrics, labelled by name
+        for kind, items in (('phase', self.phases), ('helper', self.helpers)):
+            metrics = get_counters(
+                items.values(),
+                ['wall', 'cpu', 'calls', 'peak_rss']
+            )
+            for metric in metrics:
+                add_metric(
+                    f'{kind}_{UNITS.get(metric, metric)}',
+                    f'Pipeline {kind} {DESCRIPTIONS.get(metric, metric)}.',
+                    [
+                        (f'{{{kind}="{escape_label(name)}"}}', values[metric])
+                        for name, values in items.items()
+                        if metric in values
+                    ]
+                )
+
+        write_atomically(path, '\n'.join(lines) + '\n')
+
+
+class CountedReader:
+    """
+    File-like proxy counting data read by COPY commands as bytes moved.
+    """
+
+    def __init__(self, file: typing.Any) -> None:
+        """
+        Create proxy over file.
+
+        Args:
+            file: file-like object read by COPY command
+
+        Returns:
+            nothing.
+        """
+        self.file = file
+
+    def read(self, size: int = -1) -> typing.Union[str, bytes]:
+        """
+        Read up to 'size' characters from file and count them.
+
+        Args:
+            size: maximum number of characters, everything when negative
+
+        Returns:
+            read data, empty when file is over.
+        """
+        data = self.file.read(size)
+        count('bytes', len(data))
+
+        return data
+
+    def readline(self, size: int = -1) -> typing.Union[str, bytes]:
+        """
+        Read a single line from file and count it.
+
+        Args:
+            size: maximum number of characters, whole line when negative
+
+        Returns:
+            read line, empty when file is over.
+        """
+        line = self.file.readline(size)
+        count('bytes', len(line))
+
+        return line
+
+
+@contextlib.contextmanager
+def recording(recorder: Recorder) -> typing.Iterator[Recorder]:
+    """
+    Count activity of every instrumented helper with recorder.
+
+    Args:
+        recorder: metrics recorder of a pipeline run
+
+    Returns:
+        recorder.
+    """
+    global RECORDER
+
+    RECORDER = recorder
+    try:
+        yield recorder
+
+    # stop counting, failed runs included
+    finally:
+        RECORDER = None
+
+
+def instrumented(function: typing.Callable) -> typing.Callable:
+    """
+    Measure every call of helper with metrics recorder, when recording.
+
+    Args:
+        function: helper to be measured
+
+    Returns:
+        measured helper.
+    """
+    @functools.wraps(function)
+    def measured(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        if RECORDER is None:
+            return function(*args, **kwargs)
+
+        with RECORDER.helper(function.__name__):
+            return function(*args, **kwargs)
+
+    return measured
+
+
+def count(metric: str, amount: typing.Union[int, float] = 1) -> None:
+    """
+    Add amount to metric of metrics recorder, when recording.
+
+    Args:
+        metric: counter name
+        amount: amount added to counter
+
+    Returns:
+        nothing.
+    """
+    if RECORDER is not None:
+        RECORDER.count(metric, amount)
+
+
+def counted(file: typing.Any) -> typing.Any:
+    """
+    Wrap file read by COPY command so its data is counted, when recording.
+
+    Args:
+        file: file-like object read by COPY command
+
+    Returns:
+        file itself, or counting proxy over it.
+    """
+    return file if RECORDER is None else CountedReader(file)
+
+
+def add(metrics: typing.Dict[str, typing.Any],
+        metric: str,
+        amount: typing.Union[int, float]) -> None:
+    """
+    Add amount to metric, starting from zero.
+
+    Args:
+        metrics: metrics updated in place
+        metric: metric name
+        amount: amount added to metric
+
+    Returns:
+        nothing.
+    """
+    metrics[metric] = metrics.get(metric, 0) + amount
+
+
+def print_table(title: str,
+                items: typing.Dict[str, typing.Dict[str, typing.Any]],
+                columns: typing.List[str]) -> None:
+    """
+    Print elapsed times, throughput and given metrics of named items.
+
+    Args:
+        title: table title
+        items: metrics by phase or helper name
+        columns: metrics printed after elapsed times and throughput
+
+    Returns:
+        nothing.
+    """
+    print(f'\n\n{title}:\n')
+    print(
+        f'{"":<32}{"wall":>10}{"cpu":>10}{"rows/s":>12}'
+        + ''.join(
+            f'{"peak MiB" if column == "peak_rss" else column:>12}'
+            for column in columns
+        )
+    )
+
+    for name, metrics in items.items():
+        values = [
+            metrics.get(column, 0) / (2 ** 20 if column == 'peak_rss' else 1)
+            for column in columns
+        ]
+        print(
+            f'{name:<32}'
+            f'{metrics.get("wall", 0.0):>9.1f}s'
+            f'{metrics.get("cpu", 0.0):>9.1f}s'
+            f'{get_throughput(metrics):>12,.0f}'
+            + ''.join(f'{value:>12,.0f}' for value in values)
+        )
+
+
+def get_throughput(metrics: typing.Dict[str, typing.Any]) -> float:
+    """
+    Get rows moved per elapsed second.
+
+    Args:
+        metrics: metrics with rows and elapsed seconds, if any
+
+    Returns:
+        rows per second, zero when unknown.
+    """
+    wall = metrics.get('wall', 0.0)
+
+    return metrics.get('rows', 0) / wall if wall else 0.0
+
+
+def get_counters(items: typing.Iterable[typing.Dict[str, typing.Any]],
+                 first: typing.Sequence[str] = ()) -> typing.List[str]:
+    """
+    Get metrics names found in items, known counters first.
+
+    Args:
+        items: metrics of phases, helpers or run
+        first: metrics names put ahead of known counters
+
+    Returns:
+        numeric metrics names, in report order.
+    """
+    found = set()
+    for metrics in items:
+        found.update(
+            metric for metric, value in metrics.items()
+            if isinstance(value, (int, float))
+        )
+    found -= {'wall', 'cpu', 'peak_rss'} - set(first)
+
+    known = [metric for metric in [*first, *COUNTERS] if metric in found]
+
+    return known + sorted(found - set(known))
+
+
+def escape_label(value: str) -> str:
+    """
+    Escape Prometheus label value.
+
+    Args:
+        value: raw label value
+
+    Returns:
+        value with backslashes, quotes and line breaks escaped.
+    """
+    return value.replace('\\', '\\\\') \
+        .replace('"', '\\"') \
+        .replace('\n', '\\n')
@@ -0,0 +1,185 @@
+"""
+Bulk loading strategies for price source files.
+"""
+
+from database import load_batches
+from database import load_files
+from formatters import stream_prices_source
+from streams import CoalescedStream
+from streams import read_lines
+
+import concurrent.futures
+import contextvars
+import queue
+import time
+import tqdm
+import typing
+
+
+PRICE_COLUMNS = [
+    'stock_symbol',
+    'price_date',
+    'open',
+    'high',
+    'low',
+    'close',
+    'volume'
+]
+
+
+def load_prices(files: typing.List[str],
+                table: str,
+                workers: int = 1,
+                batch_rows: typing.Optional[int] = None,
+                batch_bytes: typing.Optional[int] = None,
+                raw: bool = False) -> None:
+    """
+    Loads price files, optionally spread across concurrent workers.
+
+    Every worker holds a single connection for its whole lifetime and keeps
+    pulling files from a shared queue, so large files do not leave other
+    workers idle. A single worker runs on the calling thread, which keeps
+    the serial path easy to debug.
+
+    When batch limits are given, files are coalesced into a single COPY
+    stream per batch, committed once, instead of one COPY per file.
+
+    Raw files are formatted on the fly while being streamed to COPY, so
+    they do not need to be formatted on disk beforehand.
+
+    Args:
+        files: paths to price files
+        table: destination table name
+        workers: number of concurrent workers
+        batch_rows: rows per coalesced batch
+        batch_bytes: bytes per coalesced batch
+        raw: whether files are raw, not yet formatted, source files
+
+    Returns:
+        nothing.
+    """
+    # queue files to be shared by workers
+    pending = queue.Queue()
+    for file in files:
+        pending.put(file)
+
+    # bind worker arguments
+    def work() -> typing.Tuple[int, float]:
+        return load_prices_worker(
+            pending,
+            table,
+            progress,
+            batch_rows,
+            batch_bytes,
+            raw
+        )
+
+    # run workers sharing a single progress bar
+    with tqdm.tqdm(total=len(files)) as progress:
+
+        # single worker: load on current thread
+        if workers <= 1:
+            results = [work()]
+
+        else:
+            # workers counted within caller metrics phase
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, work)
+                    for _ in range(workers)
+                ]
+                results = [future.result() for future in futures]
+
+    # report workers throughput
+    for worker, (rows, elapsed) in enumerate(results):
+        rate = rows / elapsed if elapsed else 0.0
+        print(f'👷 Worker {worker}: {rows} rows in {elapsed:.1f}s '
+              f'({rate:,.0f} rows/s)')
+
+
+def load_prices_worker(pending: queue.Queue,
+                       table: str,
+                       progress: typing.Any,
+                       batch_rows: typing.Optional[int] = None,
+                       batch_bytes: typing.Optional[int] = None,
+                       raw: bool = False) -> typing.Tuple[int, float]:
+    """
+    Loads queued price files until queue is drained.
+
+    Args:
+        pending: queue of price files paths to be loaded
+        table: destination table name
+        progress: shared progress bar
+        batch_rows: rows per coalesced batch
+        batch_bytes: bytes per coalesced batch
+        raw: whether files are raw, not yet formatted, source files
+
+    Returns:
+        number of loaded rows and elapsed seconds.
+    """
+    started = time.perf_counter()
+
+    batched = batch_rows is not None or batch_bytes is not None
+
+    # formatted files without batch limits: one COPY per file
+    if not raw and not batched:
+        rows = load_files(drain(pending), table, PRICE_COLUMNS, progress)
+
+    # otherwise stream lines, one COPY per file or per batch of files
+    else:
+        read = stream_prices_source if raw else read_lines
+        sources = ((path, read(path)) for path in drain(pending))
+        streams = coalesce(
+            sources,
+            batch_rows if batched else 1,
+            batch_bytes,
+            progress
+        )
+        rows = load_batches(streams, table, PRICE_COLUMNS)
+
+    return rows, time.perf_counter() - started
+
+
+def coalesce(sources: typing.Iterator[typing.Tuple[str, typing.Iterable[str]]],
+             max_rows: typing.Optional[int],
+             max_bytes: typing.Optional[int],
+             progress: typing.Optional[typing.Any] = None
+             ) -> typing.Iterator[CoalescedStream]:
+    """
+    Split sources into consecutive coalesced streams.
+
+    Each stream must be fully read before requesting the next one.
+
+    Args:
+        sources: iterator of source names and their lines
+        max_rows: rows per stream
+        max_bytes: bytes per stream
+        progress: progress bar updated once per exhausted source
+
+    Returns:
+        coalesced streams.
+    """
+    while True:
+        stream = CoalescedStream(sources, max_rows, max_bytes, progress)
+        yield stream
+
+        # sources ran out: no more streams
+        if stream.exhausted:
+            return
+
+
+def drain(pending: queue.Queue) -> typing.Iterator[str]:
+    """
+    Yield items from queue until it is empty.
+
+    Args:
+        pending: queue to be drained
+
+    Returns:
+        queued items.
+    """
+    while True:
+        try:
+            yield pending.get_nowait()
+        except queue.Empty:
+            return
@@ -0,0 +1,128 @@
+"""
+Loaded source files manifest utilities.
+"""
+
+import hashlib
+import os
+import pyarrow
+import pyarrow.ipc
+import typing
+
+
+# bytes read at a time when hashing files
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class ManifestEntry(typing.NamedTuple):
+    """
+    Loaded source file, as recorded in load manifest.
+    """
+    path: str
+    size: int
+    modified: int
+    digest: str
+    rows: int
+
+
+def fingerprint_file(path: str, header: bool = False) -> ManifestEntry:
+    """
+    Describe source file by size, modification time, content hash and rows.
+
+    Args:
+        path: path to source file
+        header: whether first line is a header, not counted as a row
+
+    Returns:
+        manifest entry of source file.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    lines = 0
+    last = b'\n'
+
+    # hash and count lines of file, block by block
+    with open(path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+            lines += block.count(b'\n')
+            last = block[-1:]
+
+    # last line without trailing line break: count it as well
+    if last != b'\n':
+        lines += 1
+    rows = max(lines - int(header), 0)
+
+    # binary Arrow staged file: count record batches rows instead
+    if path.endswith('.arrow'):
+        rows = count_arrow_rows(path)
+
+    return ManifestEntry(
+        path,
+        stat.st_size,
+        stat.st_mtime_ns,
+        digest.hexdigest(),
+        rows
+    )
+
+
+def count_arrow_rows(path: str) -> int:
+    """
+    Count rows of Arrow IPC stream file, reading batches memory mapped.
+
+    Args:
+        path: path to Arrow IPC stream file
+
+    Returns:
+        number of rows.
+    """
+    with pyarrow.memory_map(path) as source:
+        return sum(
+            batch.num_rows
+            for batch in pyarrow.ipc.open_stream(source)
+        )
+
+
+def scan_files(paths: typing.Iterable[str],
+               manifest: typing.Dict[str, ManifestEntry],
+               header: bool = False
+               ) -> typing.Tuple[typing.List[ManifestEntry],
+                                 typing.List[ManifestEntry]]:
+    """
+    Compare source files against load manifest.
+
+    Files with the recorded size and modification time are taken as
+    unchanged without being read. Otherwise their content hash decides,
+    so rewritten files with identical content are not loaded again.
+
+    Args:
+        paths: paths to source files
+        manifest: loaded files entries, by path
+        header: whether first line of files is a header
+
+    Returns:
+        entries of new or modified files to be loaded, and entries of
+        unmodified files whose recorded metadata is outdated.
+    """
+    changed = []
+    outdated = []
+
+    for path in paths:
+        loaded = manifest.get(path)
+
+        # same size and modification time: unchanged, skip hashing
+        if loaded is not None:
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) == (loaded.size, loaded.modified):
+                continue
+
+        entry = fingerprint_file(path, header)
+
+        # same content, touched on disk: only refresh metadata
+        if loaded is not None and entry.digest == loaded.digest:
+            outdated.append(entry)
+
+        # new or modified file: to be loaded
+        else:
+            changed.append(entry)
+
+    return changed, outdated
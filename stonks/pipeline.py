@@ -2,21 +2,197 @@
 ETL pipeline for currency exchange rate dataset.
 """
 
-from checks import check_for_minimum_rows
-from checks import check_static_file_is_fully_loaded
+from checks import CheckResult
+from checks import duplicate_keys
+from checks import minimum_rows
+from checks import null_ratio
+from checks import orphaned_keys
+from checks import rows_number
+from checks import run_checks
+from database import connection_pool
+from database import get_values
 from database import run_queries
+from database import run_values
+from database import load_batches
+from database import load_csv
 from database import load_data
+from extraction import CROSS_RATES_BASE
 from extraction import CURRENCIES
-from extraction import fetch_yearly_exchange_rates
-from extraction import unload_exchange_rates
-from sql_queries import TEARDOWN, INITIALIZE, TRANSFORM_DATES, FETCH_ROWS, FETCH_ALL
+from extraction import build_rates_matrix
+from extraction import check_cross_rates
+from extraction import evict_cached_responses
+from extraction import fetch_exchange_rates
+from extraction import get_payload_watermark
+from extraction import load_watermarks
+from extraction import save_watermarks
+from extraction import stream_long_rates
+from extraction import unload_cross_rates
+from extraction import unload_rates_table
+from extraction import unpivot_rates_batch
+from export import export_tables
+from instrumentation import Recorder
+from instrumentation import recording
+from loaders import PRICE_COLUMNS
+from loaders import coalesce
+from loaders import load_prices
+from manifest import ManifestEntry
+from manifest import scan_files
+from scheduler import Stage
+from scheduler import get_dependents
+from scheduler import load_checkpoints
+from scheduler import run_stages
+from scheduler import save_checkpoints
+from sql_queries import TEARDOWN, INITIALIZE
+from sql_queries import EXTEND_DATE_DIMENSION, FETCH_DATES_RANGE
+from sql_queries import INITIALIZE_LONG, INITIALIZE_PARTITIONED
+from sql_queries import CREATE_WIDE_CURRENCY_FACTS_VIEW
+from sql_queries import CREATE_DEFAULT_PARTITION, CREATE_YEAR_PARTITION
+from sql_queries import COUNT_ROWS, TRUNCATE_TABLE
+from sql_queries import CREATE_STAGING_TABLE, UPSERT_STAGED_ROWS
+from sql_queries import DELETE_ROWS_BY_KEY
+from sql_queries import FETCH_LOAD_MANIFEST, RECORD_LOADED_FILES
+from sql_queries import REFRESH_LOADED_FILES
+from sql_queries import CREATE_SUMMARY_TABLE, REFRESH_SUMMARY_TABLE
+from sql_queries import SUMMARIZE_COMMODITIES, SUMMARIZE_EXCHANGE_RATES
+from sql_queries import SUMMARIZE_PRICES
+from sql_queries import ADD_PRIMARY_KEY, ANALYZE_TABLE, CREATE_NATURAL_KEYS
+from sql_queries import CREATE_LONG_NATURAL_KEYS
+from sql_queries import CREATE_LOOKUP_INDEXES, CREATE_LONG_LOOKUP_INDEXES
+from sql_queries import DEFER_TABLE_INDEXES, SET_TABLE_LOGGED
+from formatters import COMMODITIES_DIM_PATH
+from formatters import COMMODITIES_FACT_PATH
 from formatters import format_commodities_data
 from formatters import format_prices_data
+from formatters import get_price_symbol
+from formatters import get_staging_path
+from streams import RecordBatchStream
 
+import argparse
+import contextlib
+import datetime
+import functools
 import glob
 import tqdm
+import typing
 
 
+WATERMARKS_PATH = './data/currencies/watermarks.json'
+CHECKPOINTS_PATH = './data/checkpoints.json'
+STARTED_PATH = './data/started.json'
+METRICS_PATH = './data/metrics.jsonl'
+PROMETHEUS_PATH = './data/metrics.prom'
+RESPONSES_CACHE_PATH = './data/currencies/cache'
+
+# natural keys of tables loaded through staging tables on upserts
+NATURAL_KEYS = {
+    'currencies.fact_exchange_rate': ['currency_source', 'currency_date'],
+    'currencies.fact_exchange_rate_long': [
+        'currency_source',
+        'currency_target',
+        'currency_date'
+    ],
+    'currencies.dim_currency': ['currency_source'],
+    'currencies.fact_stock_price': ['stock_symbol', 'price_date'],
+    'currencies.fact_etf_price': ['stock_symbol', 'price_date'],
+    'currencies.dim_commodity': ['comm_code'],
+}
+
+CURRENCY_FACTS_COLUMNS = ['currency_source', 'currency_date', *CURRENCIES]
+LONG_CURRENCY_FACTS_COLUMNS = [
+    'currency_source',
+    'currency_target',
+    'currency_date',
+    'rate'
+]
+CURRENCY_DIMENSIONS_COLUMNS = [
+    'currency_source',
+    'currency_name',
+    'subunit',
+    'symbol'
+]
+COMMODITY_FACTS_COLUMNS = [
+    'country_or_area',
+    'year',
+    'comm_code',
+    'flow',
+    'trade_usd',
+    'weight_kg',
+    'quantity'
+]
+COMMODITY_DIMENSIONS_COLUMNS = [
+    'comm_code',
+    'commodity',
+    'quantity_name',
+    'category'
+]
+
+# fact tables loaded without indexes on bulk loads, by primary key column
+BULK_LOADED_TABLES = {
+    'currencies.fact_exchange_rate': 'currency_id',
+    'currencies.fact_stock_price': 'id',
+    'currencies.fact_etf_price': 'id',
+    'currencies.fact_commodities_stats': 'id',
+}
+
+# fact tables partitioned by year of date column, by first partitioned year
+PARTITIONED_TABLES = {
+    'currencies.fact_exchange_rate': 1999,
+    'currencies.fact_stock_price': 1962,
+    'currencies.fact_etf_price': 1993,
+}
+
+# long exchange rates primary key columns, replacing wide rates table ones
+LONG_BULK_LOADED_TABLES = {
+    'currencies.fact_exchange_rate_long':
+        'currency_source, currency_target, currency_date',
+    **{
+        table: column for table, column in BULK_LOADED_TABLES.items()
+        if table != 'currencies.fact_exchange_rate'
+    }
+}
+
+# tables written by every load stage
+LOADED_TABLES = {
+    'load currencies': [
+        'currencies.fact_exchange_rate',
+        'currencies.dim_currency'
+    ],
+    'load stocks': ['currencies.fact_stock_price'],
+    'load ETFs': ['currencies.fact_etf_price'],
+    'load commodities': [
+        'currencies.fact_commodities_stats',
+        'currencies.dim_commodity'
+    ],
+}
+
+# long exchange rates tables written by loads, replacing wide rates table
+LONG_LOADED_TABLES = {
+    **LOADED_TABLES,
+    'load currencies': [
+        'currencies.fact_exchange_rate_long',
+        'currencies.dim_currency'
+    ],
+}
+
+# dated fact tables, by date column
+DATED_TABLES = {
+    'currencies.fact_exchange_rate': 'currency_date',
+    'currencies.fact_stock_price': 'price_date',
+    'currencies.fact_etf_price': 'price_date',
+}
+
+# formats of intermediate files handed from extraction to loads
+STAGING_FORMATS = ['csv', 'arrow']
+
+# share of missing values tolerated on checked measures columns
+MAX_NULL_RATIO = 0.01
+
+# summarized periods, by summary tables suffix
+SUMMARY_PERIODS = {
+    'monthly': 'year, month',
+    'yearly': 'year',
+}
+
 TABLES = [
     'currencies.fact_exchange_rate',
     'currencies.dim_date',
@@ -30,7 +206,32 @@ TABLES = [
 
 def run(teardown: bool = False,
         format_price_files: bool = False,
-        format_commodities_files: bool = False) -> None:
+        format_commodities_files: bool = False,
+        pool_size: int = 4,
+        pool_min_size: typing.Optional[int] = None,
+        workers: int = 1,
+        batch_rows: typing.Optional[int] = None,
+        batch_bytes: typing.Optional[int] = None,
+        stream_price_files: bool = False,
+        commodities_chunksize: typing.Optional[int] = None,
+        commodities_max_memory: typing.Optional[int] = None,
+        currency_concurrency: int = 8,
+        derive_cross_rates: bool = False,
+        verify_cross_rates: typing.Optional[typing.List[str]] = None,
+        incremental_currencies: bool = False,
+        full_refresh: bool = False,
+        cache_responses: bool = False,
+        upsert: bool = False,
+        skip_unchanged: bool = False,
+        bulk_load: bool = False,
+        partition_by_year: bool = False,
+        long_exchange_rates: bool = False,
+        export_path: typing.Optional[str] = None,
+        staging_format: str = 'csv',
+        max_parallel: int = 1,
+        resume: bool = False,
+        force: typing.Optional[typing.List[str]] = None,
+        approximate_checks: bool = False) -> None:
     """
     Execute ETL pipeline for currency exchange rate dataset.
 
@@ -38,56 +239,480 @@ def run(teardown: bool = False,
         teardown: whether existing schema should be dropped
         format_price_files: whether price source files should be formatted
         format_commodities_files: whether commodities  files should be formatted
+        pool_size: maximum number of pooled database connections
+        pool_min_size: pooled connections opened upfront and kept open once
+                       returned, every pooled connection by default
+        workers: number of concurrent price files loading workers
+        batch_rows: rows per coalesced price files COPY batch
+        batch_bytes: bytes per coalesced price files COPY batch
+        stream_price_files: whether raw price files are formatted on the fly
+                            while loaded, instead of formatted on disk
+        commodities_chunksize: rows formatted at a time from commodities file
+        commodities_max_memory: memory ceiling in bytes when formatting
+                                commodities file, used to derive chunk size
+        currency_concurrency: maximum number of simultaneous currency requests
+        derive_cross_rates: whether exchange rates from every base currency
+                            are derived from a single base currency fetch
+        verify_cross_rates: base currencies directly fetched to check derived
+                            cross rates against
+        incremental_currencies: whether only exchange rates after the last
+                                loaded date of each base are fetched
+        full_refresh: whether incremental exchange rates are fully reloaded
+        cache_responses: whether exchange rates API responses are cached on
+                         disk and replayed while fresh
+        upsert: whether loads go through staging tables and update or insert
+                rows by natural key, so runs can be repeated safely
+        skip_unchanged: whether source files recorded as loaded in load
+                        manifest are skipped when unchanged
+        bulk_load: whether fact tables are loaded unlogged and without
+                   indexes, built once every table is loaded
+        partition_by_year: whether fact tables are created partitioned by
+                           year of their date column
+        long_exchange_rates: whether exchange rates are stored one rate per
+                             row, exposed in wide shape through a view
+        export_path: path to folder tables are exported to as Parquet files
+        staging_format: format of exchange rates and formatted commodities
+                        intermediate files, 'csv' or typed binary 'arrow'
+        max_parallel: maximum number of independent pipeline stages run at
+                      the same time, such as loading prices while exchange
+                      rates are fetched
+        resume: whether stages done by previous run, as recorded in its
+                checkpoints, are skipped
+        force: stages run again when resuming, along with stages depending
+               on them
+        approximate_checks: whether fact tables checks are estimated from
+                            catalog, statistics and samples, within error
+                            bounds, instead of measured exactly
 
     Returns:
         nothing.
     """
+    # bulk loads defer natural keys that upserts rely on
+    if bulk_load and upsert:
+        raise ValueError('😔 Bulk loads can not be upserted')
+
+    # partitioned tables logged status can not be switched
+    if bulk_load and partition_by_year:
+        raise ValueError('😔 Bulk loads can not be partitioned')
+
+    # wide exchange rates view can not be partitioned
+    if long_exchange_rates and partition_by_year:
+        raise ValueError('😔 Long exchange rates can not be partitioned')
+
+    # intermediate files are either CSV or Arrow IPC streams
+    if staging_format not in STAGING_FORMATS:
+        raise ValueError(f'😔 Unknown staging format: {staging_format}')
+
+    # measure every stage, appending records to metrics file
+    recorder = Recorder(METRICS_PATH)
+
+    # results of done stages, by stage name
+    results = {}
+
+    # declare pipeline stages, each after the stages it depends on
+    stages = []
+    setup = []
+
+    # get last loaded dates, unless everything is to be reloaded
+    stages.append(
+        timed_stage(
+            'read watermarks',
+            lambda: load_watermarks(WATERMARKS_PATH)
+            if incremental_currencies and not full_refresh else {},
+            recorder
+        )
+    )
+
     # teardown is flagged: drop existing schema if exists
     if teardown:
-       teardown_database()
+        stages.append(timed_stage('teardown', teardown_database, recorder))
+        setup = ['teardown']
 
     # initialize database tables
-    initialize_database()
+    stages.append(
+        timed_stage(
+            'initialize',
+            functools.partial(
+                initialize_database,
+                partition_by_year,
+                long_exchange_rates,
+                upsert
+            ),
+            recorder,
+            setup
+        )
+    )
+    setup = ['initialize']
+
+    # bulk load flagged: load fact tables without indexes nor WAL
+    if bulk_load:
+        stages.append(
+            timed_stage(
+                'defer indexes',
+                functools.partial(defer_fact_indexes, long_exchange_rates),
+                recorder,
+                setup
+            )
+        )
+        setup = ['defer indexes']
 
     # extract and unload currency data from remote API
-    extract_currencies_source_data()
+    stages.append(
+        timed_stage(
+            'extract currencies',
+            lambda: extract_currencies_source_data(
+                currency_concurrency,
+                derive_cross_rates,
+                verify_cross_rates,
+                results['read watermarks'],
+                RESPONSES_CACHE_PATH if cache_responses else None,
+                staging_format
+            ),
+            recorder,
+            ['read watermarks']
+        )
+    )
 
     # load currency data into final tables
-    load_final_currencies_tables()
+    stages.append(
+        timed_stage(
+            'load currencies',
+            functools.partial(
+                load_final_currencies_tables,
+                incremental_currencies,
+                full_refresh,
+                upsert,
+                skip_unchanged,
+                long_exchange_rates,
+                staging_format
+            ),
+            recorder,
+            [*setup, 'extract currencies']
+        )
+    )
 
-    # format stocks and ETFs source files flagged: format files
-    if format_price_files:
-        format_prices_data('./data/stocks')
-        format_prices_data('./data/ETFs')
+    # currency data loaded: move watermarks forward
+    if incremental_currencies:
+        stages.append(
+            timed_stage(
+                'save watermarks',
+                lambda: save_watermarks(
+                    WATERMARKS_PATH,
+                    {
+                        **results['read watermarks'],
+                        **results['extract currencies']
+                    }
+                ),
+                recorder,
+                ['load currencies']
+            )
+        )
 
-    # load stocks and ETF prices final tables
-    load_final_prices_tables('stocks', 'fact_stock_price')
-    load_final_prices_tables('ETFs', 'fact_etf_price')
+    # load stocks and ETF prices final tables, formatted first if flagged
+    for source, table in [('stocks', 'fact_stock_price'),
+                          ('ETFs', 'fact_etf_price')]:
+        formatted = []
+        if format_price_files and not stream_price_files:
+            stages.append(
+                timed_stage(
+                    f'format {source}',
+                    functools.partial(format_prices_data, f'./data/{source}'),
+                    recorder
+                )
+            )
+            formatted = [f'format {source}']
+
+        stages.append(
+            timed_stage(
+                f'load {source}',
+                functools.partial(
+                    load_final_prices_tables,
+                    source,
+                    table,
+                    workers,
+                    batch_rows,
+                    batch_bytes,
+                    stream_price_files,
+                    upsert,
+                    skip_unchanged
+                ),
+                recorder,
+                [*setup, *formatted]
+            )
+        )
 
     # format commodities data is flagged: format files
+    formatted = []
     if format_commodities_files:
-        format_commodities_data(
-            './data/commodities/commodity_trade_statistics.csv'
+        stages.append(
+            timed_stage(
+                'format commodities',
+                functools.partial(
+                    format_commodities_data,
+                    './data/commodities/commodity_trade_statistics.csv',
+                    commodities_chunksize,
+                    commodities_max_memory,
+                    staging_format
+                ),
+                recorder
+            )
         )
+        formatted = ['format commodities']
 
     # load commodities trade stats data
-    load_final_commodities_tables()
+    stages.append(
+        timed_stage(
+            'load commodities',
+            functools.partial(
+                load_final_commodities_tables,
+                upsert,
+                skip_unchanged,
+                staging_format
+            ),
+            recorder,
+            [*setup, *formatted]
+        )
+    )
+    loads = ['load currencies', 'load stocks', 'load ETFs', 'load commodities']
+
+    # bulk load done: build indexes once, then log and analyze tables
+    if bulk_load:
+        stages.append(
+            timed_stage(
+                'fact indexes',
+                functools.partial(
+                    build_fact_indexes,
+                    recorder,
+                    long_exchange_rates
+                ),
+                recorder,
+                loads
+            )
+        )
+        loads = [*loads, 'fact indexes']
 
-    # run transformations
-    load_derived_tables()
+    # run transformations over rows touched by loads
+    stages.append(
+        timed_stage(
+            'derived tables',
+            lambda: load_derived_tables(get_touched_conditions(results)),
+            recorder,
+            loads
+        )
+    )
 
     # check tables data quality
-    check_for_minimum_rows(FETCH_ROWS, 10, TABLES)
-    check_static_file_is_fully_loaded(
-        FETCH_ALL,
-        33,
-        ['currencies.dim_currency']
+    stages.append(
+        timed_stage(
+            'checks',
+            functools.partial(
+                check_tables,
+                long_exchange_rates,
+                approximate_checks
+            ),
+            recorder,
+            ['derived tables']
+        )
     )
 
+    # export path given: export tables to columnar files
+    if export_path is not None:
+        stages.append(
+            timed_stage(
+                'export',
+                functools.partial(export_tables, TABLES, export_path),
+                recorder,
+                ['checks']
+            )
+        )
+
+    # start time of stages started by previous runs and this one, by name
+    started = {}
+
+    # resuming: skip stages done by previous run, unless forced again
+    reloaded = []
+    if resume:
+        results.update(load_checkpoints(CHECKPOINTS_PATH))
+        started.update(load_checkpoints(STARTED_PATH))
+        for name in get_dependents(stages, force or []):
+            results.pop(name, None)
+        print(f'\n⏩ Resuming, skipping {len(results)} stages already done...')
+
+        # loads started without being done, or forced again: may have
+        # committed some rows before failing
+        reloaded = get_reloaded_tables(
+            [
+                stage.name for stage in stages
+                if stage.name in LOADED_TABLES
+                and stage.name in started
+                and stage.name not in results
+            ],
+            teardown,
+            upsert,
+            skip_unchanged,
+            incremental_currencies and not full_refresh,
+            long_exchange_rates
+        )
+
+    # fresh run: forget checkpoints of previous run
+    else:
+        save_checkpoints(CHECKPOINTS_PATH, {})
+        save_checkpoints(STARTED_PATH, {})
+
+    # record every stage start before it may commit anything
+    def start(name: str) -> None:
+        started[name] = datetime.datetime.now().isoformat(timespec='seconds')
+        save_checkpoints(STARTED_PATH, started)
+
+    # count database and extraction activity of stages, sharing pooled
+    # connections among every concurrent stage and worker
+    try:
+        max_size = max(pool_size, workers * max_parallel)
+        min_size = min(pool_min_size or max_size, max_size)
+        with recording(recorder), \
+                connection_pool(min_size=min_size, max_size=max_size):
+
+            # drop rows committed by loads run again
+            if reloaded:
+                print(f'\n🧹 Emptying {len(reloaded)} reloaded tables...')
+                run_queries([
+                    TRUNCATE_TABLE.format(table=table)
+                    for table in reloaded
+                ])
+
+            # record every started stage, then every done one along with
+            # its result
+            run_stages(
+                stages,
+                max_parallel,
+                results,
+                lambda name, result: save_checkpoints(
+                    CHECKPOINTS_PATH,
+                    results
+                ),
+                start
+            )
+
+    # report metrics, failed runs included
+    finally:
+        recorder.finish()
+        recorder.report()
+        recorder.write_textfile(PROMETHEUS_PATH)
 
     print('\n\n🎉 Done!\n')
 
 
+def get_reloaded_tables(loads: typing.List[str],
+                        teardown: bool,
+                        upsert: bool,
+                        skip_unchanged: bool,
+                        appending_rates: bool,
+                        long_rates: bool = False) -> typing.List[str]:
+    """
+    Get tables to be emptied before loads run again when resuming.
+
+    Loads commit their rows as they go, so loads started by a previous run
+    find its rows when run again. Upserts merge them and skipped unchanged files
+    replace them, unless exchange rates are appended. Otherwise, torn down
+    runs only hold rows loaded by themselves, so tables of these loads are
+    emptied, while appending rows once more to previous runs ones is refused.
+
+    Args:
+        loads: names of load stages started before, run again
+        teardown: whether tables were created by the resumed run
+        upsert: whether rows are updated or inserted by natural key
+        skip_unchanged: whether source files loaded unchanged are skipped
+        appending_rates: whether exchange rates are appended to loaded ones
+        long_rates: whether exchange rates are stored one rate per row
+
+    Returns:
+        tables to be emptied.
+
+    Raises:
+        ValueError: when loads run again would load rows twice.
+    """
+    tables = LONG_LOADED_TABLES if long_rates else LOADED_TABLES
+    reloaded = []
+
+    for name in loads:
+
+        # rows merged or replaced: loads are idempotent
+        appending = appending_rates and name == 'load currencies'
+        if upsert or (skip_unchanged and not appending):
+            continue
+
+        # rows loaded on top of previous runs ones: can not be told apart
+        if not teardown:
+            raise ValueError(f'😔 Resumed {name} would load rows twice, '
+                             f'use upsert or skip_unchanged')
+
+        reloaded.extend(tables[name])
+
+    return reloaded
+
+
+def check_tables(long_rates: bool = False,
+                 approximate: bool = False) -> typing.List[CheckResult]:
+    """
+    Check loaded tables data quality, failing on any unmet check.
+
+    Row counts, null ratios, duplicated natural keys, dates missing from
+    dates dimension and orphaned dimension keys are all measured by the
+    database, within a single query. Minimum row counts stop counting at
+    their minimum, so they stay exact on approximate checks.
+
+    Args:
+        long_rates: whether exchange rates are stored one rate per row
+        approximate: whether fact tables checks are estimated
+
+    Returns:
+        outcome of every check.
+    """
+    rates = 'currencies.fact_exchange_rate'
+    if long_rates:
+        rates = 'currencies.fact_exchange_rate_long'
+    prices = ['currencies.fact_stock_price', 'currencies.fact_etf_price']
+    commodities = 'currencies.fact_commodities_stats'
+
+    # approximate checks: refresh statistics they are estimated from
+    if approximate:
+        run_queries([
+            ANALYZE_TABLE.format(table=table)
+            for table in [rates, *prices, commodities]
+        ])
+
+    return run_checks([
+        *(minimum_rows(table, 10) for table in TABLES),
+        rows_number('currencies.dim_currency', 33),
+        *(duplicate_keys(table, NATURAL_KEYS[table], approximate)
+          for table in [rates, *prices]),
+        *(null_ratio(table, 'close', MAX_NULL_RATIO, approximate)
+          for table in prices),
+        null_ratio(commodities, 'trade_usd', MAX_NULL_RATIO, approximate),
+        *(orphaned_keys(
+            rates if table == 'currencies.fact_exchange_rate' else table,
+            column,
+            'currencies.dim_date',
+            'register_date',
+            approximate
+          ) for table, column in DATED_TABLES.items()),
+        orphaned_keys(
+            rates,
+            'currency_source',
+            'currencies.dim_currency',
+            'currency_source',
+            approximate
+        ),
+        orphaned_keys(
+            commodities,
+            'comm_code',
+            'currencies.dim_commodity',
+            'comm_code',
+            approximate
+        ),
+    ])
+
+
 def teardown_database() -> None:
     """
     Drop database schema as well as existing tables.
@@ -99,162 +724,823 @@ def teardown_database() -> None:
     run_queries(TEARDOWN)
 
 
-def initialize_database() -> None:
+def initialize_database(partitioned: bool = False,
+                        long_rates: bool = False,
+                        upsert: bool = False) -> None:
     """
     Create required database schema and tables.
 
+    Natural keys are only created for upserts, which merge rows on them,
+    so plain loads neither pay for their maintenance nor fail on reloads.
+    Long exchange rates primary key is their natural key already.
+
+    Args:
+        partitioned: whether fact tables are partitioned by year, from their
+                     first partitioned year up to next year, while other
+                     dates fall into a default partition
+        long_rates: whether exchange rates are stored one rate per row,
+                    exposed in wide shape through a view
+        upsert: whether loads are upserted, requiring natural keys
+
     Returns:
         nothing.
     """
     print('\n🔨 Initializing database...\n')
-    run_queries(INITIALIZE)
+    natural_keys = []
+    if upsert:
+        natural_keys = CREATE_LONG_NATURAL_KEYS if long_rates \
+            else CREATE_NATURAL_KEYS
+
+    # long exchange rates, pivoted back into wide rates view
+    if long_rates:
+        run_queries([
+            *INITIALIZE_LONG,
+            CREATE_WIDE_CURRENCY_FACTS_VIEW.format(
+                pivots=',\n    '.join(
+                    f"MAX(rate) FILTER (WHERE currency_target = '{currency}') "
+                    f"AS {currency}"
+                    for currency in CURRENCIES
+                )
+            ),
+            *natural_keys
+        ])
+        return
+
+    # plain tables
+    if not partitioned:
+        run_queries([*INITIALIZE, *natural_keys])
+        return
+
+    # partitioned tables, along with their yearly partitions
+    run_queries(INITIALIZE_PARTITIONED)
+    last_year = datetime.date.today().year + 1
+    for table, first_year in PARTITIONED_TABLES.items():
+        run_queries([
+            *[
+                CREATE_YEAR_PARTITION.format(
+                    table=table,
+                    year=year,
+                    next_year=year + 1
+                )
+                for year in range(first_year, last_year + 1)
+            ],
+            CREATE_DEFAULT_PARTITION.format(table=table)
+        ])
+    run_queries(natural_keys)
 
 
-def extract_currencies_source_data() -> None:
+def defer_fact_indexes(long_rates: bool = False) -> None:
     """
-    Extracts and unloads data from external API.
+    Drop fact tables indexes and write ahead logging ahead of bulk loads.
+
+    Args:
+        long_rates: whether exchange rates are stored one rate per row
+
+    Returns:
+        nothing.
+    """
+    print('\n🚚 Deferring fact tables indexes...\n')
+    tables = LONG_BULK_LOADED_TABLES if long_rates else BULK_LOADED_TABLES
+    run_queries([
+        DEFER_TABLE_INDEXES.format(table=table, name=table.split('.')[1])
+        for table in tables
+    ])
+
+
+def build_fact_indexes(recorder: Recorder,
+                       long_rates: bool = False) -> None:
+    """
+    Build fact tables indexes once loaded, then log and analyze tables.
+
+    Tables are logged before indexes are built, so indexes are not
+    rewritten once again when switching tables to logged. Natural keys,
+    only required by upserts, are left out of bulk loads, while lookup
+    indexes by symbol or base currency and date are rebuilt.
+
+    Args:
+        recorder: metrics recorder of pipeline phases
+        long_rates: whether exchange rates are stored one rate per row
 
     Returns:
         nothing.
     """
+    print('\n🏗️ Building fact tables indexes...\n')
+    tables = LONG_BULK_LOADED_TABLES if long_rates else BULK_LOADED_TABLES
+    lookups = CREATE_LONG_LOOKUP_INDEXES if long_rates \
+        else CREATE_LOOKUP_INDEXES
+
+    # write loaded tables to write ahead log
+    with recorder.phase('set logged'):
+        run_queries([
+            SET_TABLE_LOGGED.format(table=table)
+            for table in tables
+        ])
+
+    # build primary keys and lookup indexes
+    with recorder.phase('build indexes'):
+        run_queries([
+            ADD_PRIMARY_KEY.format(table=table, column=column)
+            for table, column in tables.items()
+        ])
+        run_queries(lookups)
+
+    # refresh planner statistics
+    with recorder.phase('analyze'):
+        run_queries([
+            ANALYZE_TABLE.format(table=table)
+            for table in tables
+        ])
+
+
+def timed_stage(name: str,
+                function: typing.Callable[[], typing.Any],
+                recorder: Recorder,
+                after: typing.Sequence[str] = ()) -> Stage:
+    """
+    Declare pipeline stage measured as a phase.
+
+    Args:
+        name: stage and phase name
+        function: stage work
+        recorder: metrics recorder of pipeline phases
+        after: names of stages this stage depends on
+
+    Returns:
+        pipeline stage.
+    """
+    def run_timed() -> typing.Any:
+        with recorder.phase(name):
+            return function()
+
+    return Stage(name, run_timed, after)
+
+
+def extract_currencies_source_data(
+        concurrency: int = 8,
+        derive: bool = False,
+        verify: typing.Optional[typing.List[str]] = None,
+        watermarks: typing.Optional[typing.Dict[str, str]] = None,
+        cache: typing.Optional[str] = None,
+        staging: str = 'csv') -> typing.Dict[str, str]:
+    """
+    Extracts and unloads data from external API.
+
+    Args:
+        concurrency: maximum number of simultaneous requests
+        derive: whether rates from every base currency are derived from a
+                single base currency fetch
+        verify: base currencies directly fetched to check derived rates
+        watermarks: last loaded date of each base currency, only later
+                    rates are extracted
+        cache: path to API responses cache folder
+        staging: unloaded files format, 'csv' or 'arrow'
+
+    Returns:
+        last unloaded date by base currency, for those with unloaded rates.
+    """
     print('\n✂️ Extracting currency exchanges source data...\n')
-    for currency in tqdm.tqdm(CURRENCIES):
-        rates = fetch_yearly_exchange_rates(currency, 1999)
-        unload_exchange_rates('./data/currencies/', rates)
+    watermarks = watermarks or {}
+
+    # drop cached responses that can no longer be replayed
+    if cache is not None:
+        evict_cached_responses(cache)
+
+    # derive every base currency from a single one
+    if derive:
+
+        # fetch since earliest watermark, everything if any base is missing
+        earliest = {}
+        if all(currency in watermarks for currency in CURRENCIES):
+            earliest[CROSS_RATES_BASE] = min(watermarks.values())
 
+        bases = [CROSS_RATES_BASE, *(verify or [])]
+        payloads = list(
+            fetch_exchange_rates(
+                bases,
+                1999,
+                concurrency,
+                watermarks={**watermarks, **earliest},
+                cache=cache,
+                columnar=True
+            )
+        )
+        fetched = {payload.base: payload for payload in payloads}
+
+        # build cross rates and check them against direct fetches
+        dates, matrix = build_rates_matrix(fetched[CROSS_RATES_BASE])
+        for base in verify or []:
+            check_cross_rates(dates, matrix, fetched[base])
+
+        return unload_cross_rates(
+            './data/currencies/',
+            dates,
+            matrix,
+            watermarks,
+            staging
+        )
+
+    # fetch every base currency directly
+    unloaded = {}
+    payloads = fetch_exchange_rates(
+        CURRENCIES,
+        1999,
+        concurrency,
+        watermarks=watermarks,
+        cache=cache,
+        columnar=True
+    )
+    for rates in tqdm.tqdm(payloads, total=len(CURRENCIES)):
+        unload_rates_table('./data/currencies/', rates, staging)
+
+        # track last unloaded date
+        watermark = get_payload_watermark(rates)
+        if watermark is not None:
+            unloaded[rates.base] = watermark
+
+    return unloaded
 
-def load_final_currencies_tables() -> None:
+
+def load_final_currencies_tables(incremental: bool = False,
+                                 full_refresh: bool = False,
+                                 upsert: bool = False,
+                                 skip_unchanged: bool = False,
+                                 long_rates: bool = False,
+                                 staging: str = 'csv'
+                                 ) -> typing.Optional[typing.List[str]]:
     """
     Loads final currencies tables into destination database.
 
+    Args:
+        incremental: whether exchange rates are appended to loaded ones
+        full_refresh: whether loaded exchange rates are replaced
+        upsert: whether rows are updated or inserted by natural key
+        skip_unchanged: whether source files loaded unchanged are skipped
+        long_rates: whether rates are unpivoted into one rate per row
+        staging: rates files format, 'csv' or 'arrow'
+
     Returns:
-        nothing.
+        base currencies of loaded rates, None when every one was loaded.
     """
     print('\n\n📦 Loading currency exchange tables...\n')
 
+    # get rates destination table and columns
+    facts = 'currencies.fact_exchange_rate'
+    columns = CURRENCY_FACTS_COLUMNS
+    if long_rates:
+        facts = 'currencies.fact_exchange_rate_long'
+        columns = LONG_CURRENCY_FACTS_COLUMNS
+
+    # full refresh: drop previously loaded rates
+    if full_refresh:
+        run_queries([TRUNCATE_TABLE.format(table=facts)])
+
+    # get rates source files of every base currency
+    sources = {
+        f'./data/currencies/currencies-{currency}.{staging}': currency
+        for currency in CURRENCIES
+    }
+
     # load currency rate facts table
-    for currency in tqdm.tqdm(CURRENCIES):
-        with open(f'./data/currencies/currencies-{currency}.csv', 'r') as input_file:
-            load_data(
-                input_file,
-                'currencies.fact_exchange_rate',
-                columns=['currency_source', 'currency_date', *CURRENCIES]
+    with manifested(list(sources), skip_unchanged, full_refresh) as paths:
+
+        # rates of modified files replace previously loaded ones
+        if skip_unchanged and not (incremental or full_refresh or upsert):
+            run_values(
+                DELETE_ROWS_BY_KEY.format(
+                    table=facts,
+                    column='currency_source'
+                ),
+                [(sources[path],) for path in paths]
             )
 
-    # load currency dimensions table
-    with open(f'./data/currencies/currencies-meta.csv', 'r') as input_file:
-        load_data(
-            input_file,
-            'currencies.dim_currency',
-            columns=['currency_source', 'currency_name','subunit', 'symbol']
+        with staged(facts, columns, upsert) as table:
+
+            # Arrow rates: convert every file to CSV while copied
+            if staging == 'arrow':
+                for path in tqdm.tqdm(paths):
+                    load_staged_file(
+                        path,
+                        table,
+                        columns,
+                        staging,
+                        unpivot_rates_batch if long_rates else None
+                    )
+
+            # long rates: unpivot every file into a single COPY
+            elif long_rates:
+                with tqdm.tqdm(total=len(paths)) as progress:
+                    load_batches(
+                        coalesce(
+                            ((path, stream_long_rates(path)) for path in paths),
+                            None,
+                            None,
+                            progress
+                        ),
+                        table,
+                        columns
+                    )
+
+            else:
+                for path in tqdm.tqdm(paths):
+                    with open(path, 'r') as input_file:
+                        load_data(input_file, table, columns=columns)
+
+    # get base currencies of loaded rates
+    bases = [sources[path] for path in paths]
+    if len(bases) == len(sources):
+        bases = None
+
+    # incremental load of already loaded dimensions: nothing to load
+    if incremental and not upsert and not skip_unchanged:
+        [(loaded,)] = get_values(
+            COUNT_ROWS.format(table='currencies.dim_currency')
         )
+        if loaded:
+            return bases
+
+    # load currency dimensions table
+    with manifested(['./data/currencies/currencies-meta.csv'],
+                    skip_unchanged) as paths:
 
+        # modified dimensions replace previously loaded ones
+        if paths and skip_unchanged and not upsert:
+            run_queries([
+                TRUNCATE_TABLE.format(table='currencies.dim_currency')
+            ])
 
-def load_final_prices_tables(source: str, table: str) -> None:
+        with staged('currencies.dim_currency',
+                    CURRENCY_DIMENSIONS_COLUMNS,
+                    upsert) as table:
+            for path in paths:
+                with open(path, 'r') as input_file:
+                    load_data(
+                        input_file,
+                        table,
+                        columns=CURRENCY_DIMENSIONS_COLUMNS
+                    )
+
+    return bases
+
+
+def load_final_prices_tables(source: str,
+                             table: str,
+                             workers: int = 1,
+                             batch_rows: typing.Optional[int] = None,
+                             batch_bytes: typing.Optional[int] = None,
+                             raw: bool = False,
+                             upsert: bool = False,
+                             skip_unchanged: bool = False
+                             ) -> typing.Optional[typing.List[str]]:
     """
     Loads final stocks and ETF prices tables.
 
     Args:
         source: whether load from 'stocks' or 'ETFs' folder
         table:  destination table name
+        workers: number of concurrent loading workers, serial when one
+        batch_rows: rows per coalesced COPY batch
+        batch_bytes: bytes per coalesced COPY batch
+        raw: whether source files are raw, formatted on the fly while loaded
+        upsert: whether rows are updated or inserted by natural key
+        skip_unchanged: whether source files loaded unchanged are skipped
 
     Returns:
-        nothing.
+        symbols of loaded prices, None when every file was loaded.
     """
     print(f'\n\n📦 Loading {source} prices tables...\n')
 
     # get stocks prices source files paths
     stock_files = glob.glob(f'./data/{source}/*.txt')
 
-    # load stocks prices data to database
-    for stock_file in tqdm.tqdm(stock_files):
-        with open(stock_file, 'r') as input_file:
-            load_data(
-                input_file,
-                f'currencies.{table}',
-                columns=[
-                    'stock_symbol',
-                    'price_date',
-                    'open',
-                    'high',
-                    'low',
-                    'close',
-                    'volume'
-                ]
+    with manifested(stock_files, skip_unchanged, header=raw) as paths:
+
+        # prices of modified files replace previously loaded ones
+        if skip_unchanged and not upsert:
+            run_values(
+                DELETE_ROWS_BY_KEY.format(
+                    table=f'currencies.{table}',
+                    column='stock_symbol'
+                ),
+                [(get_price_symbol(path),) for path in paths]
+            )
+
+        # load stocks prices data to database
+        with staged(f'currencies.{table}', PRICE_COLUMNS, upsert) as target:
+            load_prices(
+                paths,
+                target,
+                workers,
+                batch_rows,
+                batch_bytes,
+                raw
             )
 
+    # every file loaded: every symbol touched
+    if len(paths) == len(stock_files):
+        return None
+
+    return [get_price_symbol(path) for path in paths]
 
-def load_derived_tables() -> None:
+
+@contextlib.contextmanager
+def manifested(paths: typing.List[str],
+               skip_unchanged: bool,
+               reload: bool = False,
+               header: bool = False) -> typing.Iterator[typing.List[str]]:
+    """
+    Provide source files to load, skipping unchanged ones when asked.
+
+    Source files are compared against the load manifest by size and
+    modification time, then by content hash. Once loaded, new and modified
+    files are recorded in the manifest.
+
+    Args:
+        paths: paths to source files
+        skip_unchanged: whether files loaded unchanged are skipped
+        reload: whether every file is loaded and recorded again
+        header: whether first line of files is a header
+
+    Returns:
+        paths of source files to be loaded.
+    """
+    # no manifest: load every file
+    if not skip_unchanged:
+        yield paths
+        return
+
+    # compare files against manifest
+    manifest = {} if reload else get_load_manifest()
+    changed, outdated = scan_files(paths, manifest, header)
+    print(f'⏩ Skipping {len(paths) - len(changed)} unchanged files...\n')
+
+    yield [entry.path for entry in changed]
+
+    # files loaded: record them in manifest
+    run_values(RECORD_LOADED_FILES, [tuple(entry) for entry in changed])
+    run_values(
+        REFRESH_LOADED_FILES,
+        [(entry.path, entry.size, entry.modified) for entry in outdated]
+    )
+
+
+def get_load_manifest() -> typing.Dict[str, ManifestEntry]:
+    """
+    Get source files recorded as loaded.
+
+    Returns:
+        manifest entries, by source file path.
+    """
+    return {
+        row[0]: ManifestEntry(*row)
+        for row in get_values(FETCH_LOAD_MANIFEST)
+    }
+
+
+@contextlib.contextmanager
+def staged(table: str,
+           columns: typing.List[str],
+           upsert: bool) -> typing.Iterator[str]:
+    """
+    Provide table to load data into, staging it when upserting.
+
+    When upserting, data is loaded into an empty unlogged staging table,
+    then merged into destination table by natural key once loaded: new
+    rows are inserted and changed rows are updated.
+
+    Args:
+        table: destination table name
+        columns: loaded columns
+        upsert: whether rows are updated or inserted by natural key
+
+    Returns:
+        name of table to load data into.
+    """
+    # plain load: load straight into destination
+    if not upsert:
+        yield table
+        return
+
+    # create empty staging table
+    schema, name = table.split('.')
+    staging = f'{schema}.staging_{name}'
+    run_queries([
+        CREATE_STAGING_TABLE.format(
+            staging=staging,
+            table=table,
+            columns=', '.join(columns)
+        ),
+        TRUNCATE_TABLE.format(table=staging)
+    ])
+
+    yield staging
+
+    # merge staged rows by natural key, then empty staging table
+    keys = NATURAL_KEYS[table]
+    values = [column for column in columns if column not in keys]
+    run_queries([
+        UPSERT_STAGED_ROWS.format(
+            table=table,
+            staging=staging,
+            columns=', '.join(columns),
+            keys=', '.join(keys),
+            updates=', '.join(f'{value} = EXCLUDED.{value}' for value in values),
+            current=', '.join(f'{name}.{value}' for value in values),
+            excluded=', '.join(f'EXCLUDED.{value}' for value in values)
+        ),
+        TRUNCATE_TABLE.format(table=staging)
+    ])
+
+
+def load_derived_tables(touched: typing.Optional[
+                            typing.Dict[str, typing.Optional[str]]] = None
+                        ) -> None:
     """
     Loads derived tables data.
 
+    Args:
+        touched: condition matching rows touched by latest load, None when
+                 untouched, by fact table; every fact is taken as touched
+                 when not given
+
     Returns:
         nothing.
     """
     print(f'\n\n📦 Loading derived tables...\n')
 
-    # render transform from currencies dates
-    currencies = TRANSFORM_DATES.format(
-        dim_table='dim_date',
-        date_column='currency_date',
-        fact_table='fact_exchange_rate'
-    )
+    # render dates range of touched facts, of every fact when not given
+    ranges = []
+    for fact_table, date_column in DATED_TABLES.items():
+        condition = 'TRUE' if touched is None else touched.get(fact_table)
+        if condition is not None:
+            ranges.append(FETCH_DATES_RANGE.format(
+                fact_table=fact_table.split('.')[1],
+                date_column=date_column,
+                condition=condition
+            ))
 
-    # render transform from stock prices dates
-    stocks = TRANSFORM_DATES.format(
-        dim_table='dim_date',
-        date_column='price_date',
-        fact_table='fact_stock_price'
-    )
+    # extend calendar of dates dimension over touched dates range
+    if ranges:
+        run_queries([
+            EXTEND_DATE_DIMENSION.format(ranges='UNION ALL'.join(ranges))
+        ])
 
-    # render tranform from ETF prices dates
-    etf = TRANSFORM_DATES.format(
-        dim_table='dim_date',
-        date_column='price_date',
-        fact_table='fact_etf_price'
-    )
+    # summarize prices by symbol and period
+    summaries = []
+    for name in ['stock_price', 'etf_price']:
+        for suffix, period in SUMMARY_PERIODS.items():
+            summaries.append((
+                f'summary_{name}_{suffix}',
+                f'currencies.fact_{name}',
+                SUMMARIZE_PRICES.format(
+                    fact_table=f'fact_{name}',
+                    period=period,
+                    condition='{condition}'
+                ),
+                f'stock_symbol, {period}'
+            ))
+
+    # summarize exchange rates by base currency and month
+    summaries.append((
+        'summary_exchange_rate_monthly',
+        'currencies.fact_exchange_rate',
+        SUMMARIZE_EXCHANGE_RATES.format(
+            averages=', '.join(f'AVG({currency}) AS {currency}'
+                               for currency in CURRENCIES),
+            condition='{condition}'
+        ),
+        'currency_source, year, month'
+    ))
 
-    # load derived tables
-    run_queries([currencies, stocks, etf])
+    # summarize commodities trade by country, commodity, flow and year
+    summaries.append((
+        'summary_commodities_yearly',
+        'currencies.fact_commodities_stats',
+        SUMMARIZE_COMMODITIES,
+        'country_or_area, comm_code, flow, year'
+    ))
 
+    for summary, fact_table, select, keys in tqdm.tqdm(summaries):
+        condition = 'TRUE' if touched is None else touched.get(fact_table)
+        refresh_summary_table(summary, select, keys, condition)
 
-def load_final_commodities_tables() -> None:
+
+def refresh_summary_table(summary: str,
+                          select: str,
+                          keys: str,
+                          condition: typing.Optional[str]) -> None:
     """
-    Loads final commodities fact and dimensions table.
+    Refresh summary table rows touched by latest load.
+
+    Touched rows are deleted and summarized again from fact tables within
+    a single transaction, so readers never see them missing.
+
+    Args:
+        summary: summary table name
+        select: summarizing query, with a '{condition}' placeholder
+        keys: summary table key columns
+        condition: condition matching touched rows, None when untouched
 
     Returns:
         nothing.
     """
-    print(f'\n\n📦 Loading commodities trade tables...\n')
-
-    with open('./data/commodities/commodities-fact.csv', 'r') as input_file:
-        load_data(
-            input_file,
-            f'currencies.fact_commodities_stats',
-            columns=[
-                'country_or_area',
-                'year',
-                'comm_code',
-                'flow',
-                'trade_usd',
-                'weight_kg',
-                'quantity'
-            ]
+    # create empty summary table
+    run_queries([
+        CREATE_SUMMARY_TABLE.format(
+            summary=summary,
+            select=select.format(condition='FALSE'),
+            keys=keys
         )
+    ])
+
+    # untouched: nothing to refresh
+    if condition is None:
+        return
 
-    with open('./data/commodities/commodities-dim.csv', 'r') as input_file:
-        load_data(
-            input_file,
-            f'currencies.dim_commodity',
-            columns=[
-                'comm_code',
-                'commodity',
-                'quantity_name',
-                'category'
-            ]
+    # summarize touched rows again
+    run_queries([
+        REFRESH_SUMMARY_TABLE.format(
+            summary=summary,
+            select=select.format(condition=condition),
+            condition=condition
         )
+    ])
+
+
+def get_touched_conditions(results: typing.Dict[str, typing.Any]
+                           ) -> typing.Dict[str, typing.Optional[str]]:
+    """
+    Build conditions matching rows touched by every fact table load.
+
+    Args:
+        results: results of watermarks reading and load stages, by stage name
+
+    Returns:
+        condition matching touched rows, None when untouched, by fact table.
+    """
+    # rates touched since earliest watermark, every rate if any is missing
+    watermarks = results['read watermarks']
+    since = None
+    if all(currency in watermarks for currency in CURRENCIES):
+        since = min(watermarks.values())
+
+    return {
+        'currencies.fact_exchange_rate': get_touched_condition(
+            'currency_source',
+            results['load currencies'],
+            since
+        ),
+        'currencies.fact_stock_price': get_touched_condition(
+            'stock_symbol',
+            results['load stocks']
+        ),
+        'currencies.fact_etf_price': get_touched_condition(
+            'stock_symbol',
+            results['load ETFs']
+        ),
+        'currencies.fact_commodities_stats':
+            'TRUE' if results['load commodities'] else None,
+    }
+
+
+def get_touched_condition(column: str,
+                          keys: typing.Optional[typing.List[str]],
+                          since: typing.Optional[str] = None
+                          ) -> typing.Optional[str]:
+    """
+    Build condition matching summarized rows touched by latest load.
+
+    Args:
+        column: key column of loaded rows
+        keys: loaded keys, every key when None
+        since: earliest loaded date, every date when None, matched by month
+
+    Returns:
+        SQL condition, None when nothing was loaded.
+    """
+    conditions = []
+
+    # some keys loaded: only match them, nothing if none
+    if keys is not None:
+        if not keys:
+            return None
+        values = ', '.join("'{}'".format(key.replace("'", "''"))
+                           for key in keys)
+        conditions.append(f'{column} IN ({values})')
+
+    # loaded since date: only match its month onwards
+    if since is not None:
+        year, month = since.split('-')[:2]
+        conditions.append(f'(year, month) >= ({int(year)}, {int(month)})')
+
+    return ' AND '.join(conditions) or 'TRUE'
+
+
+def load_final_commodities_tables(upsert: bool = False,
+                                  skip_unchanged: bool = False,
+                                  staging: str = 'csv') -> bool:
+    """
+    Loads final commodities fact and dimensions table.
+
+    Args:
+        upsert: whether facts are replaced and dimensions are updated or
+                inserted by natural key
+        skip_unchanged: whether source files loaded unchanged are skipped
+        staging: formatted files format, 'csv' or 'arrow'
+
+    Returns:
+        whether facts were loaded.
+    """
+    print(f'\n\n📦 Loading commodities trade tables...\n')
+
+    facts = get_staging_path(COMMODITIES_FACT_PATH, staging)
+    dimensions = get_staging_path(COMMODITIES_DIM_PATH, staging)
+
+    with manifested([facts], skip_unchanged) as paths:
+        loaded = bool(paths)
+
+        # facts have no natural key and come from a single file: replace them
+        if paths and (upsert or skip_unchanged):
+            run_queries([
+                TRUNCATE_TABLE.format(table='currencies.fact_commodities_stats')
+            ])
+
+        for path in paths:
+            load_staged_file(
+                path,
+                'currencies.fact_commodities_stats',
+                COMMODITY_FACTS_COLUMNS,
+                staging
+            )
+
+    with manifested([dimensions], skip_unchanged) as paths:
+
+        # modified dimensions replace previously loaded ones
+        if paths and skip_unchanged and not upsert:
+            run_queries([
+                TRUNCATE_TABLE.format(table='currencies.dim_commodity')
+            ])
+
+        with staged('currencies.dim_commodity',
+                    COMMODITY_DIMENSIONS_COLUMNS,
+                    upsert) as table:
+            for path in paths:
+                load_staged_file(
+                    path,
+                    table,
+                    COMMODITY_DIMENSIONS_COLUMNS,
+                    staging
+                )
+
+    return loaded
+
+
+def load_staged_file(path: str,
+                     table: str,
+                     columns: typing.List[str],
+                     staging: str = 'csv',
+                     transform: typing.Optional[
+                         typing.Callable[[typing.Any], typing.Any]] = None
+                     ) -> None:
+    """
+    Loads intermediate file into table, whatever its staging format.
+
+    Arrow files are converted to CSV batch by batch while copied, so they
+    are only turned into text at the database edge.
+
+    Args:
+        path: path to intermediate file
+        table: name of destination table
+        columns: list of columns to be derived in order from file
+        staging: intermediate file format, 'csv' or 'arrow'
+        transform: function applied to every Arrow record batch
+
+    Returns:
+        nothing.
+    """
+    # Arrow file: stream record batches as CSV
+    if staging == 'arrow':
+        load_csv(RecordBatchStream(path, transform), table, columns)
+        return
+
+    with open(path, 'r') as input_file:
+        load_data(input_file, table, columns=columns)
 
 if __name__ == '__main__':
 
+    # parse pipeline options
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='skip stages done by previous run'
+    )
+    parser.add_argument(
+        '--force',
+        action='append',
+        metavar='STAGE',
+        help='run stage again when resuming, along with its dependents'
+    )
+    arguments = parser.parse_args()
+
     # execute pipeline
-    run(True, False, False)
+    run(True, False, False, resume=arguments.resume, force=arguments.force)
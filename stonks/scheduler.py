@@ -0,0 +1,206 @@
+"""
+Dependency graph scheduler of pipeline stages.
+"""
+
+from instrumentation import write_atomically
+
+import concurrent.futures
+import json
+import os
+import typing
+
+
+class Stage(typing.NamedTuple):
+    """
+    Pipeline stage, run once every stage it depends on is done.
+    """
+    name: str
+    run: typing.Callable[[], typing.Any]
+    after: typing.Sequence[str] = ()
+
+
+def sort_stages(stages: typing.List[Stage]) -> typing.List[Stage]:
+    """
+    Order stages so that every stage comes after its dependencies.
+
+    Among stages whose dependencies are done, declaration order is kept, so
+    stages declared in a valid order are left as they are.
+
+    Args:
+        stages: stages to be ordered
+
+    Returns:
+        ordered stages.
+
+    Raises:
+        ValueError: on duplicated stages, unknown dependencies or cycles.
+    """
+    names = [stage.name for stage in stages]
+
+    # every stage declared once, depending on declared stages
+    if len(set(names)) != len(names):
+        raise ValueError('😔 Duplicated pipeline stages')
+    for stage in stages:
+        unknown = set(stage.after) - set(names)
+        if unknown:
+            raise ValueError(f'😔 Unknown stages {sorted(unknown)} '
+                             f'required by {stage.name}')
+
+    # repeatedly take first stage whose dependencies are ordered
+    ordered = []
+    done = set()
+    pending = list(stages)
+    while pending:
+        ready = next(
+            (stage for stage in pending if done.issuperset(stage.after)),
+            None
+        )
+
+        # nothing ready while stages are left: they depend on each other
+        if ready is None:
+            raise ValueError(f'😔 Cyclic stages dependencies between '
+                             f'{[stage.name for stage in pending]}')
+
+        pending.remove(ready)
+        ordered.append(ready)
+        done.add(ready.name)
+
+    return ordered
+
+
+def get_dependents(stages: typing.List[Stage],
+                   names: typing.Iterable[str]) -> typing.Set[str]:
+    """
+    Get stages along with every stage depending on them, even indirectly.
+
+    Args:
+        stages: declared stages
+        names: names of stages whose dependents are looked for
+
+    Returns:
+        names of given stages and of their dependents.
+
+    Raises:
+        ValueError: on unknown stages.
+    """
+    dependents = set(names)
+
+    # every given stage declared
+    unknown = dependents - {stage.name for stage in stages}
+    if unknown:
+        raise ValueError(f'😔 Unknown stages {sorted(unknown)}')
+
+    # stages come after their dependencies: a single pass reaches them all
+    for stage in sort_stages(stages):
+        if dependents.intersection(stage.after):
+            dependents.add(stage.name)
+
+    return dependents
+
+
+def run_stages(stages: typing.List[Stage],
+               max_parallel: int = 1,
+               results: typing.Optional[typing.Dict[str, typing.Any]] = None,
+               on_done: typing.Optional[
+                   typing.Callable[[str, typing.Any], None]] = None,
+               on_start: typing.Optional[typing.Callable[[str], None]] = None
+               ) -> typing.Dict[str, typing.Any]:
+    """
+    Run stages as soon as their dependencies are done, concurrently.
+
+    Independent stages run at the same time, up to 'max_parallel' of them,
+    so total time tends to the longest chain of dependent stages instead of
+    the sum of every stage. A single parallel stage runs them one by one in
+    declaration order. Once a stage fails, no other stage is started and
+    the error is raised when running ones are done.
+
+    Args:
+        stages: stages to be run
+        max_parallel: maximum number of stages run at the same time
+        results: stage results, filled in as stages are done, so stages
+                 can read results of stages they depend on; stages already
+                 holding results are taken as done and skipped
+        on_done: function called with name and result of every stage once
+                 done, from the calling thread
+        on_start: function called with name of every stage right before it
+                  is started, from the calling thread
+
+    Returns:
+        stage results, by stage name.
+    """
+    results = {} if results is None else results
+    pending = [
+        stage for stage in sort_stages(stages)
+        if stage.name not in results
+    ]
+    running = {}
+    slots = max(max_parallel, 1)
+    failure = None
+
+    with concurrent.futures.ThreadPoolExecutor(slots) as executor:
+        while running or (pending and failure is None):
+
+            # no failure: start ready stages, in order, while slots are free
+            for stage in list(pending):
+                if failure is not None or len(running) >= slots:
+                    break
+                if all(name in results for name in stage.after):
+                    pending.remove(stage)
+                    if on_start is not None:
+                        on_start(stage.name)
+                    running[executor.submit(stage.run)] = stage
+
+            # wait for any running stage to be done
+            done, _ = concurrent.futures.wait(
+                running,
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            # record results, keeping first failure until running ones end
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception as e:
+                    failure = failure or e
+                    continue
+
+                if on_done is not None:
+                    on_done(stage.name, results[stage.name])
+
+    # a stage failed: raise its error
+    if failure is not None:
+        raise failure
+
+    return results
+
+
+def load_checkpoints(path: str) -> typing.Dict[str, typing.Any]:
+    """
+    Load results of stages done by previous run from checkpoints file.
+
+    Args:
+        path: path to checkpoints file
+
+    Returns:
+        stage results by stage name, empty when never saved.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as input_file:
+        return json.load(input_file)
+
+
+def save_checkpoints(path: str, results: typing.Dict[str, typing.Any]) -> None:
+    """
+    Save results of stages done so far into checkpoints file.
+
+    Args:
+        path: path to checkpoints file
+        results: stage results by stage name, JSON serializable
+
+    Returns:
+        nothing.
+    """
+    write_atomically(path, json.dumps(results, indent=2))
@@ -111,7 +111,7 @@ CREATE_ETF_PRICE_FACT_TABLE = \
 CREATE TABLE IF NOT EXISTS currencies.fact_etf_price
 (
     id           SERIAL PRIMARY KEY,
-    stock_symbol TEXT,
+    stock_symbol TEXT NOT NULL,
     price_date   DATE NOT NULL,
     open         REAL,
     high         REAL,
@@ -150,42 +150,677 @@ CREATE TABLE IF NOT EXISTS currencies.dim_commodity
 """
 
 
+CREATE_LOAD_MANIFEST_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.load_manifest
+(
+    file_path       TEXT PRIMARY KEY,
+    file_size       BIGINT NOT NULL,
+    modified_at     BIGINT NOT NULL,
+    content_hash    TEXT NOT NULL,
+    rows_number     BIGINT NOT NULL,
+    loaded_at       TIMESTAMP NOT NULL DEFAULT NOW()
+);
+"""
+
+
+CREATE_LONG_CURRENCY_FACTS_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.fact_exchange_rate_long
+(
+    currency_source TEXT NOT NULL,
+    currency_target TEXT NOT NULL,
+    currency_date   DATE NOT NULL,
+    rate            REAL NOT NULL,
+    PRIMARY KEY (currency_source, currency_target, currency_date)
+);
+"""
+
+
+#
+# PARTITIONED TABLES CREATION
+#
+CREATE_PARTITIONED_CURRENCY_FACTS_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.fact_exchange_rate
+(
+    currency_id          SERIAL,
+    currency_source      TEXT NOT NULL,
+    currency_date        DATE NOT NULL,
+    aud                  REAL,
+    bgn                  REAL,
+    brl                  REAL,
+    cad                  REAL,
+    chf                  REAL,
+    cny                  REAL,
+    czk                  REAL,
+    dkk                  REAL,
+    eur                  REAL,
+    gbp                  REAL,
+    hkd                  REAL,
+    hrk                  REAL,
+    huf                  REAL,
+    idr                  REAL,
+    ils                  REAL,
+    inr                  REAL,
+    isk                  REAL,
+    jpy                  REAL,
+    krw                  REAL,
+    mxn                  REAL,
+    myr                  REAL,
+    nok                  REAL,
+    nzd                  REAL,
+    php                  REAL,
+    pln                  REAL,
+    ron                  REAL,
+    rub                  REAL,
+    sek                  REAL,
+    sgd                  REAL,
+    thb                  REAL,
+    try                  REAL,
+    usd                  REAL,
+    zar                  REAL,
+    PRIMARY KEY (currency_id, currency_date)
+)
+PARTITION BY RANGE (currency_date);
+"""
+
+
+CREATE_PARTITIONED_STOCKS_PRICE_FACT_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.fact_stock_price
+(
+    id           SERIAL,
+    stock_symbol TEXT NOT NULL,
+    price_date   DATE NOT NULL,
+    open         REAL,
+    high         REAL,
+    low          REAL,
+    close        REAL,
+    volume       BIGINT,
+    PRIMARY KEY (id, price_date)
+)
+PARTITION BY RANGE (price_date);
+"""
+
+
+CREATE_PARTITIONED_ETF_PRICE_FACT_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.fact_etf_price
+(
+    id           SERIAL,
+    stock_symbol TEXT NOT NULL,
+    price_date   DATE NOT NULL,
+    open         REAL,
+    high         REAL,
+    low          REAL,
+    close        REAL,
+    volume       BIGINT,
+    PRIMARY KEY (id, price_date)
+)
+PARTITION BY RANGE (price_date);
+"""
+
+
+CREATE_YEAR_PARTITION = \
+"""
+CREATE TABLE IF NOT EXISTS {table}_{year}
+PARTITION OF {table}
+FOR VALUES FROM ('{year}-01-01') TO ('{next_year}-01-01');
+"""
+
+CREATE_DEFAULT_PARTITION = \
+"""
+CREATE TABLE IF NOT EXISTS {table}_default
+PARTITION OF {table}
+DEFAULT;
+"""
+
+
+#
+# INDEXES CREATION
+#
+CREATE_CURRENCY_FACTS_NATURAL_KEY = \
+"""
+CREATE UNIQUE INDEX IF NOT EXISTS fact_exchange_rate_natural_key
+ON currencies.fact_exchange_rate (currency_source, currency_date);
+"""
+
+CREATE_STOCKS_PRICE_NATURAL_KEY = \
+"""
+CREATE UNIQUE INDEX IF NOT EXISTS fact_stock_price_natural_key
+ON currencies.fact_stock_price (stock_symbol, price_date);
+"""
+
+CREATE_ETF_PRICE_NATURAL_KEY = \
+"""
+CREATE UNIQUE INDEX IF NOT EXISTS fact_etf_price_natural_key
+ON currencies.fact_etf_price (stock_symbol, price_date);
+"""
+
+CREATE_CURRENCY_FACTS_LOOKUP_INDEX = \
+"""
+CREATE INDEX IF NOT EXISTS fact_exchange_rate_lookup
+ON currencies.fact_exchange_rate (currency_source, currency_date);
+"""
+
+CREATE_STOCKS_PRICE_LOOKUP_INDEX = \
+"""
+CREATE INDEX IF NOT EXISTS fact_stock_price_lookup
+ON currencies.fact_stock_price (stock_symbol, price_date);
+"""
+
+CREATE_ETF_PRICE_LOOKUP_INDEX = \
+"""
+CREATE INDEX IF NOT EXISTS fact_etf_price_lookup
+ON currencies.fact_etf_price (stock_symbol, price_date);
+"""
+
+CREATE_LONG_CURRENCY_FACTS_TARGET_INDEX = \
+"""
+CREATE INDEX IF NOT EXISTS fact_exchange_rate_long_target
+ON currencies.fact_exchange_rate_long (currency_target, currency_date);
+"""
+
+CREATE_NATURAL_KEYS = [
+    CREATE_CURRENCY_FACTS_NATURAL_KEY,
+    CREATE_STOCKS_PRICE_NATURAL_KEY,
+    CREATE_ETF_PRICE_NATURAL_KEY
+]
+CREATE_LONG_NATURAL_KEYS = [
+    CREATE_STOCKS_PRICE_NATURAL_KEY,
+    CREATE_ETF_PRICE_NATURAL_KEY
+]
+
+CREATE_LOOKUP_INDEXES = [
+    CREATE_CURRENCY_FACTS_LOOKUP_INDEX,
+    CREATE_STOCKS_PRICE_LOOKUP_INDEX,
+    CREATE_ETF_PRICE_LOOKUP_INDEX
+]
+CREATE_LONG_LOOKUP_INDEXES = [
+    CREATE_STOCKS_PRICE_LOOKUP_INDEX,
+    CREATE_ETF_PRICE_LOOKUP_INDEX
+]
+
+
+#
+# VIEWS CREATION
+#
+CREATE_WIDE_CURRENCY_FACTS_VIEW = \
+"""
+CREATE OR REPLACE VIEW currencies.fact_exchange_rate AS
+SELECT
+    currency_source,
+    currency_date,
+    {pivots}
+FROM currencies.fact_exchange_rate_long
+GROUP BY currency_source, currency_date;
+"""
+
+
 #
 # TRANSFORMATIONS
 #
-TRANSFORM_DATES = \
-"""
-INSERT INTO currencies.{dim_table}
-SELECT DISTINCT
-       {date_column},
-       EXTRACT(DAY FROM {date_column}) AS day,
-       EXTRACT(WEEK FROM {date_column}) AS week,
-       EXTRACT(MONTH FROM {date_column}) AS month,
-       EXTRACT(YEAR FROM {date_column}) AS year,
-       EXTRACT(QUARTER FROM {date_column}) AS quarter,
-       EXTRACT(DOW FROM {date_column}) AS day_of_week,
-       EXTRACT(DOY FROM {date_column}) AS day_of_year
+FETCH_DATES_RANGE = \
+"""
+SELECT MIN({date_column}), MAX({date_column})
+FROM (
+    SELECT
+        *,
+        EXTRACT(YEAR FROM {date_column}) AS year,
+        EXTRACT(MONTH FROM {date_column}) AS month
+    FROM currencies.{fact_table}
+) AS facts
+WHERE {condition}
+"""
+
+EXTEND_DATE_DIMENSION = \
+"""
+WITH facts (first_date, last_date) AS (
+{ranges}
+),
+bounds AS (
+    SELECT MIN(first_date) AS first_date, MAX(last_date) AS last_date
+    FROM facts
+),
+loaded AS (
+    SELECT MIN(register_date) AS first_date, MAX(register_date) AS last_date
+    FROM currencies.dim_date
+)
+INSERT INTO currencies.dim_date
+SELECT
+       calendar_date::DATE,
+       EXTRACT(DAY FROM calendar_date) AS day,
+       EXTRACT(WEEK FROM calendar_date) AS week,
+       EXTRACT(MONTH FROM calendar_date) AS month,
+       EXTRACT(YEAR FROM calendar_date) AS year,
+       EXTRACT(QUARTER FROM calendar_date) AS quarter,
+       EXTRACT(DOW FROM calendar_date) AS day_of_week,
+       EXTRACT(DOY FROM calendar_date) AS day_of_year
+FROM bounds, loaded, GENERATE_SERIES(
+    LEAST(bounds.first_date, loaded.first_date),
+    GREATEST(bounds.last_date, loaded.last_date),
+    INTERVAL '1 day'
+) AS calendar (calendar_date)
+WHERE loaded.first_date IS NULL
+OR calendar_date NOT BETWEEN loaded.first_date AND loaded.last_date;
+"""
+
+
+#
+# SUMMARIES
+#
+SUMMARIZE_PRICES = \
+"""
+SELECT
+    stock_symbol,
+    {period},
+    (ARRAY_AGG(open ORDER BY price_date))[1] AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    (ARRAY_AGG(close ORDER BY price_date DESC))[1] AS close,
+    SUM(volume) AS volume,
+    COUNT(*) AS trading_days
 FROM currencies.{fact_table}
-ON CONFLICT DO NOTHING;
+JOIN currencies.dim_date
+ON register_date = price_date
+WHERE {condition}
+GROUP BY stock_symbol, {period}
+"""
+
+SUMMARIZE_EXCHANGE_RATES = \
+"""
+SELECT
+    currency_source,
+    year,
+    month,
+    {averages}
+FROM currencies.fact_exchange_rate
+JOIN currencies.dim_date
+ON register_date = currency_date
+WHERE {condition}
+GROUP BY currency_source, year, month
+"""
+
+SUMMARIZE_COMMODITIES = \
+"""
+SELECT
+    country_or_area,
+    comm_code,
+    flow,
+    year,
+    SUM(trade_usd::DOUBLE PRECISION) AS trade_usd
+FROM currencies.fact_commodities_stats
+WHERE {condition}
+GROUP BY country_or_area, comm_code, flow, year
+"""
+
+CREATE_SUMMARY_TABLE = \
+"""
+CREATE TABLE IF NOT EXISTS currencies.{summary} AS
+{select}
+WITH NO DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS {summary}_key
+ON currencies.{summary} ({keys});
+"""
+
+REFRESH_SUMMARY_TABLE = \
+"""
+DELETE FROM currencies.{summary}
+WHERE {condition};
+
+INSERT INTO currencies.{summary}
+{select};
 """
 
 
 #
 # DATA INTEGRITY CHECKS
 #
-FETCH_ROWS =  \
+CHECK_MINIMUM_ROWS = \
 """
-SELECT *
+SELECT COUNT(*)
+FROM (
+    SELECT 1
+    FROM {table}
+    LIMIT {min}
+) AS sampled
+"""
+
+CHECK_ROWS_NUMBER = \
+"""
+SELECT COUNT(*)
 FROM {table}
-LIMIT {min};
 """
 
-FETCH_ALL = \
+CHECK_NULL_RATIO = \
 """
-SELECT *
+SELECT COALESCE(AVG(({column} IS NULL)::INT), 0)
 FROM {table}
 """
 
+CHECK_DUPLICATE_KEYS = \
+"""
+SELECT COUNT(*)
+FROM (
+    SELECT 1
+    FROM {table}
+    GROUP BY {keys}
+    HAVING COUNT(*) > 1
+) AS duplicated
+"""
+
+CHECK_ORPHANED_KEYS = \
+"""
+SELECT COUNT(*)
+FROM (
+    SELECT DISTINCT {column} AS key
+    FROM {table}
+) AS facts
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {dimension} AS dimension
+    WHERE dimension.{key} = facts.key
+)
+"""
+
+ESTIMATE_ROWS = \
+"""
+SELECT GREATEST(SUM(GREATEST(reltuples, 0)), 1)
+FROM pg_class
+WHERE oid = '{table}'::REGCLASS
+    OR oid IN (
+        SELECT inhrelid
+        FROM pg_inherits
+        WHERE inhparent = '{table}'::REGCLASS
+    )
+"""
+
+ESTIMATE_NULL_RATIO = \
+"""
+SELECT ARRAY[
+    null_frac,
+    GREATEST(3 * SQRT(null_frac * (1 - null_frac) / sampled), 3 / sampled)
+]
+FROM (
+    SELECT
+        null_frac,
+        LEAST(
+            ({rows}),
+            300 * current_setting('default_statistics_target')::INT
+        )::FLOAT AS sampled
+    FROM pg_stats
+    WHERE schemaname || '.' || tablename = '{table}'
+        AND attname = '{column}'
+    ORDER BY inherited DESC
+    LIMIT 1
+) AS stats
+"""
+
+ESTIMATE_DUPLICATE_KEYS = \
+"""
+SELECT CASE
+    WHEN EXISTS (
+        SELECT 1
+        FROM pg_index AS index
+        WHERE index.indrelid = '{table}'::REGCLASS
+            AND index.indisunique
+            AND index.indisvalid
+            AND index.indpred IS NULL
+            AND index.indexprs IS NULL
+            AND (
+                SELECT BOOL_AND(attname = ANY(ARRAY[{names}]) AND attnotnull)
+                FROM pg_attribute
+                WHERE attrelid = index.indrelid
+                    AND attnum = ANY(index.indkey)
+            )
+    )
+    THEN ARRAY[0, 0]::FLOAT[]
+    WHEN ({rows}) <= {sample_rows}
+    THEN (
+        SELECT ARRAY[
+            COALESCE(SUM(copies - 1), 0)::FLOAT / GREATEST(SUM(copies), 1),
+            0
+        ]
+        FROM (
+            SELECT COUNT(*) AS copies
+            FROM {table}
+            GROUP BY {keys}
+        ) AS grouped
+    )
+    ELSE (
+        WITH sampled AS (
+            SELECT {keys}, tableoid, (ctid::TEXT::POINT)[0] AS block
+            FROM {table} TABLESAMPLE SYSTEM ((
+                SELECT 100.0 * {sample_rows} / ({rows})
+            ))
+        ),
+        copies AS (
+            SELECT sampled_keys.*, counted.copies
+            FROM (
+                SELECT DISTINCT {keys}
+                FROM sampled
+            ) AS sampled_keys
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*)::FLOAT AS copies
+                FROM {table} AS copy
+                WHERE {matches}
+            ) AS counted
+        ),
+        blocks AS (
+            SELECT
+                COUNT(*) AS rows,
+                SUM(1 - 1 / copies) AS duplicated
+            FROM sampled
+            JOIN copies USING ({keys})
+            GROUP BY tableoid, block
+        )
+        SELECT ARRAY[
+            share,
+            GREATEST(
+                3 * SQRT(
+                    SUM((duplicated - share * rows) ^ 2)
+                    / GREATEST(COUNT(*) * (COUNT(*) - 1), 1)
+                ) / AVG(rows),
+                3 / SUM(rows)
+            )
+        ]
+        FROM blocks
+        CROSS JOIN (
+            SELECT SUM(duplicated) / SUM(rows) AS share
+            FROM blocks
+        ) AS estimate
+        GROUP BY share
+    )
+END
+"""
+
+SAMPLE_ORPHANED_KEYS = \
+"""
+SELECT COUNT(*)
+FROM (
+    SELECT DISTINCT {column} AS key
+    FROM {table} TABLESAMPLE SYSTEM ((
+        SELECT LEAST(100, 100.0 * {sample_rows} / ({rows}))
+    ))
+) AS facts
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {dimension} AS dimension
+    WHERE dimension.{key} = facts.key
+)
+"""
+
+MEASURE_CHECKS = \
+"""
+SELECT
+    {measures};
+"""
+
+COUNT_ROWS = \
+"""
+SELECT COUNT(*)
+FROM {table};
+"""
+
+
+#
+# DATA MAINTENANCE
+#
+TRUNCATE_TABLE = \
+"""
+TRUNCATE TABLE {table};
+"""
+
+DELETE_ROWS_BY_KEY = \
+"""
+DELETE FROM {table}
+USING (VALUES %s) AS deleted (key)
+WHERE {table}.{column} = deleted.key;
+"""
+
+CREATE_STAGING_TABLE = \
+"""
+CREATE UNLOGGED TABLE IF NOT EXISTS {staging} AS
+SELECT {columns}
+FROM {table}
+WITH NO DATA;
+"""
+
+UPSERT_STAGED_ROWS = \
+"""
+INSERT INTO {table} ({columns})
+SELECT DISTINCT ON ({keys}) {columns}
+FROM {staging}
+ORDER BY {keys}
+ON CONFLICT ({keys}) DO UPDATE
+SET {updates}
+WHERE ({current}) IS DISTINCT FROM ({excluded});
+"""
+
+
+#
+# LOAD MANIFEST
+#
+FETCH_LOAD_MANIFEST = \
+"""
+SELECT file_path, file_size, modified_at, content_hash, rows_number
+FROM currencies.load_manifest;
+"""
+
+RECORD_LOADED_FILES = \
+"""
+INSERT INTO currencies.load_manifest
+    (file_path, file_size, modified_at, content_hash, rows_number)
+VALUES %s
+ON CONFLICT (file_path) DO UPDATE
+SET file_size = EXCLUDED.file_size,
+    modified_at = EXCLUDED.modified_at,
+    content_hash = EXCLUDED.content_hash,
+    rows_number = EXCLUDED.rows_number,
+    loaded_at = NOW();
+"""
+
+REFRESH_LOADED_FILES = \
+"""
+UPDATE currencies.load_manifest
+SET file_size = refreshed.file_size,
+    modified_at = refreshed.modified_at
+FROM (VALUES %s) AS refreshed (file_path, file_size, modified_at)
+WHERE load_manifest.file_path = refreshed.file_path;
+"""
+
+
+#
+# BULK LOADING
+#
+DEFER_TABLE_INDEXES = \
+"""
+ALTER TABLE {table} SET UNLOGGED;
+ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}_pkey;
+DROP INDEX IF EXISTS {table}_natural_key;
+DROP INDEX IF EXISTS {table}_lookup;
+"""
+
+SET_TABLE_LOGGED = \
+"""
+ALTER TABLE {table} SET LOGGED;
+"""
+
+ADD_PRIMARY_KEY = \
+"""
+ALTER TABLE {table} ADD PRIMARY KEY ({column});
+"""
+
+ANALYZE_TABLE = \
+"""
+ANALYZE {table};
+"""
+
+
+#
+# BENCHMARKS
+#
+FETCH_TABLE_KIND = \
+"""
+SELECT relkind
+FROM pg_class
+WHERE oid = '{table}'::regclass;
+"""
+
+BENCHMARK_QUERIES = {
+    'stock history':
+    """
+    SELECT price_date, open, high, low, close, volume
+    FROM currencies.fact_stock_price
+    WHERE stock_symbol = '{symbol}'
+    AND price_date BETWEEN '{start}' AND '{end}'
+    ORDER BY price_date;
+    """,
+    'ETF history':
+    """
+    SELECT price_date, open, high, low, close, volume
+    FROM currencies.fact_etf_price
+    WHERE stock_symbol = '{etf}'
+    AND price_date BETWEEN '{start}' AND '{end}'
+    ORDER BY price_date;
+    """,
+    'market daily volume':
+    """
+    SELECT price_date, SUM(volume)
+    FROM currencies.fact_stock_price
+    WHERE price_date BETWEEN '{start}' AND '{end}'
+    GROUP BY price_date;
+    """,
+    'currency history':
+    """
+    SELECT currency_date, usd, eur
+    FROM currencies.fact_exchange_rate
+    WHERE currency_source = '{source}'
+    AND currency_date BETWEEN '{start}' AND '{end}'
+    ORDER BY currency_date;
+    """,
+    'currency monthly average':
+    """
+    SELECT currency_source, DATE_TRUNC('month', currency_date), AVG(usd)
+    FROM currencies.fact_exchange_rate
+    WHERE currency_date BETWEEN '{start}' AND '{end}'
+    GROUP BY 1, 2;
+    """,
+}
+
+
+#
+# EXPORTS
+#
+EXPORT_TABLE = \
+"""
+SELECT *{year}
+FROM {table};
+"""
+
+
 #
 # PROCEDURES
 #
@@ -197,6 +832,33 @@ INITIALIZE = [
     CREATE_STOCKS_PRICE_FACT_TABLE,
     CREATE_ETF_PRICE_FACT_TABLE,
     CREATE_COMMODITIES_STATS_FACT_TABLE,
-    CREATE_COMMODITY_DIMENSION_TABLE
+    CREATE_COMMODITY_DIMENSION_TABLE,
+    CREATE_LOAD_MANIFEST_TABLE,
+    *CREATE_LOOKUP_INDEXES
+]
+INITIALIZE_LONG = [
+    CREATE_SCHEMA,
+    CREATE_LONG_CURRENCY_FACTS_TABLE,
+    CREATE_DATE_DIMENSION_TABLE,
+    CREATE_CURRENCY_DIMENSION_TABLE,
+    CREATE_STOCKS_PRICE_FACT_TABLE,
+    CREATE_ETF_PRICE_FACT_TABLE,
+    CREATE_COMMODITIES_STATS_FACT_TABLE,
+    CREATE_COMMODITY_DIMENSION_TABLE,
+    CREATE_LOAD_MANIFEST_TABLE,
+    CREATE_LONG_CURRENCY_FACTS_TARGET_INDEX,
+    *CREATE_LONG_LOOKUP_INDEXES
+]
+INITIALIZE_PARTITIONED = [
+    CREATE_SCHEMA,
+    CREATE_PARTITIONED_CURRENCY_FACTS_TABLE,
+    CREATE_DATE_DIMENSION_TABLE,
+    CREATE_CURRENCY_DIMENSION_TABLE,
+    CREATE_PARTITIONED_STOCKS_PRICE_FACT_TABLE,
+    CREATE_PARTITIONED_ETF_PRICE_FACT_TABLE,
+    CREATE_COMMODITIES_STATS_FACT_TABLE,
+    CREATE_COMMODITY_DIMENSION_TABLE,
+    CREATE_LOAD_MANIFEST_TABLE,
+    *CREATE_LOOKUP_INDEXES
 ]
 TEARDOWN = [DROP_SCHEMA]
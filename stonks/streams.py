@@ -0,0 +1,298 @@
+"""
+File-like streams feeding PostgreSQL COPY commands.
+"""
+
+import bisect
+import io
+import pyarrow
+import pyarrow.csv
+import pyarrow.ipc
+import typing
+
+
+def read_lines(path: str) -> typing.Iterator[str]:
+    """
+    Lazily read lines from text file, closing it once exhausted.
+
+    Args:
+        path: path to text file
+
+    Returns:
+        file lines.
+    """
+    with open(path, 'r') as input_file:
+        yield from input_file
+
+
+class CoalescedStream:
+    """
+    Chain lines from many sources into a single COPY input stream.
+
+    Sources are pulled lazily from a shared iterator, so a new stream built
+    over the same iterator continues where the previous one stopped. A
+    stream stops at the first source boundary after reaching 'max_rows' or
+    'max_bytes', keeping every source whole inside a single stream.
+    """
+
+    def __init__(self,
+                 sources: typing.Iterator[typing.Tuple[str, typing.Iterable[str]]],
+                 max_rows: typing.Optional[int] = None,
+                 max_bytes: typing.Optional[int] = None,
+                 progress: typing.Optional[typing.Any] = None) -> None:
+        """
+        Create stream over sources.
+
+        Args:
+            sources: iterator of source names and their lines
+            max_rows: rows after which stream stops at next source boundary
+            max_bytes: bytes after which stream stops at next source boundary
+            progress: progress bar updated once per exhausted source
+
+        Returns:
+            nothing.
+        """
+        self.sources = sources
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.progress = progress
+
+        # streamed data counters
+        self.rows = 0
+        self.bytes = 0
+
+        # first stream line number and row count of every source
+        self.starts = []
+        self.names = []
+        self.counts = []
+
+        # whether underlying sources iterator ran out
+        self.exhausted = False
+
+        self.lines = None
+        self.pending = ''
+
+    def read(self, size: int = -1) -> str:
+        """
+        Read up to 'size' characters from stream.
+
+        Args:
+            size: maximum number of characters, everything when negative
+
+        Returns:
+            read data, empty when stream is over.
+        """
+        chunks = [self.pending]
+        length = len(self.pending)
+
+        # gather lines until requested size is reached
+        while size < 0 or length < size:
+            line = self.next_line()
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+
+        data = ''.join(chunks)
+
+        # whole stream requested: nothing left pending
+        if size < 0:
+            self.pending = ''
+            return data
+
+        self.pending = data[size:]
+        return data[:size]
+
+    def readline(self) -> str:
+        """
+        Read next line from stream.
+
+        Returns:
+            read line, empty when stream is over.
+        """
+        # pending data holds a complete line: serve it first
+        if '\n' in self.pending:
+            line, self.pending = self.pending.split('\n', 1)
+            return line + '\n'
+
+        line = self.next_line() or ''
+        line, self.pending = self.pending + line, ''
+
+        return line
+
+    def next_line(self) -> typing.Optional[str]:
+        """
+        Get next line from current source, moving to next sources as needed.
+
+        Returns:
+            next newline terminated line, None when stream is over.
+        """
+        while True:
+
+            # current source has lines left: serve them
+            if self.lines is not None:
+                line = next(self.lines, None)
+                if line is not None:
+                    line = line if line.endswith('\n') else line + '\n'
+                    self.rows += 1
+                    self.bytes += len(line)
+                    self.counts[-1] += 1
+                    return line
+
+                # source exhausted: advance progress
+                self.lines = None
+                if self.progress is not None:
+                    self.progress.update(1)
+
+            # batch limits reached: stop at this source boundary
+            if self.names and self.is_full():
+                return None
+
+            # move to next source
+            source = next(self.sources, None)
+            if source is None:
+                self.exhausted = True
+                return None
+
+            name, lines = source
+            self.starts.append(self.rows + 1)
+            self.names.append(name)
+            self.counts.append(0)
+            self.lines = iter(lines)
+
+    def is_full(self) -> bool:
+        """
+        Check whether stream reached its rows or bytes limits.
+
+        Returns:
+            whether any limit was reached.
+        """
+        if self.max_rows is not None and self.rows >= self.max_rows:
+            return True
+
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return True
+
+        return False
+
+    def source_of(self, line: int) -> typing.Tuple[str, int]:
+        """
+        Find source that produced given stream line.
+
+        Args:
+            line: one-based stream line number
+
+        Returns:
+            source name and one-based line number inside source.
+        """
+        index = bisect.bisect_right(self.starts, line) - 1
+
+        return self.names[index], line - self.starts[index] + 1
+
+    def source_rows(self) -> typing.Dict[str, int]:
+        """
+        Get number of rows streamed from each source.
+
+        Returns:
+            mapping of source names to streamed rows.
+        """
+        return dict(zip(self.names, self.counts))
+
+
+class RecordBatchStream:
+    """
+    Serve Arrow IPC stream file as CSV input of a single COPY command.
+
+    Record batches are read one at a time and only converted into CSV
+    bytes as COPY consumes them, so staged files stay typed and compact on
+    disk and text only exists at the database edge.
+    """
+
+    def __init__(self,
+                 path: str,
+                 transform: typing.Optional[
+                     typing.Callable[[typing.Any], typing.Any]] = None
+                 ) -> None:
+        """
+        Create stream over Arrow IPC stream file.
+
+        Args:
+            path: path to Arrow IPC stream file
+            transform: function applied to every record batch before
+                       conversion, returning Arrow batch or table
+
+        Returns:
+            nothing.
+        """
+        self.path = path
+        self.transform = transform
+        self.batches = None
+
+        # streamed rows counter
+        self.rows = 0
+
+        # converted batch being served, and offset of next byte to serve
+        self.buffer = b''
+        self.offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to 'size' bytes of CSV data from stream.
+
+        Args:
+            size: maximum number of bytes, everything when negative
+
+        Returns:
+            read data, empty when stream is over.
+        """
+        chunks = []
+
+        # gather batches until requested size is reached
+        while size != 0:
+
+            # current batch served: convert next one
+            if self.offset >= len(self.buffer):
+                if not self.next_batch():
+                    break
+
+            # serve from current batch without copying what is left
+            end = len(self.buffer) if size < 0 else self.offset + size
+            chunk = self.buffer[self.offset:end]
+            self.offset += len(chunk)
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+
+        return b''.join(chunks)
+
+    def next_batch(self) -> bool:
+        """
+        Convert next record batch into CSV bytes.
+
+        Returns:
+            whether a batch was converted, False when stream is over.
+        """
+        # first batch: open file, memory mapped
+        if self.batches is None:
+            self.batches = iter(
+                pyarrow.ipc.open_stream(pyarrow.memory_map(self.path))
+            )
+
+        batch = next(self.batches, None)
+        if batch is None:
+            return False
+
+        if self.transform is not None:
+            batch = self.transform(batch)
+
+        # nulls left unquoted and empty, strings quoted
+        output = io.BytesIO()
+        pyarrow.csv.write_csv(
+            batch,
+            output,
+            pyarrow.csv.WriteOptions(include_header=False)
+        )
+        self.rows += batch.num_rows
+        self.buffer = output.getvalue()
+        self.offset = 0
+
+        return True
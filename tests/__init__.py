@@ -0,0 +1,10 @@
+"""
+Unit tests, importing pipeline modules the way they import each other.
+"""
+
+import os
+import sys
+
+
+# pipeline modules import their siblings by name, as run from their folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'stonks'))
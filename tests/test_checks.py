@@ -0,0 +1,207 @@
+"""
+Tests for checks layer builders and 'run_checks' method.
+"""
+
+from stonks import checks
+from unittest import TestCase
+from unittest.mock import patch
+
+import math
+
+
+class TestChecks(TestCase):
+    """
+    Test case for building, measuring and comparing data quality checks.
+    """
+
+    def test_exact_builders_compare_against_expected_values(self):
+        """
+        Tests whether exact checks query measures compared to expected values.
+        """
+        # build every exact check
+        built = [
+            checks.minimum_rows('dw.fact_stock_price', 10),
+            checks.rows_number('dw.dim_commodity', 4),
+            checks.null_ratio('dw.fact_stock_price', 'close_value', 0.1),
+            checks.duplicate_keys(
+                'dw.fact_stock_price',
+                ['stock_symbol', 'price_date']
+            ),
+            checks.orphaned_keys(
+                'dw.fact_stock_price',
+                'stock_symbol',
+                'dw.dim_stock',
+                'stock_symbol'
+            ),
+        ]
+
+        # expected comparisons?
+        self.assertEqual(
+            [(check.comparison, check.expected) for check in built],
+            [('>=', 10), ('=', 4), ('<=', 0.1), ('=', 0), ('=', 0)]
+        )
+
+        # queries name checked tables and columns, without estimates?
+        for check in built:
+            self.assertIn(check.table, check.query)
+            self.assertNotIn('estimated', check.name)
+        self.assertIn('close_value', built[2].query)
+        self.assertIn('stock_symbol, price_date', built[3].query)
+        self.assertIn('dw.dim_stock', built[4].query)
+
+
+    def test_approximate_builders_estimate_measures(self):
+        """
+        Tests whether approximate checks query estimates instead of scans.
+        """
+        # build every approximate check
+        ratio = checks.null_ratio(
+            'dw.fact_stock_price',
+            'close_value',
+            0.1,
+            approximate=True
+        )
+        duplicates = checks.duplicate_keys(
+            'dw.fact_stock_price',
+            ['stock_symbol', 'price_date'],
+            approximate=True
+        )
+        orphans = checks.orphaned_keys(
+            'dw.fact_stock_price',
+            'stock_symbol',
+            'dw.dim_stock',
+            'stock_symbol',
+            approximate=True
+        )
+
+        # estimated from statistics and samples?
+        self.assertIn('estimated', ratio.name)
+        self.assertIn('pg_stats', ratio.query)
+        self.assertIn('estimated', duplicates.name)
+        self.assertIn('TABLESAMPLE', duplicates.query)
+        self.assertIn(
+            'copy.stock_symbol = sampled_keys.stock_symbol '
+            'AND copy.price_date = sampled_keys.price_date',
+            duplicates.query
+        )
+        self.assertIn('sampled', orphans.name)
+        self.assertIn('TABLESAMPLE', orphans.query)
+        self.assertIn(str(checks.SAMPLE_ROWS), orphans.query)
+
+        # same expectations as exact checks?
+        self.assertEqual(
+            [(check.comparison, check.expected)
+             for check in [ratio, duplicates, orphans]],
+            [('<=', 0.1), ('=', 0), ('=', 0)]
+        )
+
+
+    def test_exact_measures_pass_or_fail_on_expected_values(self):
+        """
+        Tests whether exact measures pass only when meeting expected values.
+        """
+        # compare measures at and around expected values
+        ceiling = checks.null_ratio('dw.fact', 'value', 0.1)
+        floor = checks.minimum_rows('dw.fact', 10)
+        unique = checks.duplicate_keys('dw.fact', ['key'])
+
+        # edges pass, values beyond them fail?
+        self.assertTrue(checks.compare_measure(ceiling, 0.1).passed)
+        self.assertFalse(checks.compare_measure(ceiling, 0.1001).passed)
+        self.assertTrue(checks.compare_measure(floor, 10).passed)
+        self.assertFalse(checks.compare_measure(floor, 9).passed)
+        self.assertTrue(checks.compare_measure(unique, 0).passed)
+        self.assertFalse(checks.compare_measure(unique, 1).passed)
+
+        # no error bound reported?
+        self.assertEqual(checks.compare_measure(unique, 1).error, 0.0)
+
+
+    def test_estimates_pass_within_error_bound(self):
+        """
+        Tests whether estimates pass when expected values are within bounds.
+        """
+        # compare estimates at and around their error bounds
+        ceiling = checks.null_ratio('dw.fact', 'value', 0.1, approximate=True)
+        unique = checks.duplicate_keys('dw.fact', ['key'], approximate=True)
+
+        # values within bounds pass, beyond them fail?
+        self.assertTrue(checks.compare_measure(ceiling, [0.15, 0.05]).passed)
+        self.assertFalse(checks.compare_measure(ceiling, [0.16, 0.05]).passed)
+        self.assertTrue(checks.compare_measure(unique, [0.002, 0.003]).passed)
+        self.assertFalse(checks.compare_measure(unique, [0.5, 0.0001]).passed)
+
+        # estimate and error bound reported apart?
+        result = checks.compare_measure(unique, (0.002, 0.003))
+        self.assertEqual((result.measured, result.error), (0.002, 0.003))
+
+
+    def test_missing_measures_fail(self):
+        """
+        Tests whether checks fail when nothing could be measured.
+        """
+        # compare missing exact measure and estimate
+        check = checks.null_ratio('dw.fact', 'value', 0.1, approximate=True)
+        results = [
+            checks.compare_measure(check, None),
+            checks.compare_measure(check, [None, None]),
+        ]
+
+        # failed without measure?
+        for result in results:
+            self.assertFalse(result.passed)
+            self.assertTrue(math.isnan(result.measured))
+
+
+    @patch.object(checks, 'get_values')
+    def test_every_check_is_measured_at_once(self, get_values):
+        """
+        Tests whether every check is measured within a single query.
+        """
+        # measure passing exact and approximate checks
+        get_values.return_value = [(12, [0.0, 0.001])]
+        results = checks.run_checks([
+            checks.minimum_rows('dw.fact', 10),
+            checks.duplicate_keys('dw.fact', ['key'], approximate=True),
+        ])
+
+        # single query measuring both?
+        get_values.assert_called_once()
+        [query] = get_values.call_args.args
+        self.assertIn('AS check_0', query)
+        self.assertIn('AS check_1', query)
+
+        # both passed?
+        self.assertEqual([result.passed for result in results], [True, True])
+        self.assertEqual([result.error for result in results], [0.0, 0.001])
+
+
+    @patch.object(checks, 'get_values')
+    def test_failed_checks_raise_when_strict(self, get_values):
+        """
+        Tests whether failed checks raise only when strict.
+        """
+        # measure failing exact and approximate checks
+        get_values.return_value = [(9, [0.5, 0.001])]
+        built = [
+            checks.minimum_rows('dw.fact', 10),
+            checks.duplicate_keys('dw.fact', ['key'], approximate=True),
+        ]
+
+        # raised, naming failed checks?
+        with self.assertRaisesRegex(AssertionError, 'minimum rows of dw.fact'):
+            checks.run_checks(built)
+
+        # reported without raising otherwise?
+        results = checks.run_checks(built, strict=False)
+        self.assertEqual([result.passed for result in results], [False, False])
+
+
+    @patch.object(checks, 'get_values')
+    def test_no_checks_skip_database(self, get_values):
+        """
+        Tests whether running no checks queries nothing.
+        """
+        # run nothing, queried nothing?
+        self.assertEqual(checks.run_checks([]), [])
+        get_values.assert_not_called()
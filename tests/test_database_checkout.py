@@ -0,0 +1,117 @@
+"""
+Tests for database layer 'checkout' method.
+"""
+
+from stonks import database
+from stonks.database import checkout
+from unittest import TestCase
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+
+class TestDatabaseCheckout(TestCase):
+    """
+    Test case for borrowing pooled and dedicated database connections.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.connection = MagicMock(closed=0)
+        self.cursor = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.pool = MagicMock()
+        self.pool.getconn.return_value = self.connection
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        database.POOL = None
+
+
+    @patch('stonks.database.get_cursor')
+    def test_dedicated_connection_is_closed_without_pool(self, get_cursor):
+        """
+        Tests whether a dedicated connection is used and closed.
+        """
+        # set mocked cursor function return value
+        get_cursor.return_value = (self.cursor, self.connection)
+
+        # borrow connection
+        with checkout() as (cursor, connection):
+            pass
+
+        # closed?
+        self.assertEqual(connection, self.connection)
+        self.connection.close.assert_called_once()
+
+
+    @patch('stonks.database.get_cursor')
+    def test_pooled_connection_is_given_back(self, get_cursor):
+        """
+        Tests whether pooled connection is reused instead of a new one.
+        """
+        # open mocked pool
+        database.POOL = self.pool
+
+        # borrow connection
+        with checkout() as (cursor, connection):
+            pass
+
+        # reused?
+        get_cursor.assert_not_called()
+        self.assertEqual(connection, self.connection)
+        self.pool.putconn.assert_called_once_with(self.connection)
+
+
+    def test_broken_pooled_connection_is_discarded(self):
+        """
+        Tests whether connections failing health check are discarded.
+        """
+        # open mocked pool returning a closed connection first
+        broken = MagicMock(closed=1)
+        self.pool.getconn.side_effect = [broken, self.connection]
+        database.POOL = self.pool
+
+        # borrow connection
+        with checkout() as (cursor, connection):
+            pass
+
+        # discarded?
+        self.assertEqual(connection, self.connection)
+        self.pool.putconn.assert_any_call(broken, close=True)
+
+
+    def test_transaction_is_committed_without_autocommit(self):
+        """
+        Tests whether non autocommit transactions are committed on success.
+        """
+        # open mocked pool
+        database.POOL = self.pool
+
+        # borrow connection inside a transaction
+        with checkout(autocommit=False):
+            pass
+
+        # committed?
+        self.connection.commit.assert_called_once()
+
+
+    def test_transaction_is_rolled_back_on_failure(self):
+        """
+        Tests whether non autocommit transactions are rolled back on error.
+        """
+        # open mocked pool
+        database.POOL = self.pool
+
+        # fail inside a transaction
+        with self.assertRaises(ValueError):
+            with checkout(autocommit=False):
+                raise ValueError
+
+        # rolled back?
+        self.connection.rollback.assert_called_once()
+        self.connection.commit.assert_not_called()
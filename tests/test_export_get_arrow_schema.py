@@ -0,0 +1,47 @@
+"""
+Tests for export layer 'get_arrow_schema' method.
+"""
+
+from collections import namedtuple
+from stonks.export import get_arrow_schema
+from unittest import TestCase
+
+import pyarrow
+
+
+# query result column, as described by cursors
+Column = namedtuple('Column', ['name', 'type_code'])
+
+
+class TestExportGetArrowSchema(TestCase):
+    """
+    Test case for building compact Arrow schemas of query results.
+    """
+
+    def test_columns_get_compact_types(self):
+        """
+        Tests whether columns are typed after their PostgreSQL types.
+        """
+        # describe price table columns, and a numeric one
+        schema = get_arrow_schema([
+            Column('id', 23),
+            Column('stock_symbol', 25),
+            Column('price_date', 1082),
+            Column('close', 700),
+            Column('volume', 20),
+            Column('ratio', 1700),
+        ])
+
+        # compact, dictionary encoded and fallback types?
+        self.assertEqual(schema.names, [
+            'id', 'stock_symbol', 'price_date', 'close', 'volume', 'ratio'
+        ])
+        self.assertEqual(schema.field('id').type, pyarrow.int32())
+        self.assertEqual(
+            schema.field('stock_symbol').type,
+            pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        )
+        self.assertEqual(schema.field('price_date').type, pyarrow.date32())
+        self.assertEqual(schema.field('close').type, pyarrow.float32())
+        self.assertEqual(schema.field('volume').type, pyarrow.int64())
+        self.assertEqual(schema.field('ratio').type, pyarrow.string())
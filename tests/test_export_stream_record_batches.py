@@ -0,0 +1,142 @@
+"""
+Tests for export layer 'stream_record_batches' method.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+from stonks.export import get_arrow_schema
+from stonks.export import stream_record_batches
+from unittest import TestCase
+
+import datetime
+import os
+import pyarrow
+import pyarrow.dataset
+import shutil
+import tempfile
+
+
+# query result column, as described by cursors
+Column = namedtuple('Column', ['name', 'type_code'])
+
+
+class FakeCursor:
+    """
+    Server side cursor serving rows batch by batch.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetches = 0
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class TestExportStreamRecordBatches(TestCase):
+    """
+    Test case for streaming fetched rows as Arrow record batches.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.schema = get_arrow_schema([
+            Column('stock_symbol', 25),
+            Column('price_date', 1082),
+            Column('close', 700),
+            Column('ratio', 1700),
+            Column('year', 23),
+        ])
+
+        # prices over two years, a missing close and ratio among them
+        self.rows = [
+            ('aapl', datetime.date(2019, 12, 30), 1.5, Decimal('0.5'), 2019),
+            ('aapl', datetime.date(2019, 12, 31), None, None, 2019),
+            ('msft', datetime.date(2020, 1, 2), 3.25, Decimal('1.5'), 2020),
+            ('aapl', datetime.date(2020, 1, 2), 2.0, Decimal('2'), 2020),
+            ('msft', datetime.date(2020, 1, 3), 4.0, Decimal('0'), 2020),
+        ]
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def test_rows_are_streamed_in_batches(self):
+        """
+        Tests whether rows are converted batch by batch, as fetched.
+        """
+        # stream rows, first batch already fetched
+        cursor = FakeCursor(self.rows)
+        batches = stream_record_batches(
+            cursor,
+            cursor.fetchmany(2),
+            self.schema,
+            2
+        )
+
+        # lazily fetched?
+        first = next(batches)
+        self.assertEqual(cursor.fetches, 1)
+        batches = [first, *batches]
+
+        # batched, typed and converted?
+        self.assertEqual([batch.num_rows for batch in batches], [2, 2, 1])
+        self.assertTrue(all(batch.schema == self.schema for batch in batches))
+        self.assertEqual(
+            first.column('stock_symbol').dictionary.to_pylist(),
+            ['aapl']
+        )
+        self.assertEqual(first.column('close').to_pylist(), [1.5, None])
+        self.assertEqual(first.column('ratio').to_pylist(), ['0.5', None])
+
+
+    def test_partitioned_export_round_trip(self):
+        """
+        Tests whether streamed batches are written and read back by year.
+        """
+        # write batches partitioned by year, as tables are exported
+        cursor = FakeCursor(self.rows)
+        path = os.path.join(self.folder, 'fact_stock_price')
+        pyarrow.dataset.write_dataset(
+            stream_record_batches(cursor, cursor.fetchmany(2), self.schema, 2),
+            path,
+            schema=self.schema,
+            format='parquet',
+            partitioning=['year'],
+            partitioning_flavor='hive'
+        )
+
+        # partitioned by year?
+        self.assertEqual(
+            sorted(os.listdir(path)),
+            ['year=2019', 'year=2020']
+        )
+
+        # every row read back, year included?
+        dataset = pyarrow.dataset.dataset(
+            path,
+            format='parquet',
+            partitioning='hive'
+        )
+        rows = sorted(
+            dataset.to_table().to_pylist(),
+            key=lambda row: (row['price_date'], row['stock_symbol'])
+        )
+        self.assertEqual(
+            [(row['stock_symbol'], row['price_date'], row['close'],
+              row['ratio'], row['year']) for row in rows],
+            [('aapl', datetime.date(2019, 12, 30), 1.5, '0.5', 2019),
+             ('aapl', datetime.date(2019, 12, 31), None, None, 2019),
+             ('aapl', datetime.date(2020, 1, 2), 2.0, '2', 2020),
+             ('msft', datetime.date(2020, 1, 2), 3.25, '1.5', 2020),
+             ('msft', datetime.date(2020, 1, 3), 4.0, '0', 2020)]
+        )
@@ -0,0 +1,105 @@
+"""
+Tests for extraction layer 'derive_cross_rates' method.
+"""
+
+from stonks.extraction import CURRENCIES
+from stonks.extraction import RatesTable
+from stonks.extraction import build_rates_matrix
+from stonks.extraction import check_cross_rates
+from stonks.extraction import derive_cross_rates
+from unittest import TestCase
+
+import numpy as np
+
+
+DATES = ['2020-01-02', '2020-01-03']
+EUR_RATES = {
+    'base': 'EUR',
+    'rates': {
+        date: {
+            currency: 1.0 + index + day
+            for index, currency in enumerate(CURRENCIES)
+            if currency != 'EUR'
+        }
+        for day, date in enumerate(DATES)
+    }
+}
+
+
+class TestExtractionDeriveCrossRates(TestCase):
+    """
+    Test case for deriving exchange rates from a single base currency.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.dates, self.matrix = build_rates_matrix(EUR_RATES)
+
+
+    def test_base_currency_is_quoted_at_par(self):
+        """
+        Tests whether every derived base currency exchanges to itself at par.
+        """
+        for index, base in enumerate(CURRENCIES):
+
+            # derive rates
+            rates = derive_cross_rates(self.matrix, base)
+
+            # at par?
+            np.testing.assert_allclose(rates[:, index], 1.0)
+
+
+    def test_cross_rates_are_derived(self):
+        """
+        Tests whether rates from derived base are divided by its own rate.
+        """
+        # derive rates from US dollar
+        rates = derive_cross_rates(self.matrix, 'USD')
+
+        # derived?
+        usd = EUR_RATES['rates'][DATES[0]]['USD']
+        brl = EUR_RATES['rates'][DATES[0]]['BRL']
+        self.assertAlmostEqual(rates[0, CURRENCIES.index('BRL')], brl / usd)
+        self.assertAlmostEqual(rates[0, CURRENCIES.index('EUR')], 1.0 / usd)
+
+
+    def test_cross_rates_match_direct_fetch(self):
+        """
+        Tests whether derived rates are checked against direct fetches.
+        """
+        # directly fetched rates from US dollar, with a wrong quote
+        rates = derive_cross_rates(self.matrix, 'USD')
+        direct = {
+            'base': 'USD',
+            'rates': {
+                date: dict(zip(CURRENCIES, rates[row]))
+                for row, date in enumerate(self.dates)
+            }
+        }
+
+        # matching?
+        self.assertLess(check_cross_rates(self.dates, self.matrix, direct), 1e-9)
+
+        # mismatch detected?
+        direct['rates'][DATES[1]]['BRL'] *= 1.1
+        with self.assertRaises(AssertionError):
+            check_cross_rates(self.dates, self.matrix, direct)
+
+
+    def test_cross_rates_match_direct_table(self):
+        """
+        Tests whether derived rates are checked against columnar fetches.
+        """
+        # directly fetched rates from US dollar, parsed as a table
+        rates = derive_cross_rates(self.matrix, 'USD')
+        direct = RatesTable('USD', np.array(self.dates), rates.copy())
+
+        # matching?
+        self.assertLess(check_cross_rates(self.dates, self.matrix, direct), 1e-9)
+
+        # mismatch detected?
+        direct.rates[1, CURRENCIES.index('BRL')] *= 1.1
+        with self.assertRaises(AssertionError):
+            check_cross_rates(self.dates, self.matrix, direct)
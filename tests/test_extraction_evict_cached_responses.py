@@ -0,0 +1,69 @@
+"""
+Tests for extraction layer 'evict_cached_responses' method.
+"""
+
+from datetime import datetime
+from stonks.extraction import evict_cached_responses
+from stonks.extraction import write_cached_response
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+
+# cached on 2020-06-10
+CACHED_ON = datetime(2020, 6, 10, 12).timestamp()
+
+
+class TestExtractionEvictCachedResponses(TestCase):
+    """
+    Test case for evicting expired exchange rates API responses.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.cache = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.cache)
+
+
+    def cache_response(self, end: str) -> None:
+        """
+        Caches response for range ending on given date, cached in the past.
+        """
+        write_cached_response(self.cache, 'EUR', '2020-01-01', end, 200, b'{}')
+        for name in os.listdir(self.cache):
+            path = os.path.join(self.cache, name)
+            os.utime(path, (CACHED_ON, CACHED_ON))
+
+
+    def test_closed_ranges_are_kept(self):
+        """
+        Tests whether ranges closed before caching never expire.
+        """
+        # cache closed range
+        self.cache_response('2020-06-09')
+
+        # kept?
+        self.assertEqual(evict_cached_responses(self.cache), 0)
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+
+    def test_ranges_reaching_caching_day_are_evicted(self):
+        """
+        Tests whether ranges reaching a past caching day are evicted.
+        """
+        # cache range reaching caching day
+        self.cache_response('2020-06-10')
+
+        # evicted?
+        self.assertEqual(evict_cached_responses(self.cache), 1)
+        self.assertEqual(os.listdir(self.cache), [])
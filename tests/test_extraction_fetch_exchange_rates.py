@@ -0,0 +1,239 @@
+"""
+Tests for extraction layer 'fetch_exchange_rates' method.
+"""
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from datetime import date
+from stonks.extraction import evict_cached_responses
+from stonks.extraction import fetch_exchange_rates
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+class ExchangeRatesHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for exchange rates API.
+    """
+
+    # number of failures answered before succeeding, per base currency
+    failures = {}
+
+    # number of answered requests
+    requests = 0
+
+    def do_GET(self):
+        """
+        Answers history requests.
+        """
+        ExchangeRatesHandler.requests += 1
+        query = parse_qs(urlparse(self.path).query)
+        base = query['base'][0]
+        start = query['start_at'][0]
+
+        # transient failure requested for base: fail once more
+        if self.failures.get(base, 0) > 0:
+            self.failures[base] -= 1
+            return self.answer(503, {'error': 'unavailable'})
+
+        # no data before 2000 or after end date: reject range
+        if start < '2000' or start > query['end_at'][0]:
+            return self.answer(400, {'error': 'no data'})
+
+        self.answer(200, {
+            'base': base,
+            'start_at': start,
+            'rates': {'2000-01-03': {'USD': 1.0}}
+        })
+
+    def answer(self, status: int, payload: dict) -> None:
+        """
+        Writes JSON response.
+        """
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """
+        Silences request logging.
+        """
+
+
+class TestExtractionFetchExchangeRates(TestCase):
+    """
+    Test case for concurrently fetching exchange rates.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ExchangeRatesHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        ExchangeRatesHandler.failures = {}
+        ExchangeRatesHandler.requests = 0
+
+
+    def test_every_base_currency_is_fetched(self):
+        """
+        Tests whether payloads for every base currency are fetched.
+        """
+        # fetch base currencies
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            payloads = list(fetch_exchange_rates(['EUR', 'USD', 'BRL'], 2000, 2))
+
+        # fetched?
+        self.assertEqual(
+            sorted(payload['base'] for payload in payloads),
+            ['BRL', 'EUR', 'USD']
+        )
+
+
+    def test_years_without_data_are_skipped(self):
+        """
+        Tests whether rejected years are skipped until data is found.
+        """
+        # fetch starting before available data
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            payloads = list(fetch_exchange_rates(['EUR'], 1998))
+
+        # skipped?
+        self.assertEqual(payloads[0]['start_at'], '2000-01-01')
+
+
+    def test_transient_failures_are_retried(self):
+        """
+        Tests whether transient server errors are retried.
+        """
+        # fail twice before answering
+        ExchangeRatesHandler.failures = {'EUR': 2}
+
+        # fetch with retries
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            payloads = list(
+                fetch_exchange_rates(['EUR'], 2000, retries=2, backoff=0)
+            )
+
+        # retried?
+        self.assertEqual(payloads[0]['base'], 'EUR')
+
+
+    def test_failures_are_raised_once_retries_are_exhausted(self):
+        """
+        Tests whether persistent server errors are raised.
+        """
+        # fail more than retries allow
+        ExchangeRatesHandler.failures = {'EUR': 3}
+
+        # fetch with retries
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            with self.assertRaises(Exception):
+                list(fetch_exchange_rates(['EUR'], 2000, retries=2, backoff=0))
+
+
+    def test_only_rates_after_watermark_are_fetched(self):
+        """
+        Tests whether fetches start on the day after the last loaded date.
+        """
+        # fetch with watermarks
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            payloads = list(
+                fetch_exchange_rates(
+                    ['EUR', 'USD'],
+                    2000,
+                    watermarks={'EUR': '2019-12-31'}
+                )
+            )
+
+        # started after watermark?
+        starts = {payload['base']: payload['start_at'] for payload in payloads}
+        self.assertEqual(starts, {'EUR': '2020-01-01', 'USD': '2000-01-01'})
+
+
+    def test_up_to_date_watermark_fetches_nothing(self):
+        """
+        Tests whether bases loaded up to today have no rates fetched.
+        """
+        # fetch with watermark in the future
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            payloads = list(
+                fetch_exchange_rates(['EUR'], 2000, watermarks={'EUR': '2999-12-31'})
+            )
+
+        # nothing fetched?
+        self.assertEqual(payloads, [{'base': 'EUR', 'rates': {}}])
+
+
+    def test_cached_responses_are_replayed(self):
+        """
+        Tests whether cached responses, rejected years included, are replayed.
+        """
+        cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache)
+
+        # one range per year since 1999
+        years = date.today().year - 1999 + 1
+
+        # fetch twice through cache
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            first = list(fetch_exchange_rates(['EUR'], 1999, cache=cache))
+            requests = ExchangeRatesHandler.requests
+            second = list(fetch_exchange_rates(['EUR'], 1999, cache=cache))
+
+        # replayed?
+        self.assertEqual(requests, years)
+        self.assertEqual(ExchangeRatesHandler.requests, years)
+        self.assertEqual(first, second)
+        self.assertEqual(len(os.listdir(cache)), years)
+
+
+    def test_closed_years_are_replayed_on_later_days(self):
+        """
+        Tests whether only the current year is requested again once expired.
+        """
+        cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache)
+
+        # fetch through cache, then age cached responses by a few days
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            list(fetch_exchange_rates(['EUR'], 2000, cache=cache))
+        aged = time.time() - 3 * 24 * 60 * 60
+        for name in os.listdir(cache):
+            os.utime(os.path.join(cache, name), (aged, aged))
+
+        # expired current year evicted, closed years kept?
+        kept = len(os.listdir(cache)) - 1
+        self.assertEqual(evict_cached_responses(cache), 1)
+        self.assertEqual(len(os.listdir(cache)), kept)
+
+        # fetch again on a later day
+        ExchangeRatesHandler.requests = 0
+        with patch('stonks.extraction.CURRENCY_API_URL', self.url):
+            list(fetch_exchange_rates(['EUR'], 2000, cache=cache))
+
+        # only current year requested?
+        self.assertEqual(ExchangeRatesHandler.requests, 1)
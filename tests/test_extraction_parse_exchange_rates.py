@@ -0,0 +1,104 @@
+"""
+Tests for extraction layer 'parse_exchange_rates' method.
+"""
+
+from stonks.extraction import CURRENCIES
+from stonks.extraction import build_rates_matrix
+from stonks.extraction import parse_exchange_rates
+from unittest import TestCase
+
+import json
+import numpy as np
+
+
+PAYLOAD = {
+    'rates': {
+        '2020-01-03': {'USD': 1.1147, 'BRL': 4.5152, 'JPY': 120},
+        '2020-01-02': {'USD': 1.1193, 'BRL': 4.4888},
+    },
+    'start_at': '2020-01-01',
+    'base': 'EUR',
+    'end_at': '2020-01-03'
+}
+
+
+class TestExtractionParseExchangeRates(TestCase):
+    """
+    Test case for parsing exchange rates responses into columnar arrays.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.table = parse_exchange_rates(json.dumps(PAYLOAD).encode('utf-8'))
+
+
+    def test_rates_are_sorted_by_date(self):
+        """
+        Tests whether rates rows are sorted by date.
+        """
+        # sorted?
+        self.assertEqual(self.table.base, 'EUR')
+        self.assertEqual(list(self.table.dates), ['2020-01-02', '2020-01-03'])
+
+
+    def test_rates_match_payload_matrix(self):
+        """
+        Tests whether parsed rates match rates laid out from decoded payload.
+        """
+        # lay out decoded payload
+        dates, matrix = build_rates_matrix(PAYLOAD)
+
+        # matching?
+        np.testing.assert_array_equal(self.table.rates, matrix)
+        self.assertEqual(self.table.rates[0, CURRENCIES.index('EUR')], 1.0)
+        self.assertTrue(np.isnan(self.table.rates[0, CURRENCIES.index('JPY')]))
+
+
+    def test_response_without_rates_is_empty(self):
+        """
+        Tests whether responses without rates produce an empty table.
+        """
+        # parse empty response
+        table = parse_exchange_rates(b'{"rates": {}, "base": "USD"}')
+
+        # empty?
+        self.assertEqual(table.base, 'USD')
+        self.assertEqual(table.rates.shape, (0, len(CURRENCIES)))
+
+
+    def test_dates_without_quotes_are_missing_rows(self):
+        """
+        Tests whether dates without quotes keep every other date rates.
+        """
+        # parse response with a date without quotes
+        table = parse_exchange_rates(json.dumps({
+            'rates': {
+                '2020-01-03': {'USD': 1.1147},
+                '2020-01-02': {},
+            },
+            'base': 'EUR'
+        }).encode('utf-8'))
+
+        # kept, date without quotes only quoted to itself?
+        self.assertEqual(list(table.dates), ['2020-01-02', '2020-01-03'])
+        self.assertEqual(table.rates[1, CURRENCIES.index('USD')], 1.1147)
+        self.assertTrue(np.isnan(table.rates[0, CURRENCIES.index('USD')]))
+        self.assertEqual(table.rates[0, CURRENCIES.index('EUR')], 1.0)
+
+
+    def test_unknown_currencies_are_left_out(self):
+        """
+        Tests whether quotes of currencies outside 'CURRENCIES' are ignored.
+        """
+        # parse response quoting an unknown currency
+        table = parse_exchange_rates(json.dumps({
+            'rates': {'2020-01-02': {'XXX': 3.0, 'USD': 1}},
+            'base': 'EUR'
+        }).encode('utf-8'))
+
+        # left out, known quotes kept as floats?
+        self.assertEqual(table.rates.shape, (1, len(CURRENCIES)))
+        self.assertEqual(table.rates.dtype, np.float64)
+        self.assertEqual(table.rates[0, CURRENCIES.index('USD')], 1.0)
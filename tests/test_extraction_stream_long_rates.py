@@ -0,0 +1,65 @@
+"""
+Tests for extraction layer 'stream_long_rates' method.
+"""
+
+from stonks.extraction import CURRENCIES
+from stonks.extraction import stream_long_rates
+from stonks.extraction import write_rates
+from unittest import TestCase
+
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+class TestExtractionStreamLongRates(TestCase):
+    """
+    Test case for unpivoting exchange rates files into one rate per line.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'currencies-EUR.csv')
+
+        # every rate known on first day, a single one on second day
+        rates = np.full((2, len(CURRENCIES)), np.nan)
+        rates[0] = np.arange(1, len(CURRENCIES) + 1)
+        rates[1, CURRENCIES.index('USD')] = 1.5
+        write_rates(self.path, 'EUR', ['2020-01-02', '2020-01-03'], rates)
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def test_known_rates_are_unpivoted(self):
+        """
+        Tests whether every known rate gets its own line.
+        """
+        # unpivot file
+        lines = list(stream_long_rates(self.path))
+
+        # one line per known rate?
+        self.assertEqual(len(lines), len(CURRENCIES) + 1)
+        self.assertEqual(lines[0], f'EUR,{CURRENCIES[0]},2020-01-02,1.0\n')
+
+
+    def test_unknown_rates_are_skipped(self):
+        """
+        Tests whether unknown rates are left out.
+        """
+        # unpivot file
+        lines = list(stream_long_rates(self.path))
+
+        # only known rate of second day kept?
+        self.assertEqual(
+            [line for line in lines if '2020-01-03' in line],
+            ['EUR,USD,2020-01-03,1.5\n']
+        )
@@ -0,0 +1,98 @@
+"""
+Tests for formatters layer 'format_commodities_data' method.
+"""
+
+from stonks.formatters import format_commodities_data
+from unittest import TestCase
+from unittest.mock import patch
+
+import os
+import shutil
+import tempfile
+
+
+SOURCE = (
+    'country_or_area,year,comm_code,flow,commodity,trade_usd,weight_kg,'
+    'quantity_name,quantity,category\n'
+    'Afghanistan,2016,010410,Export,"Sheep, live",6088,2339.0,'
+    'Number of items,51.0,01_live_animals\n'
+    '"China, Hong Kong SAR",2016,010420,Import,"Goats, live",3958,984.0,'
+    'Number of items,,01_live_animals\n'
+    'Albania,2015,010410,Import,"Sheep, live",1026804,272595.0,'
+    'Number of items,3421.0,01_live_animals\n'
+    'Angola,2014,TOTAL,Import,ALL COMMODITIES,37000000,,'
+    'No Quantity,,all_commodities\n'
+)
+
+
+class TestFormattersFormatCommoditiesData(TestCase):
+    """
+    Test case for formatting commodities source data.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'source.csv')
+        with open(self.source, 'w') as output_file:
+            output_file.write(SOURCE)
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def format(self, **kwargs) -> tuple:
+        """
+        Formats source file, returning unloaded facts and dimensions.
+        """
+        facts_path = os.path.join(self.folder, 'facts.csv')
+        dimensions_path = os.path.join(self.folder, 'dimensions.csv')
+
+        with patch('stonks.formatters.COMMODITIES_FACT_PATH', facts_path), \
+             patch('stonks.formatters.COMMODITIES_DIM_PATH', dimensions_path):
+            format_commodities_data(self.source, **kwargs)
+
+        with open(facts_path) as facts, open(dimensions_path) as dimensions:
+            return facts.read(), dimensions.read()
+
+
+    def test_chunked_output_matches_whole_file_output(self):
+        """
+        Tests whether chunked formatting unloads the same data.
+        """
+        # format whole file and chunk by chunk
+        whole = self.format()
+        chunked = self.format(chunksize=1)
+
+        # matching?
+        self.assertEqual(whole, chunked)
+
+
+    def test_dimensions_are_deduplicated_across_chunks(self):
+        """
+        Tests whether commodity codes are unloaded once across chunks.
+        """
+        # format chunk by chunk
+        _, dimensions = self.format(chunksize=1)
+
+        # deduplicated?
+        codes = [line.split(',')[0] for line in dimensions.splitlines()]
+        self.assertEqual(codes, ['010410', '010420', 'TOTAL'])
+
+
+    def test_chunk_size_is_derived_from_memory_ceiling(self):
+        """
+        Tests whether formatting under a memory ceiling unloads all facts.
+        """
+        # format under tiny memory ceiling
+        facts, _ = self.format(max_memory=1)
+
+        # fully unloaded?
+        self.assertEqual(len(facts.splitlines()), 4)
+        self.assertIn('China- Hong Kong SAR,2016,010420', facts)
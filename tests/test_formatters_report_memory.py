@@ -0,0 +1,54 @@
+"""
+Tests for formatters layer 'report_memory' method.
+"""
+
+from stonks.formatters import COMMODITIES_DTYPES
+from stonks.formatters import report_memory
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+
+HEADER = (
+    'country_or_area,year,comm_code,flow,commodity,trade_usd,weight_kg,'
+    'quantity_name,quantity,category\n'
+)
+ROW = (
+    'Afghanistan,2016,010410,Export,"Sheep, live",6088,2339.0,'
+    'Number of items,51.0,01_live_animals\n'
+)
+
+
+class TestFormattersReportMemory(TestCase):
+    """
+    Test case for reporting compact types memory savings.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'source.csv')
+        with open(self.source, 'w') as output_file:
+            output_file.write(HEADER + ROW * 1000)
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def test_compact_types_take_less_memory(self):
+        """
+        Tests whether compact types reduce memory taken by source data.
+        """
+        # measure memory
+        before, after = report_memory(self.source, COMMODITIES_DTYPES)
+
+        # reduced?
+        self.assertLess(after, before / 2)
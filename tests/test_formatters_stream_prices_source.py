@@ -0,0 +1,68 @@
+"""
+Tests for formatters layer 'stream_prices_source' method.
+"""
+
+from stonks.formatters import format_prices_source
+from stonks.formatters import stream_prices_source
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+
+SOURCE = (
+    'Date,Open,High,Low,Close,Volume,OpenInt\n'
+    '2005-02-25,6.4987,6.6009,6.4668,6.5753,55766,0\n'
+    '2005-02-28,6.6072,6.7669,6.5287,6.6459,49343,0\n'
+)
+
+
+class TestFormattersStreamPricesSource(TestCase):
+    """
+    Test case for formatting raw prices source files on the fly.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'aapl.us.txt')
+        with open(self.path, 'w') as output_file:
+            output_file.write(SOURCE)
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def test_lines_match_formatted_file(self):
+        """
+        Tests whether streamed lines match rows of formatted file.
+        """
+        # stream raw file
+        streamed = list(stream_prices_source(self.path))
+
+        # format file on disk
+        format_prices_source(self.path)
+        with open(self.path, 'r') as input_file:
+            formatted = input_file.readlines()
+
+        # matching?
+        self.assertEqual(streamed, formatted)
+        self.assertEqual(streamed[0], 'aapl,2005-02-25,6.4987,6.6009,6.4668,6.5753,55766\n')
+
+
+    def test_empty_file_produces_no_lines(self):
+        """
+        Tests whether empty source files are ignored.
+        """
+        # empty source file
+        open(self.path, 'w').close()
+
+        # ignored?
+        self.assertEqual(list(stream_prices_source(self.path)), [])
@@ -0,0 +1,147 @@
+"""
+Tests for instrumentation layer 'Recorder' class.
+"""
+
+from stonks.instrumentation import Recorder
+from stonks.instrumentation import count
+from stonks.instrumentation import counted
+from stonks.instrumentation import instrumented
+from stonks.instrumentation import recording
+from unittest import TestCase
+
+import concurrent.futures
+import contextvars
+import io
+import json
+import os
+import shutil
+import tempfile
+
+
+class TestInstrumentationRecorder(TestCase):
+    """
+    Test case for measuring pipeline phases and helpers.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'metrics.jsonl')
+        self.recorder = Recorder(self.path)
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def read_records(self):
+        """
+        Read every JSON line record written so far.
+        """
+        with open(self.path, 'r') as input_file:
+            return [json.loads(line) for line in input_file]
+
+
+    def test_counts_are_attributed_to_current_phase_and_helper(self):
+        """
+        Tests whether counts go to the phase and helper they are made in.
+        """
+        # count outside phases, within a helper and from a worker thread
+        self.recorder.count('connections')
+        with self.recorder.phase('load stocks'):
+            with self.recorder.helper('load_files'):
+                self.recorder.count('rows', 10)
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self.recorder.count,
+                    'rows',
+                    5
+                ).result()
+
+        # attributed?
+        self.assertEqual(self.recorder.phases['load stocks']['rows'], 15)
+        self.assertEqual(self.recorder.phases['other']['connections'], 1)
+        self.assertEqual(self.recorder.helpers['load_files']['rows'], 10)
+        self.assertEqual(self.recorder.helpers['load_files']['calls'], 1)
+        self.assertEqual(self.recorder.total()['rows'], 15)
+
+
+    def test_phases_are_written_as_json_lines(self):
+        """
+        Tests whether phases, failed ones included, are written once ended.
+        """
+        # run a phase and a failing one
+        with self.recorder.phase('extract'):
+            self.recorder.count('http_calls', 3)
+        with self.assertRaises(RuntimeError):
+            with self.recorder.phase('load'):
+                raise RuntimeError('failed')
+        self.recorder.finish()
+
+        # written in order, with status and metrics?
+        records = self.read_records()
+        self.assertEqual(
+            [(record['kind'], record['name'], record.get('status'))
+             for record in records],
+            [('phase', 'extract', 'done'),
+             ('phase', 'load', 'failed'),
+             ('run', 'total', None)]
+        )
+        self.assertEqual(records[0]['http_calls'], 3)
+        self.assertGreater(records[0]['peak_rss'], 0)
+        self.assertEqual(records[-1]['http_calls'], 3)
+
+
+    def test_metrics_are_exported_as_prometheus_textfile(self):
+        """
+        Tests whether metrics are written in Prometheus text format.
+        """
+        # measure phase and helper
+        with self.recorder.phase('load "stocks"'):
+            with self.recorder.helper('load_files'):
+                self.recorder.count('rows', 42)
+
+        # export metrics
+        path = os.path.join(self.folder, 'metrics.prom')
+        self.recorder.write_textfile(path)
+        with open(path, 'r') as input_file:
+            lines = input_file.read().splitlines()
+
+        # typed, labelled and escaped samples?
+        self.assertIn('# TYPE stonks_phase_rows gauge', lines)
+        self.assertIn('stonks_phase_rows{phase="load \\"stocks\\""} 42', lines)
+        self.assertIn('stonks_helper_calls{helper="load_files"} 1', lines)
+        self.assertIn('stonks_run_rows 42', lines)
+        self.assertTrue(any(
+            line.startswith('stonks_phase_wall_seconds{') for line in lines
+        ))
+        self.assertFalse(os.path.exists(f'{path}.tmp'))
+
+
+    def test_helpers_are_measured_while_recording(self):
+        """
+        Tests whether instrumented helpers count only while recording.
+        """
+        @instrumented
+        def copy(file):
+            count('rows', 2)
+            return counted(file).read()
+
+        # call helper before, while and after recording
+        copy(io.StringIO('ignored'))
+        with recording(self.recorder):
+            with self.recorder.phase('load'):
+                copy(io.StringIO('a\nb\n'))
+        copy(io.StringIO('ignored'))
+
+        # measured while recording only?
+        self.assertEqual(self.recorder.phases['load']['rows'], 2)
+        self.assertEqual(self.recorder.phases['load']['bytes'], 4)
+        self.assertEqual(self.recorder.helpers['copy']['calls'], 1)
+        self.assertEqual(self.recorder.helpers['copy']['bytes'], 4)
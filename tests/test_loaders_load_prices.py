@@ -0,0 +1,165 @@
+"""
+Tests for loaders layer 'load_prices' and 'load_prices_worker' methods.
+"""
+
+from stonks import loaders
+from unittest import TestCase
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+
+class TestLoadersLoadPrices(TestCase):
+    """
+    Test case for loading price files across concurrent workers.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+
+        # price files of a few rows each
+        self.files = []
+        for index in range(6):
+            path = os.path.join(self.folder, f'stock-{index}.csv')
+            with open(path, 'w') as output_file:
+                for day in range(index + 1):
+                    output_file.write(f'S{index},2020-01-0{day + 1},1,1,1,1,1\n')
+            self.files.append(path)
+
+        # files loaded by fake database helpers, from any worker
+        self.loaded = []
+        self.lock = threading.Lock()
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def load_files(self, paths, table, columns, progress=None):
+        """
+        Count rows of every file, as loaded over a single connection.
+        """
+        rows = 0
+        for path in paths:
+            with open(path, 'r') as input_file:
+                rows += len(input_file.readlines())
+            with self.lock:
+                self.loaded.append(path)
+
+            # let other workers pull files too
+            time.sleep(0.01)
+        return rows
+
+
+    def load_batches(self, streams, table, columns):
+        """
+        Count rows of every coalesced stream, as loaded by COPY.
+        """
+        rows = 0
+        for stream in streams:
+            rows += stream.read().count('\n')
+        return rows
+
+
+    def test_worker_loads_every_queued_file(self):
+        """
+        Tests whether a worker loads every queued file and counts its rows.
+        """
+        # queue every file
+        pending = queue.Queue()
+        for path in self.files:
+            pending.put(path)
+
+        # load them on a single worker
+        with patch.object(loaders, 'load_files', self.load_files):
+            rows, elapsed = loaders.load_prices_worker(
+                pending,
+                'currencies.fact_stock_price',
+                MagicMock()
+            )
+
+        # every file loaded once, every row counted?
+        self.assertEqual(self.loaded, self.files)
+        self.assertEqual(rows, 21)
+        self.assertGreater(elapsed, 0)
+        self.assertTrue(pending.empty())
+
+
+    def test_batched_worker_counts_every_row(self):
+        """
+        Tests whether coalesced files are streamed with every row.
+        """
+        # queue every file
+        pending = queue.Queue()
+        for path in self.files:
+            pending.put(path)
+
+        # load them in batches of a few rows
+        load_files = MagicMock()
+        with patch.object(loaders, 'load_files', load_files), \
+                patch.object(loaders, 'load_batches', self.load_batches):
+            rows, _ = loaders.load_prices_worker(
+                pending,
+                'currencies.fact_stock_price',
+                MagicMock(),
+                batch_rows=4
+            )
+
+        # every row streamed, never one COPY per file?
+        self.assertEqual(rows, 21)
+        load_files.assert_not_called()
+
+
+    def test_concurrent_workers_load_every_file_once(self):
+        """
+        Tests whether concurrent workers share files, loading each once.
+        """
+        # load files across workers
+        with patch.object(loaders, 'load_files', self.load_files), \
+                patch('builtins.print') as report:
+            loaders.load_prices(
+                self.files,
+                'currencies.fact_stock_price',
+                workers=3
+            )
+
+        # every file loaded once?
+        self.assertEqual(sorted(self.loaded), sorted(self.files))
+
+        # every worker reported, rows adding up to every file rows?
+        reported = [call.args[0] for call in report.call_args_list]
+        self.assertEqual(len(reported), 3)
+        self.assertEqual(
+            sum(int(line.split(': ')[1].split()[0]) for line in reported),
+            21
+        )
+
+
+    def test_worker_errors_are_raised(self):
+        """
+        Tests whether a failing worker fails the whole load.
+        """
+        # fail loading files on every worker
+        load_files = MagicMock(side_effect=RuntimeError('failed'))
+        with patch.object(loaders, 'load_files', load_files):
+
+            # raised, with one or many workers?
+            for workers in [1, 3]:
+                with self.assertRaisesRegex(RuntimeError, 'failed'):
+                    loaders.load_prices(
+                        self.files,
+                        'currencies.fact_stock_price',
+                        workers=workers
+                    )
@@ -0,0 +1,103 @@
+"""
+Tests for manifest layer 'scan_files' method.
+"""
+
+from stonks.manifest import fingerprint_file
+from stonks.manifest import scan_files
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+
+class TestManifestScanFiles(TestCase):
+    """
+    Test case for comparing source files against load manifest.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'a.us.txt')
+        self.write('Date,Open\n2020-01-01,1.0\n2020-01-02,2.0')
+        self.manifest = {self.path: fingerprint_file(self.path, header=True)}
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def write(self, content: str) -> None:
+        """
+        Writes content to source file.
+        """
+        with open(self.path, 'w') as output_file:
+            output_file.write(content)
+
+
+    def test_rows_are_counted(self):
+        """
+        Tests whether rows are counted without header.
+        """
+        # rows counted, even without trailing line break?
+        self.assertEqual(self.manifest[self.path].rows, 2)
+
+
+    def test_new_files_are_changed(self):
+        """
+        Tests whether files missing from manifest are to be loaded.
+        """
+        # scan against empty manifest
+        changed, outdated = scan_files([self.path], {})
+
+        # to be loaded?
+        self.assertEqual([entry.path for entry in changed], [self.path])
+        self.assertEqual(outdated, [])
+
+
+    def test_untouched_files_are_skipped(self):
+        """
+        Tests whether files with recorded metadata are skipped.
+        """
+        # scan against manifest
+        changed, outdated = scan_files([self.path], self.manifest)
+
+        # skipped?
+        self.assertEqual(changed, [])
+        self.assertEqual(outdated, [])
+
+
+    def test_rewritten_files_with_same_content_are_outdated(self):
+        """
+        Tests whether touched files with the same content are not loaded.
+        """
+        # rewrite same content later on
+        modified = self.manifest[self.path].modified + 10 ** 9
+        os.utime(self.path, ns=(modified, modified))
+        changed, outdated = scan_files([self.path], self.manifest)
+
+        # only metadata refreshed?
+        self.assertEqual(changed, [])
+        self.assertEqual([entry.modified for entry in outdated], [modified])
+
+
+    def test_modified_files_are_changed(self):
+        """
+        Tests whether files with modified content are to be loaded.
+        """
+        # modify content, keeping size and a later modification time
+        self.write('Date,Open\n2020-01-01,1.0\n2020-01-02,3.0')
+        modified = self.manifest[self.path].modified + 10 ** 9
+        os.utime(self.path, ns=(modified, modified))
+        changed, outdated = scan_files([self.path], self.manifest)
+
+        # to be loaded?
+        self.assertEqual(len(changed), 1)
+        self.assertNotEqual(changed[0].digest, self.manifest[self.path].digest)
+        self.assertEqual(outdated, [])
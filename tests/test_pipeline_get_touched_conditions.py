@@ -0,0 +1,120 @@
+"""
+Tests for pipeline layer 'get_touched_conditions' method.
+"""
+
+from stonks.extraction import CURRENCIES
+from stonks.pipeline import get_touched_condition
+from stonks.pipeline import get_touched_conditions
+from unittest import TestCase
+
+
+class TestPipelineGetTouchedConditions(TestCase):
+    """
+    Test case for matching summarized rows touched by latest loads.
+    """
+
+    def test_nothing_loaded_touches_nothing(self):
+        """
+        Tests whether loads of no keys touch no summarized rows.
+        """
+        # build conditions of empty loads
+        conditions = get_touched_conditions({
+            'read watermarks': {},
+            'load currencies': [],
+            'load stocks': [],
+            'load ETFs': [],
+            'load commodities': False,
+        })
+
+        # nothing touched?
+        self.assertEqual(set(conditions.values()), {None})
+        self.assertIsNone(get_touched_condition('stock_symbol', [], '2021-03-15'))
+
+
+    def test_every_key_loaded_touches_everything(self):
+        """
+        Tests whether loads of every key touch every summarized row.
+        """
+        # build conditions of full loads, without watermarks
+        conditions = get_touched_conditions({
+            'read watermarks': {},
+            'load currencies': None,
+            'load stocks': None,
+            'load ETFs': None,
+            'load commodities': True,
+        })
+
+        # everything touched?
+        self.assertEqual(set(conditions.values()), {'TRUE'})
+
+
+    def test_single_date_matches_its_month_onwards(self):
+        """
+        Tests whether rows loaded since a date touch its month onwards.
+        """
+        # build condition of rates loaded since a single date
+        condition = get_touched_condition('currency_source', None, '2021-03-15')
+
+        # month onwards matched?
+        self.assertEqual(condition, '(year, month) >= (2021, 3)')
+
+
+    def test_date_range_matches_from_earliest_watermark(self):
+        """
+        Tests whether ranges of loaded dates match from their earliest month.
+        """
+        # every base loaded since its own watermark
+        watermarks = {currency: '2021-06-30' for currency in CURRENCIES}
+        watermarks[CURRENCIES[-1]] = '2020-12-01'
+        conditions = get_touched_conditions({
+            'read watermarks': watermarks,
+            'load currencies': ['EUR'],
+            'load stocks': [],
+            'load ETFs': [],
+            'load commodities': False,
+        })
+
+        # matched from earliest month on?
+        self.assertEqual(
+            conditions['currencies.fact_exchange_rate'],
+            "currency_source IN ('EUR') AND (year, month) >= (2020, 12)"
+        )
+
+        # some base without watermark: every date matched?
+        del watermarks[CURRENCIES[0]]
+        conditions = get_touched_conditions({
+            'read watermarks': watermarks,
+            'load currencies': ['EUR'],
+            'load stocks': [],
+            'load ETFs': [],
+            'load commodities': False,
+        })
+        self.assertEqual(
+            conditions['currencies.fact_exchange_rate'],
+            "currency_source IN ('EUR')"
+        )
+
+
+    def test_multiple_sources_are_matched(self):
+        """
+        Tests whether every loaded key is matched, quoted.
+        """
+        # build conditions of several loaded keys
+        conditions = get_touched_conditions({
+            'read watermarks': {},
+            'load currencies': ['EUR', 'USD'],
+            'load stocks': ['AAPL', "O'NEIL"],
+            'load ETFs': [],
+            'load commodities': False,
+        })
+
+        # every key matched, quotes escaped?
+        self.assertEqual(
+            conditions['currencies.fact_exchange_rate'],
+            "currency_source IN ('EUR', 'USD')"
+        )
+        self.assertEqual(
+            conditions['currencies.fact_stock_price'],
+            "stock_symbol IN ('AAPL', 'O''NEIL')"
+        )
+        self.assertIsNone(conditions['currencies.fact_etf_price'])
@@ -0,0 +1,212 @@
+"""
+Tests for pipeline layer 'run' method.
+"""
+
+from stonks import pipeline
+from unittest import TestCase
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+
+
+class TestPipelineRun(TestCase):
+    """
+    Test case for resuming pipeline runs after failed loads.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.checkpoints = os.path.join(self.folder, 'checkpoints.json')
+
+        # every stage work, a single failing stocks load among them
+        self.stages = {
+            name: MagicMock(return_value=None)
+            for name in [
+                'teardown_database',
+                'initialize_database',
+                'extract_currencies_source_data',
+                'load_final_currencies_tables',
+                'load_final_prices_tables',
+                'load_final_commodities_tables',
+                'load_derived_tables',
+                'check_tables'
+            ]
+        }
+        self.stages['load_final_prices_tables'].side_effect = [
+            None,
+            RuntimeError('failed'),
+            None,
+            None
+        ]
+        self.run_queries = MagicMock()
+
+        # no database nor files outside of temporary folder
+        self.patches = [
+            patch.object(pipeline, name, work)
+            for name, work in self.stages.items()
+        ]
+        self.patches += [
+            patch.object(pipeline, 'run_queries', self.run_queries),
+            patch.object(
+                pipeline,
+                'connection_pool',
+                lambda **_: contextlib.nullcontext()
+            ),
+            patch.object(pipeline, 'CHECKPOINTS_PATH', self.checkpoints),
+            patch.object(
+                pipeline,
+                'STARTED_PATH',
+                os.path.join(self.folder, 'started.json')
+            ),
+            patch.object(
+                pipeline,
+                'METRICS_PATH',
+                os.path.join(self.folder, 'metrics.jsonl')
+            ),
+            patch.object(
+                pipeline,
+                'PROMETHEUS_PATH',
+                os.path.join(self.folder, 'metrics.prom')
+            ),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        for patcher in self.patches:
+            patcher.stop()
+        shutil.rmtree(self.folder)
+
+
+    def fail_loading_etfs(self, **options):
+        """
+        Run pipeline up to its failing ETFs load.
+        """
+        with self.assertRaises(RuntimeError):
+            pipeline.run(**options)
+        for work in self.stages.values():
+            work.reset_mock()
+
+
+    def test_torn_down_run_is_resumed_from_emptied_tables(self):
+        """
+        Tests whether failed loads of torn down runs start from scratch.
+        """
+        # fail, then resume
+        self.fail_loading_etfs(teardown=True)
+        pipeline.run(teardown=True, resume=True)
+
+        # done stages skipped?
+        self.stages['teardown_database'].assert_not_called()
+        self.stages['initialize_database'].assert_not_called()
+        self.stages['load_final_currencies_tables'].assert_not_called()
+        self.assertEqual(
+            self.stages['load_final_prices_tables'].call_args.args[:2],
+            ('ETFs', 'fact_etf_price')
+        )
+        self.stages['check_tables'].assert_called_once()
+
+        # only table of failed load emptied first, pending ones never
+        # started?
+        [[queries], _] = self.run_queries.call_args
+        self.run_queries.assert_called_once()
+        self.assertEqual(
+            [query.strip() for query in queries],
+            ['TRUNCATE TABLE currencies.fact_etf_price;']
+        )
+        with open(self.checkpoints, 'r') as input_file:
+            self.assertIn('checks', json.load(input_file))
+
+
+    def test_idempotent_loads_are_resumed_as_they_are(self):
+        """
+        Tests whether upserted failed loads run again over their rows.
+        """
+        # fail, then resume
+        self.fail_loading_etfs(upsert=True)
+        pipeline.run(upsert=True, resume=True)
+
+        # failed load run again, nothing emptied?
+        self.assertEqual(
+            self.stages['load_final_prices_tables'].call_count,
+            1
+        )
+        self.run_queries.assert_not_called()
+
+
+    def test_appending_loads_are_not_resumed(self):
+        """
+        Tests whether failed loads appending to previous runs are refused.
+        """
+        # fail, then resume
+        self.fail_loading_etfs()
+        with self.assertRaises(ValueError):
+            pipeline.run(resume=True)
+
+        # refused before running anything?
+        for work in self.stages.values():
+            work.assert_not_called()
+        self.run_queries.assert_not_called()
+
+
+    def test_loads_never_started_are_resumed(self):
+        """
+        Tests whether appending loads are resumed when they never started.
+        """
+        # fail extracting, before any load started
+        self.stages['load_final_prices_tables'].side_effect = None
+        extract = self.stages['extract_currencies_source_data']
+        extract.side_effect = [RuntimeError('failed'), {}]
+        with self.assertRaises(RuntimeError):
+            pipeline.run()
+        self.stages['load_final_prices_tables'].assert_not_called()
+
+        # resumed without upsert, nothing emptied?
+        pipeline.run(resume=True)
+        self.assertEqual(extract.call_count, 2)
+        self.assertEqual(
+            self.stages['load_final_prices_tables'].call_count,
+            2
+        )
+        self.run_queries.assert_not_called()
+
+
+    def test_forced_loads_are_not_resumed(self):
+        """
+        Tests whether done appending loads forced again are refused.
+        """
+        # run everything, then force a done load again
+        self.stages['load_final_prices_tables'].side_effect = None
+        pipeline.run()
+        with self.assertRaises(ValueError):
+            pipeline.run(resume=True, force=['load commodities'])
+
+
+    def test_pooled_connections_are_kept_open(self):
+        """
+        Tests whether every pooled connection is kept open by default.
+        """
+        # run with pool smaller than workers of parallel stages
+        self.stages['load_final_prices_tables'].side_effect = None
+        pool = MagicMock(return_value=contextlib.nullcontext())
+        with patch.object(pipeline, 'connection_pool', pool):
+            pipeline.run(pool_size=2, workers=3, max_parallel=2)
+            pipeline.run(pool_min_size=2, workers=3, max_parallel=2)
+
+        # pool kept open up to every worker, unless told otherwise?
+        self.assertEqual(
+            [call.kwargs for call in pool.call_args_list],
+            [{'min_size': 6, 'max_size': 6}, {'min_size': 2, 'max_size': 6}]
+        )
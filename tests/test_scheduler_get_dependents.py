@@ -0,0 +1,54 @@
+"""
+Tests for scheduler layer 'get_dependents' method.
+"""
+
+from stonks.scheduler import Stage
+from stonks.scheduler import get_dependents
+from unittest import TestCase
+
+
+STAGES = [
+    Stage('initialize', print),
+    Stage('extract currencies', print),
+    Stage('load currencies', print, ['initialize', 'extract currencies']),
+    Stage('load stocks', print, ['initialize']),
+    Stage('derived tables', print, ['load currencies', 'load stocks']),
+    Stage('checks', print, ['derived tables']),
+]
+
+
+class TestSchedulerGetDependents(TestCase):
+    """
+    Test case for finding stages to run again along with forced ones.
+    """
+
+    def test_indirect_dependents_are_found(self):
+        """
+        Tests whether stages depending on given ones, even indirectly, are found.
+        """
+        # find dependents of extraction
+        dependents = get_dependents(STAGES, ['extract currencies'])
+
+        # found?
+        self.assertEqual(
+            dependents,
+            {'extract currencies', 'load currencies', 'derived tables', 'checks'}
+        )
+
+
+    def test_last_stage_has_no_dependents(self):
+        """
+        Tests whether stages nothing depends on are found alone.
+        """
+        # find dependents of last stage, alone?
+        self.assertEqual(get_dependents(STAGES, ['checks']), {'checks'})
+        self.assertEqual(get_dependents(STAGES, []), set())
+
+
+    def test_unknown_stages_are_rejected(self):
+        """
+        Tests whether unknown stages are rejected.
+        """
+        # rejected?
+        with self.assertRaises(ValueError):
+            get_dependents(STAGES, ['load bonds'])
@@ -0,0 +1,204 @@
+"""
+Tests for scheduler layer 'run_stages' method.
+"""
+
+from stonks.scheduler import Stage
+from stonks.scheduler import run_stages
+from unittest import TestCase
+
+import threading
+
+
+class TestSchedulerRunStages(TestCase):
+    """
+    Test case for running pipeline stages along their dependencies.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.events = []
+        self.lock = threading.Lock()
+
+
+    def record(self, name, result=None):
+        """
+        Build stage work recording its start and end.
+        """
+        def work():
+            with self.lock:
+                self.events.append(f'start {name}')
+            with self.lock:
+                self.events.append(f'end {name}')
+            return result
+
+        return work
+
+
+    def test_stages_run_after_dependencies(self):
+        """
+        Tests whether stages only start once their dependencies are done.
+        """
+        # declare stages out of dependency order
+        stages = [
+            Stage('derive', self.record('derive'), ['load', 'extract']),
+            Stage('load', self.record('load', 42), ['extract']),
+            Stage('extract', self.record('extract')),
+        ]
+
+        # run stages
+        results = run_stages(stages, max_parallel=4)
+
+        # dependencies respected?
+        self.assertEqual(results['load'], 42)
+        self.assertLess(
+            self.events.index('end extract'),
+            self.events.index('start load')
+        )
+        self.assertLess(
+            self.events.index('end load'),
+            self.events.index('start derive')
+        )
+
+
+    def test_single_stage_runs_in_declaration_order(self):
+        """
+        Tests whether stages run one by one in declared order by default.
+        """
+        # declare independent stages
+        stages = [Stage(name, self.record(name)) for name in 'cab']
+
+        # run stages
+        run_stages(stages)
+
+        # declared order?
+        self.assertEqual(
+            self.events,
+            ['start c', 'end c', 'start a', 'end a', 'start b', 'end b']
+        )
+
+
+    def test_independent_stages_run_concurrently(self):
+        """
+        Tests whether independent stages run at the same time.
+        """
+        # stages only done once both are running
+        barrier = threading.Barrier(2, timeout=5)
+        stages = [
+            Stage('stocks', barrier.wait),
+            Stage('ETFs', barrier.wait),
+        ]
+
+        # run stages, concurrently?
+        results = run_stages(stages, max_parallel=2)
+        self.assertEqual(set(results), {'stocks', 'ETFs'})
+
+
+    def test_failed_stage_stops_dependents(self):
+        """
+        Tests whether stages depending on a failed stage are not run.
+        """
+        # declare failing stage
+        def fail():
+            raise RuntimeError('failed')
+        stages = [
+            Stage('extract', fail),
+            Stage('load', self.record('load'), ['extract']),
+        ]
+
+        # raised, dependent not run?
+        with self.assertRaises(RuntimeError):
+            run_stages(stages, max_parallel=2)
+        self.assertEqual(self.events, [])
+
+
+    def test_done_stages_are_skipped(self):
+        """
+        Tests whether stages with results given are skipped as done.
+        """
+        # first stage done by a previous run
+        stages = [
+            Stage('extract', self.record('extract')),
+            Stage('load', self.record('load'), ['extract']),
+        ]
+        checkpoints = []
+
+        # resume stages
+        results = run_stages(
+            stages,
+            results={'extract': {'EUR': '2020-01-03'}},
+            on_done=lambda name, result: checkpoints.append(name)
+        )
+
+        # skipped, done stages reported?
+        self.assertEqual(self.events, ['start load', 'end load'])
+        self.assertEqual(results['extract'], {'EUR': '2020-01-03'})
+        self.assertEqual(checkpoints, ['load'])
+
+
+    def test_started_stages_are_reported_before_running(self):
+        """
+        Tests whether stages are reported as started before running only.
+        """
+        # second stage failing, its dependent never started
+        def fail():
+            raise RuntimeError('failed')
+        stages = [
+            Stage('extract', self.record('extract')),
+            Stage('load', fail, ['extract']),
+            Stage('derive', self.record('derive'), ['load']),
+        ]
+        started = []
+        def start(name):
+            started.append((name, list(self.events)))
+
+        # run stages, reporting starts
+        with self.assertRaises(RuntimeError):
+            run_stages(stages, on_start=start)
+
+        # stages reported before running, dependent of failed one never?
+        self.assertEqual(
+            started,
+            [('extract', []), ('load', ['start extract', 'end extract'])]
+        )
+
+
+    def test_running_stages_end_before_failure_is_raised(self):
+        """
+        Tests whether stages running alongside a failed one are recorded.
+        """
+        # failing stage raised while other stage runs
+        barrier = threading.Barrier(2, timeout=5)
+        def fail():
+            barrier.wait()
+            raise RuntimeError('failed')
+        def slow():
+            barrier.wait()
+            return 'loaded'
+        stages = [Stage('stocks', fail), Stage('ETFs', slow)]
+        checkpoints = {}
+
+        # raised, running stage recorded?
+        with self.assertRaises(RuntimeError):
+            run_stages(stages, 2, on_done=checkpoints.__setitem__)
+        self.assertEqual(checkpoints, {'ETFs': 'loaded'})
+
+
+    def test_invalid_graphs_are_rejected(self):
+        """
+        Tests whether cyclic or unknown dependencies are rejected.
+        """
+        # cyclic and unknown dependencies
+        cyclic = [
+            Stage('a', self.record('a'), ['b']),
+            Stage('b', self.record('b'), ['a']),
+        ]
+        unknown = [Stage('a', self.record('a'), ['missing'])]
+
+        # rejected?
+        with self.assertRaises(ValueError):
+            run_stages(cyclic)
+        with self.assertRaises(ValueError):
+            run_stages(unknown)
+        self.assertEqual(self.events, [])
@@ -0,0 +1,81 @@
+"""
+Tests for streams layer 'CoalescedStream' class.
+"""
+
+from stonks.streams import CoalescedStream
+from unittest import TestCase
+
+
+SOURCES = [
+    ('A.txt', ['A,1\n', 'A,2\n']),
+    ('B.txt', ['B,1\n', 'B,2\n', 'B,3']),
+    ('C.txt', []),
+    ('D.txt', ['D,1\n']),
+]
+
+
+class TestStreamsCoalescedStream(TestCase):
+    """
+    Test case for chaining many sources into a single COPY stream.
+    """
+
+    def test_sources_are_chained_in_order(self):
+        """
+        Tests whether every source line is streamed, newline terminated.
+        """
+        # read whole stream in small pieces
+        stream = CoalescedStream(iter(SOURCES))
+        data = ''.join(iter(lambda: stream.read(3), ''))
+
+        # chained?
+        self.assertEqual(data, 'A,1\nA,2\nB,1\nB,2\nB,3\nD,1\n')
+        self.assertTrue(stream.exhausted)
+
+
+    def test_stream_stops_at_source_boundary(self):
+        """
+        Tests whether limits close stream only after a whole source.
+        """
+        # split sources into row limited streams
+        sources = iter(SOURCES)
+        first = CoalescedStream(sources, max_rows=3)
+        first_data = first.read()
+        second = CoalescedStream(sources, max_rows=3)
+        second_data = second.read()
+
+        # split at boundary?
+        self.assertEqual(first_data, 'A,1\nA,2\nB,1\nB,2\nB,3\n')
+        self.assertFalse(first.exhausted)
+        self.assertEqual(second_data, 'D,1\n')
+        self.assertTrue(second.exhausted)
+
+
+    def test_stream_line_is_traced_to_source(self):
+        """
+        Tests whether stream lines are traced back to their source.
+        """
+        # read whole stream
+        stream = CoalescedStream(iter(SOURCES))
+        stream.read()
+
+        # traced?
+        self.assertEqual(stream.source_of(1), ('A.txt', 1))
+        self.assertEqual(stream.source_of(4), ('B.txt', 2))
+        self.assertEqual(stream.source_of(6), ('D.txt', 1))
+        self.assertEqual(
+            stream.source_rows(),
+            {'A.txt': 2, 'B.txt': 3, 'C.txt': 0, 'D.txt': 1}
+        )
+
+
+    def test_lines_are_read_one_by_one(self):
+        """
+        Tests whether lines can be read one at a time.
+        """
+        # read first lines
+        stream = CoalescedStream(iter(SOURCES))
+        stream.read(2)
+
+        # read line by line?
+        self.assertEqual(stream.readline(), '1\n')
+        self.assertEqual(stream.readline(), 'A,2\n')
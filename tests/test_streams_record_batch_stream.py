@@ -0,0 +1,116 @@
+"""
+Tests for streams layer 'RecordBatchStream' class.
+"""
+
+from stonks.extraction import CURRENCIES
+from stonks.extraction import unpivot_rates_batch
+from stonks.extraction import write_rates
+from stonks.streams import RecordBatchStream
+from unittest import TestCase
+
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+class TestStreamsRecordBatchStream(TestCase):
+    """
+    Test case for serving Arrow staged files as COPY CSV input.
+    """
+
+    def setUp(self):
+        """
+        Prepares for testing.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'currencies-EUR.arrow')
+
+        # every rate known on first day, a single one on second day
+        rates = np.full((2, len(CURRENCIES)), np.nan)
+        rates[0] = np.arange(1, len(CURRENCIES) + 1)
+        rates[1, CURRENCIES.index('USD')] = 1.5
+        write_rates(
+            self.path,
+            'EUR',
+            ['2020-01-02', '2020-01-03'],
+            rates,
+            'arrow'
+        )
+
+
+    def tearDown(self):
+        """
+        Cleans up after testing.
+        """
+        shutil.rmtree(self.folder)
+
+
+    def test_batches_are_served_as_csv(self):
+        """
+        Tests whether rows are served as CSV, unknown rates left empty.
+        """
+        # read whole stream in small pieces
+        stream = RecordBatchStream(self.path)
+        data = b''.join(iter(lambda: stream.read(7), b'')).decode()
+        first, second = data.splitlines()
+
+        # served as CSV?
+        self.assertEqual(stream.rows, 2)
+        self.assertEqual(
+            first.split(','),
+            ['"EUR"', '2020-01-02',
+             *(str(rate) for rate in range(1, len(CURRENCIES) + 1))]
+        )
+        self.assertEqual(
+            second.split(','),
+            ['"EUR"', '2020-01-03',
+             *('1.5' if currency == 'USD' else '' for currency in CURRENCIES)]
+        )
+
+
+    def test_batches_are_transformed(self):
+        """
+        Tests whether batches are transformed before being served.
+        """
+        # read whole unpivoted stream
+        stream = RecordBatchStream(self.path, unpivot_rates_batch)
+        lines = stream.read().decode().splitlines()
+
+        # one line per known rate?
+        self.assertEqual(stream.rows, len(CURRENCIES) + 1)
+        self.assertEqual(len(lines), len(CURRENCIES) + 1)
+        self.assertIn('"EUR","USD",2020-01-03,1.5', lines)
+
+
+    def test_sparse_rates_are_unpivoted_as_csv(self):
+        """
+        Tests whether rates known for a few currencies are unpivoted as text.
+        """
+        # a few currencies known over three days, every other one unknown
+        path = os.path.join(self.folder, 'currencies-USD.arrow')
+        rates = np.full((3, len(CURRENCIES)), np.nan)
+        for index, currency in enumerate(['BRL', 'EUR', 'GBP']):
+            rates[:, CURRENCIES.index(currency)] = index + 1
+        write_rates(
+            path,
+            'USD',
+            ['2020-01-02', '2020-01-03', '2020-01-06'],
+            rates,
+            'arrow'
+        )
+
+        # read whole unpivoted stream
+        stream = RecordBatchStream(path, unpivot_rates_batch)
+        data = stream.read().decode()
+
+        # one CSV line per known rate, nothing else?
+        self.assertEqual(stream.rows, 9)
+        self.assertEqual(
+            sorted(data.splitlines()),
+            sorted(
+                f'"USD","{currency}",{date},{index + 1}'
+                for index, currency in enumerate(['BRL', 'EUR', 'GBP'])
+                for date in ['2020-01-02', '2020-01-03', '2020-01-06']
+            )
+        )